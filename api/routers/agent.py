@@ -1,10 +1,30 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-from typing import Dict, Any
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field
+from typing import AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, Any, List, Optional, Tuple, TypeVar
+from contextlib import aclosing
 import asyncio
+import json
+import os
+import uuid
 
-from api.services.agent import AgentService
+from api.services.agent import AgentService, AgentServiceProvider
+from api.services.chat_socket import ChatSocket
+from api.services.admission import AdmissionController, AdmissionRejected, AdmissionTicket, Priority
+from api.services.jobs import Job, JobManager, JobQueueFullError
+from api.services.session_store import DEFAULT_SESSION_ID
+from src.agents.utils import AgentEvent, DeadlineExceeded, map_bounded
+from src.logger import get_formatted_logger
+
+logger = get_formatted_logger(__name__)
+
+T = TypeVar("T")
+
+# How often a running request checks whether its client is still connected
+DISCONNECT_POLL_INTERVAL = 0.5
+# Idle seconds after which an event stream sends a heartbeat, so proxies keep it open
+HEARTBEAT_INTERVAL = float(os.getenv("AGENT_HEARTBEAT_INTERVAL", "15"))
 
 # Create router
 agent_router = APIRouter(prefix="/agent", tags=["agent"])
@@ -12,6 +32,36 @@ agent_router = APIRouter(prefix="/agent", tags=["agent"])
 # Request model
 class ChatRequest(BaseModel):
     query: str
+    session_id: Optional[str] = None  # Conversation id; requests without one share the default session
+    timeout: Optional[float] = Field(None, gt=0)  # Seconds the client is willing to wait, capped by the server
+
+def _format_sse(event: Dict[str, Any], event_id: int) -> str:
+    return f"id: {event_id}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+def _format_ndjson(event: Dict[str, Any], event_id: int) -> str:
+    return json.dumps({"id": event_id, **event}, ensure_ascii=False) + "\n"
+
+# Request model for batch endpoint
+class BatchRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1)
+    parallelism: Optional[int] = Field(None, gt=0)  # Queries processed at once, capped by the server
+    timeout: Optional[float] = Field(None, gt=0)  # Seconds per query
+
+# Response model for job endpoints
+class JobResponse(BaseModel):
+    job_id: str
+    status: str
+    session_id: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[str] = None
+    error: Optional[str] = None
+    events: int = 0
+
+# Request model for reset endpoint
+class ResetRequest(BaseModel):
+    session_id: Optional[str] = None
 
 # Response model
 class ChatResponse(BaseModel):
@@ -22,11 +72,150 @@ class ResetResponse(BaseModel):
     status: str
     message: str
 
-# Initialize agent chat globally
-agent_chat = AgentService()
+# Agent service, built by the start-up warm-up or on first use instead of at import
+agent_service = AgentServiceProvider()
+
+async def get_agent_chat() -> AgentService:
+    """Dependency resolving the warmed-up agent service"""
+    try:
+        return await agent_service.aget()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Agent service is unavailable: {str(e).strip()}")
+
+# Each request fans out to several LLM calls; bound how many run at once so bursts queue instead of
+# overrunning provider quotas
+admission = AdmissionController(
+    max_concurrent=int(os.getenv("AGENT_MAX_CONCURRENT", "16")),
+    max_per_session=int(os.getenv("AGENT_MAX_PER_SESSION", "1")),
+    max_queue=int(os.getenv("AGENT_MAX_QUEUE", "64")),
+    max_queue_wait=float(os.getenv("AGENT_MAX_QUEUE_WAIT", "30"))
+)
+
+# Turns a single WebSocket connection may run at once
+MAX_SOCKET_TURNS = int(os.getenv("AGENT_WS_MAX_TURNS", "8"))
+
+MAX_BATCH_SIZE = int(os.getenv("AGENT_MAX_BATCH_SIZE", "10000"))
+MAX_BATCH_PARALLELISM = int(os.getenv("AGENT_MAX_BATCH_PARALLELISM", "8"))
+
+def _rejected(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(int(e.retry_after))})
+
+async def _acquire_when_available(session_id: str, priority: Priority) -> AdmissionTicket:
+    """Admission for background work, which is not latency sensitive: wait out a busy server instead of failing"""
+    while True:
+        try:
+            return await admission.acquire(session_id, priority)
+        except AdmissionRejected as e:
+            await asyncio.sleep(e.retry_after)
+
+async def _run_job(job: Job) -> AsyncIterator[Dict[str, Any]]:
+    # Jobs without a session are standalone queries, like /batch; they must not queue behind
+    # (or write into) the default conversation
+    stateless = job.session_id is None
+    ticket = await _acquire_when_available(f"job-{job.job_id}" if stateless else job.session_id, Priority.BATCH)
+    try:
+        agent_chat = await agent_service.aget()
+        async for event in agent_chat.stream_events(
+            job.query,
+            verbose=False,
+            session_id=job.session_id,
+            timeout=job.timeout,
+            stateless=stateless
+        ):
+            yield event.to_dict()
+    finally:
+        admission.release(ticket)
+
+# Long agent runs submitted through the job API, executed by a pool of background workers
+jobs = JobManager(
+    _run_job,
+    workers=int(os.getenv("AGENT_JOB_WORKERS", "4")),
+    max_queue=int(os.getenv("AGENT_MAX_JOB_QUEUE", "100")),
+    result_ttl=float(os.getenv("AGENT_JOB_RESULT_TTL", "3600"))
+)
+
+class ClientDisconnected(Exception):
+    pass
+
+async def _run_until_disconnected(
+    request: Request,
+    awaitable: Awaitable[T],
+    discard: Optional[Callable[[T], Any]] = None
+) -> T:
+    """
+    Await the agent call, cancelling it as soon as the client goes away.
+    `discard` disposes of a result that arrived while the disconnect was being
+    noticed (e.g. releases an admission ticket nobody will use).
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise ClientDisconnected()
+    except BaseException:
+        task.cancel()
+        if discard is not None and task.done() and not task.cancelled() and task.exception() is None:
+            discard(task.result())
+        raise
+    finally:
+        task.cancel()
+
+async def _stream_until_disconnected(
+    request: Request,
+    stream: AsyncGenerator[T, None],
+    heartbeat: Optional[Callable[[], T]] = None
+) -> AsyncGenerator[T, None]:
+    """
+    Re-yield the agent stream, cancelling it as soon as the client goes away,
+    including while the agent is between chunks (planning, reflection steps, ...).
+    The stream is consumed by a single task so that its request deadline stays in scope.
+    With `heartbeat`, its value is sent whenever the stream is idle for HEARTBEAT_INTERVAL.
+    """
+    chunks: asyncio.Queue = asyncio.Queue(maxsize=16)
+    end = object()
+
+    async def pump():
+        cancelled = False
+        try:
+            async with aclosing(stream):
+                async for chunk in stream:
+                    await chunks.put(chunk)
+        except asyncio.CancelledError:
+            # Cancelled because the consumer stopped reading: an end marker could block on a full queue
+            cancelled = True
+            raise
+        finally:
+            if not cancelled:
+                await chunks.put(end)
+
+    producer = asyncio.ensure_future(pump())
+    try:
+        while True:
+            try:
+                chunk = await _run_until_disconnected(
+                    request,
+                    asyncio.wait_for(chunks.get(), HEARTBEAT_INTERVAL if heartbeat else None)
+                )
+            except asyncio.TimeoutError:
+                yield heartbeat()
+                continue
+            if chunk is end:
+                break
+            yield chunk
+        # Surface errors raised by the stream
+        await producer
+    except ClientDisconnected:
+        logger.info("Client disconnected, streaming request cancelled")
+    finally:
+        producer.cancel()
+        # Wait for the agent run to stop, so it does not outlive the request
+        await asyncio.gather(producer, return_exceptions=True)
 
 @agent_router.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, http_request: Request, agent_chat: AgentService = Depends(get_agent_chat)):
     """
     Endpoint for agent chat interaction
     
@@ -36,58 +225,256 @@ async def chat_endpoint(request: ChatRequest):
     Returns:
         ChatResponse: Agent's response to the query
     """
+    async def respond() -> str:
+        async with admission.admit(request.session_id or DEFAULT_SESSION_ID, Priority.STANDARD):
+            # Use the existing get_response method from AgentChat
+            return await agent_chat.get_response(request.query, session_id=request.session_id, timeout=request.timeout)
+
     try:
-        # Use the existing get_response method from AgentChat
-        response = await agent_chat.get_response(request.query)
+        response = await _run_until_disconnected(http_request, respond())
         return ChatResponse(response=response)
+    except AdmissionRejected as e:
+        raise _rejected(e)
+    except ClientDisconnected:
+        logger.info("Client disconnected, request cancelled")
+        # Nobody reads this response; 499 is the conventional "client closed request" status
+        return Response(status_code=499)
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         # Handle any potential errors
         raise HTTPException(status_code=500, detail=str(e))
 
 @agent_router.post("/stream")
-async def stream_chat_endpoint(request: ChatRequest):
+async def stream_chat_endpoint(request: ChatRequest, http_request: Request, agent_chat: AgentService = Depends(get_agent_chat)):
     """
     Endpoint for streaming agent chat interaction
     
+    Every event is a JSON object with a "type": "routing", "plan",
+    "step_start", "step_end", "tool_call", "token" (answer text), "error",
+    "heartbeat", and last "final" (with the full answer). Events are framed
+    as server-sent events, or as NDJSON when the client accepts
+    application/x-ndjson.
+    
     Args:
         request (ChatRequest): Contains the user query
         
     Returns:
-        StreamingResponse: Stream of agent's response chunks
+        StreamingResponse: Stream of typed agent events
     """
     try:
-        # Create an async generator for streaming the response
-        async def response_generator():
-            async for chunk in agent_chat.stream_response(request.query):
-                # Yield each chunk as a server-sent event
-                yield chunk
-            # Signal the end of the stream
-            yield "[DONE]"
+        # Admit before the response starts so a busy server can still answer 429
+        ticket = await _run_until_disconnected(
+            http_request,
+            admission.acquire(request.session_id or DEFAULT_SESSION_ID, Priority.INTERACTIVE),
+            discard=admission.release
+        )
+    except AdmissionRejected as e:
+        raise _rejected(e)
+    except ClientDisconnected:
+        return Response(status_code=499)
+
+    ndjson = "application/x-ndjson" in http_request.headers.get("accept", "")
+    format_event = _format_ndjson if ndjson else _format_sse
+    try:
+        async def event_generator():
+            try:
+                events = agent_chat.stream_events(request.query, session_id=request.session_id, timeout=request.timeout)
+                event_id = 0
+                async for event in _stream_until_disconnected(http_request, events, heartbeat=lambda: AgentEvent("heartbeat")):
+                    yield format_event(event.to_dict(), event_id)
+                    event_id += 1
+            finally:
+                admission.release(ticket)
         
-        # Return a streaming response with text/event-stream content type
+        # The background task frees the slot if the stream never started
         return StreamingResponse(
-            response_generator(),
-            media_type="text/event-stream"
+            event_generator(),
+            media_type="application/x-ndjson" if ndjson else "text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            background=BackgroundTask(admission.release, ticket)
         )
     except Exception as e:
+        admission.release(ticket)
         # Handle any potential errors
         raise HTTPException(status_code=500, detail=str(e))
 
+@agent_router.websocket("/ws")
+async def chat_websocket(websocket: WebSocket):
+    """
+    WebSocket chat: one connection carries any number of conversations
+    
+    The client sends {"type": "chat", "request_id", "query", "session_id", "timeout"}
+    to start a turn and {"type": "cancel", "request_id"} to abort it. The server
+    streams the turn's agent events (see /agent/stream) tagged with its request_id,
+    ending every turn with a "done" event.
+    """
+    await websocket.accept()
+    try:
+        agent_chat = await agent_service.aget()
+    except Exception as e:
+        # 1011: the server cannot serve the connection
+        await websocket.close(code=1011, reason=f"Agent service is unavailable: {str(e).strip()}"[:120])
+        return
+    socket = ChatSocket(agent_chat, admission, websocket.send_json, max_in_flight=MAX_SOCKET_TURNS)
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = json.loads(text)
+            except ValueError:
+                await socket.send({"type": "error", "reason": "invalid", "message": "Messages must be JSON"})
+                continue
+            await socket.handle(message)
+    except WebSocketDisconnect:
+        logger.info("WebSocket client disconnected")
+    finally:
+        await socket.close()
+
+@agent_router.post("/batch")
+async def batch_chat_endpoint(request: BatchRequest, http_request: Request, agent_chat: AgentService = Depends(get_agent_chat)):
+    """
+    Endpoint for bulk agent queries
+    
+    Queries are independent (no chat history) and run concurrently at batch
+    priority, so interactive traffic is admitted first.
+    
+    Args:
+        request (BatchRequest): Queries and optional parallelism and per-query timeout
+        
+    Returns:
+        StreamingResponse: One NDJSON line per query as soon as it completes:
+            {"index": ..., "query": ..., "response": ...} or {"index": ..., "query": ..., "error": ...}
+    """
+    if len(request.queries) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"A batch may hold at most {MAX_BATCH_SIZE} queries")
+    parallelism = min(request.parallelism or MAX_BATCH_PARALLELISM, MAX_BATCH_PARALLELISM)
+    batch_id = uuid.uuid4().hex
+
+    async def run_item(item: Tuple[int, str]) -> str:
+        index, query = item
+        ticket = await _acquire_when_available(f"batch-{batch_id}-{index}", Priority.BATCH)
+        try:
+            return await agent_chat.run_query(query, timeout=request.timeout)
+        finally:
+            admission.release(ticket)
+
+    async def results_generator():
+        async with aclosing(map_bounded(enumerate(request.queries), run_item, parallelism)) as completed:
+            async for index, response, error in completed:
+                result = {"index": index, "query": request.queries[index]}
+                if error is None:
+                    result["response"] = response
+                else:
+                    if isinstance(error, DeadlineExceeded):
+                        result["error"] = "timeout"
+                    elif isinstance(error, asyncio.CancelledError):
+                        result["error"] = "cancelled"
+                    else:
+                        result["error"] = str(error)
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(
+        _stream_until_disconnected(http_request, results_generator()),
+        media_type="application/x-ndjson"
+    )
+
+@agent_router.post("/jobs", response_model=JobResponse, status_code=202)
+async def submit_job_endpoint(request: ChatRequest):
+    """
+    Submit a long-running agent request; returns immediately with the job id
+    
+    Jobs with a session_id are turns of that conversation; jobs without one are
+    standalone queries that use no history, so they run in parallel.
+    
+    Args:
+        request (ChatRequest): Contains the user query
+        
+    Returns:
+        JobResponse: The queued job, to poll at /agent/jobs/{job_id}
+    """
+    try:
+        job = jobs.submit(request.query, session_id=request.session_id, timeout=request.timeout)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return JobResponse(**job.to_dict())
+
+def _get_job(job_id: str) -> Job:
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found or expired")
+    return job
+
+@agent_router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job_endpoint(job_id: str):
+    """
+    Poll a job
+    
+    Returns:
+        JobResponse: Status, and the result or error once the job has finished
+    """
+    return JobResponse(**_get_job(job_id).to_dict())
+
+@agent_router.get("/jobs/{job_id}/events")
+async def job_events_endpoint(job_id: str, http_request: Request, start: int = 0):
+    """
+    Attach to the progress of a job
+    
+    Args:
+        start (int): Index of the first event to send, to resume after a dropped connection
+        
+    Returns:
+        StreamingResponse: NDJSON events (status changes and output chunks), replayed
+            from `start` and followed live until the job finishes
+    """
+    job = _get_job(job_id)
+
+    async def events_generator():
+        index = start
+        async for event in jobs.subscribe(job, start):
+            yield json.dumps({"index": index, **event}, ensure_ascii=False) + "\n"
+            index += 1
+
+    return StreamingResponse(
+        _stream_until_disconnected(http_request, events_generator()),
+        media_type="application/x-ndjson"
+    )
+
+@agent_router.delete("/jobs/{job_id}", response_model=JobResponse)
+async def cancel_job_endpoint(job_id: str):
+    """Cancel a queued or running job"""
+    job = await jobs.cancel(_get_job(job_id).job_id)
+    return JobResponse(**job.to_dict())
+
 @agent_router.post("/reset", response_model=ResetResponse)
-async def reset_chat_endpoint():
+async def reset_chat_endpoint(request: Optional[ResetRequest] = None, agent_chat: AgentService = Depends(get_agent_chat)):
     """
     Endpoint to reset the chat history
     
+    Args:
+        request (Optional[ResetRequest]): Session to reset, the default session if omitted
+    
     Returns:
         ResetResponse: Confirmation of chat history reset
     """
     try:
         # Call the reset_chat method
-        agent_chat.reset_chat()
+        await agent_chat.reset_chat(request.session_id if request else None)
         return ResetResponse(
             status="success", 
             message="Chat history has been successfully reset"
         )
     except Exception as e:
         # Handle any potential errors
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@agent_router.get("/metrics")
+async def metrics_endpoint() -> Dict[str, Any]:
+    """Admission gauges (in-flight runs, queue depth and wait), session store, job counters and start-up timings"""
+    return {
+        "admission": admission.get_stats(),
+        # Not built yet: nothing to report, and metrics must not trigger the build
+        "sessions": agent_service.get().sessions.get_stats() if agent_service.built else None,
+        "jobs": jobs.get_stats(),
+        "service": agent_service.get_status(),
+    }
@@ -0,0 +1,196 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, AsyncIterator, Dict, List, Optional
+from src.logger import get_formatted_logger
+
+logger = get_formatted_logger(__name__)
+
+
+class Priority(IntEnum):
+    """Admission priority; lower values are served first"""
+    INTERACTIVE = 0  # Streaming chat, a user is watching
+    STANDARD = 1     # Request/response chat
+    BATCH = 2        # Bulk and offline work
+
+
+class AdmissionRejected(Exception):
+    """The wait queue is full (or the wait took too long); retry after `retry_after` seconds"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class AdmissionTicket:
+    session_id: str
+    priority: Priority
+    admitted_at: float = 0.0
+    released: bool = False
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    ticket: AdmissionTicket = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False, default_factory=time.monotonic)
+
+
+class AdmissionController:
+    """
+    Bounds the agent runs executing at once.
+
+    At most `max_concurrent` runs execute in total and `max_per_session` per
+    session; others wait in a queue of at most `max_queue` entries, served by
+    priority and then arrival order. When the queue is full, or a request has
+    waited `max_queue_wait` seconds, it is rejected right away with a
+    Retry-After estimate instead of slowing down everyone else.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 16,
+        max_per_session: int = 1,
+        max_queue: int = 64,
+        max_queue_wait: Optional[float] = 30.0
+    ):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_per_session = max(1, max_per_session)
+        self.max_queue = max_queue
+        self.max_queue_wait = max_queue_wait
+        self._in_flight = 0
+        self._per_session: Dict[str, int] = {}
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._service_time = 0.0  # Moving average of run durations, for Retry-After
+        self.stats: Dict[str, Any] = {
+            "admitted": 0,
+            "queued": 0,  # Admitted after waiting in the queue
+            "rejected": 0,
+            "timed_out": 0,
+            "queue_wait_seconds": 0.0,
+        }
+        self._max_queue_wait_seen = 0.0
+
+    def _can_run(self, session_id: str) -> bool:
+        return self._in_flight < self.max_concurrent and self._per_session.get(session_id, 0) < self.max_per_session
+
+    def _start(self, ticket: AdmissionTicket) -> None:
+        self._in_flight += 1
+        self._per_session[ticket.session_id] = self._per_session.get(ticket.session_id, 0) + 1
+        ticket.admitted_at = time.monotonic()
+        self.stats["admitted"] += 1
+
+    def retry_after(self) -> float:
+        """Seconds until a slot is likely to free up"""
+        service_time = self._service_time or 1.0
+        waves = (len(self._queue) + 1) / self.max_concurrent
+        return max(1.0, math.ceil(service_time * waves))
+
+    async def acquire(self, session_id: str, priority: Priority = Priority.STANDARD) -> AdmissionTicket:
+        """Wait for a slot; raises AdmissionRejected when the request cannot be queued"""
+        ticket = AdmissionTicket(session_id=session_id, priority=priority)
+        if not self._queue and self._can_run(session_id):
+            self._start(ticket)
+            return ticket
+
+        if len(self._queue) >= self.max_queue:
+            self.stats["rejected"] += 1
+            logger.warning(f"Rejected request of session {session_id}: queue full ({len(self._queue)} waiting)")
+            raise AdmissionRejected("Server is busy, too many queued requests", self.retry_after())
+
+        waiter = _Waiter(int(priority), next(self._seq), ticket, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._queue, waiter)
+        # Slots may be free while every queued waiter is held back by its session limit
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.max_queue_wait)
+        except asyncio.TimeoutError:
+            if not waiter.future.done():
+                self._remove(waiter)
+                self.stats["timed_out"] += 1
+                logger.warning(f"Rejected request of session {session_id}: waited {self.max_queue_wait}s in queue")
+                raise AdmissionRejected("Server is busy, timed out waiting in queue", self.retry_after())
+        except BaseException:
+            # Cancelled while waiting (e.g. client disconnected): give the slot back if it was granted
+            if waiter.future.done():
+                self.release(ticket)
+            else:
+                self._remove(waiter)
+            raise
+        waited = time.monotonic() - waiter.enqueued_at
+        self.stats["queued"] += 1
+        self.stats["queue_wait_seconds"] += waited
+        self._max_queue_wait_seen = max(self._max_queue_wait_seen, waited)
+        return ticket
+
+    def _remove(self, waiter: _Waiter) -> None:
+        self._queue.remove(waiter)
+        heapq.heapify(self._queue)
+
+    def release(self, ticket: AdmissionTicket) -> None:
+        """Free the slot of a finished run; releasing twice is a no-op"""
+        if ticket.released or not ticket.admitted_at:
+            return
+        ticket.released = True
+        self._in_flight -= 1
+        remaining = self._per_session.get(ticket.session_id, 0) - 1
+        if remaining > 0:
+            self._per_session[ticket.session_id] = remaining
+        else:
+            self._per_session.pop(ticket.session_id, None)
+        duration = time.monotonic() - ticket.admitted_at
+        self._service_time = duration if not self._service_time else 0.8 * self._service_time + 0.2 * duration
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Grant free slots to waiters in priority order, skipping sessions at their limit"""
+        skipped = []
+        while self._queue and self._in_flight < self.max_concurrent:
+            waiter = heapq.heappop(self._queue)
+            if waiter.future.done():
+                continue
+            if not self._can_run(waiter.ticket.session_id):
+                skipped.append(waiter)
+                continue
+            self._start(waiter.ticket)
+            waiter.future.set_result(None)
+        for waiter in skipped:
+            heapq.heappush(self._queue, waiter)
+
+    @asynccontextmanager
+    async def admit(self, session_id: str, priority: Priority = Priority.STANDARD) -> AsyncIterator[AdmissionTicket]:
+        ticket = await self.acquire(session_id, priority)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Gauges and counters for dashboards"""
+        queued = self.stats["queued"]
+        return {
+            **self.stats,
+            "in_flight": self._in_flight,
+            "queue_depth": len(self._queue),
+            "queue_depth_by_priority": {
+                priority.name.lower(): sum(1 for waiter in self._queue if waiter.priority == priority)
+                for priority in Priority
+            },
+            "avg_queue_wait_seconds": self.stats["queue_wait_seconds"] / queued if queued else 0.0,
+            "max_queue_wait_seconds": self._max_queue_wait_seen,
+            "avg_service_seconds": self._service_time,
+            "limits": {
+                "max_concurrent": self.max_concurrent,
+                "max_per_session": self.max_per_session,
+                "max_queue": self.max_queue,
+            },
+        }
@@ -1,18 +1,50 @@
-from typing import Optional, List, AsyncGenerator, Generator
+import asyncio
+import os
+import threading
+import time
+from contextlib import aclosing
+from typing import Any, Callable, Dict, Optional, List, AsyncGenerator, Generator, Union
 from src.agents import (ReflectionAgent,
                         PlanningAgent,
                         AgentOptions,
                         ManagerAgent)
 from src.tools.tool_manager import weather_tool
-from src.agents.llm import UnifiedLLM
+from src.agents.llm import BaseLLM, UnifiedLLM
+from src.agents.utils import (DeadlineExceeded,
+                              deadline_scope,
+                              AgentEvent,
+                              EventSink,
+                              event_sink_scope,
+                              has_event_sink,
+                              emit_event)
 from llama_index.core.llms import ChatMessage
 from src.logger import get_formatted_logger
+from api.services.session_store import Session, SessionStore, SharedSessionStore, DEFAULT_SESSION_ID
+from api.services.history_store import SQLiteHistoryStore
+from api.services.state_backend import StateBackend, InMemoryStateBackend, BackendRouteStore, create_state_backend
 
 logger = get_formatted_logger(__name__)
+
+TIMEOUT_MESSAGE = "I'm sorry, your request took too long to process. Please try again."
+
 class AgentService:
-    def __init__(self):
+    def __init__(
+        self,
+        llm: Optional[BaseLLM] = None,
+        session_store: Optional[Union[SessionStore, SharedSessionStore]] = None,
+        state_backend: Optional[StateBackend] = None,
+        request_timeout: Optional[float] = None
+    ):
+        # Upper bound on a whole turn (routing, agent steps, validation); clients may only ask for less
+        self.request_timeout = request_timeout or float(os.getenv("AGENT_REQUEST_TIMEOUT", "120"))
+
+        # Shared state for running under several workers or nodes (STATE_BACKEND_URL=redis://...);
+        # the default keeps everything in this process
+        self.state_backend = state_backend or create_state_backend(os.getenv("STATE_BACKEND_URL"))
+        shared = not isinstance(self.state_backend, InMemoryStateBackend)
+
         # Initialize LLM
-        self.llm = UnifiedLLM(model_name="gemini")
+        self.llm = llm or UnifiedLLM(model_name="gemini")
         
         # Initialize specialized agents
         self.reflection_agent = ReflectionAgent(
@@ -20,7 +52,12 @@ class AgentService:
             AgentOptions(
                 id="reflection",
                 name="Reflection Assistant",
-                description="Helps with information football"
+                description="Helps with information football",
+                examples=[
+                    "Who is the best football player in the world?",
+                    "Tell me about Messi and Ronaldo",
+                    "Which club won the Champions League?",
+                ]
             ),
             system_prompt="Bạn là 1 trợ lý AI hữu ích, thân thiện và có hiểu biết sâu rộng về bóng đá."
         )
@@ -30,7 +67,12 @@ class AgentService:
             AgentOptions(
                 id="planning",
                 name="Planning Assistant",
-                description="Assists with project planning, task breakdown, and using weather tool"
+                description="Assists with project planning, task breakdown, and using weather tool",
+                examples=[
+                    "What's the weather in Hanoi today?",
+                    "Will it rain tomorrow?",
+                    "Break this project down into tasks",
+                ]
             ),
             system_prompt="Bạn là 1 trợ lý AI hữu ích, thân thiện và có hiểu biết sâu rộng.",
             tools=[weather_tool]
@@ -40,85 +82,361 @@ class AgentService:
             AgentOptions(
                 name="Manager",
                 description="Routes requests to specialized agents"
-            )
+            ),
+            route_store=BackendRouteStore(self.state_backend) if shared else None
         )
         self.manager.register_agent(self.reflection_agent)
         self.manager.register_agent(self.planning_agent)
-        # Chat history to provide context
-        self.chat_history: List[ChatMessage] = []
+        # Chat history to provide context, one conversation per session id
+        if session_store is not None:
+            self.sessions = session_store
+        elif shared:
+            self.sessions = SharedSessionStore(self.state_backend)
+        else:
+            # Persisted to a local file
+            self.sessions = SessionStore(
+                history_backend=SQLiteHistoryStore(os.getenv("CHAT_HISTORY_PATH", "data/chat_history.sqlite3"))
+            )
     
-    async def get_response(self, user_input: str, verbose: bool = True) -> str:
+    def _get_timeout(self, timeout: Optional[float]) -> float:
+        return min(timeout, self.request_timeout) if timeout else self.request_timeout
+
+    async def get_response(
+        self,
+        user_input: str,
+        verbose: bool = True,
+        session_id: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> str:
         """
         Process user input by routing to appropriate agent
         
         Args:
             user_input (str): User's query
             verbose (bool): Whether to log detailed information
+            session_id (Optional[str]): Conversation the query belongs to
+            timeout (Optional[float]): Seconds the whole turn may take, capped at `request_timeout`
             
         Returns:
             str: Agent's response
+        
+        Raises:
+            DeadlineExceeded: When the turn runs out of time
         """
+        session = self.sessions.get(session_id)
+        with deadline_scope(self._get_timeout(timeout)):
+            async with self.sessions.turn(session):
+                return await self._get_response(session, user_input, verbose)
+
+    async def _get_response(self, session: Session, user_input: str, verbose: bool) -> str:
         try:
+            await self.sessions.ensure_loaded(session)
             # Process the input and get a response
             response = await self.manager.achat(
                 query=user_input,
-                chat_history=self.chat_history[:-1],
-                verbose=verbose
+                chat_history=list(session.history),
+                verbose=verbose,
+                session_id=session.session_id
             )
             
-            # Update chat history
-            self.chat_history.append(ChatMessage(role="user", content=user_input))
-            self.chat_history.append(ChatMessage(role="assistant", content=response))
-            
-            # Trim chat history to last 10 messages to prevent context overflow
-            self.chat_history = self.chat_history[-10:]
+            # Update chat history, trimmed by the session store to prevent context overflow
+            await self.sessions.append(
+                session,
+                ChatMessage(role="user", content=user_input),
+                ChatMessage(role="assistant", content=response)
+            )
             
             return response
             
+        except DeadlineExceeded:
+            logger.warning(f"Request timed out in session {session.session_id}")
+            raise
         except Exception as e:
             logger.error(f"Error in get_response: {e}")
             return "I'm sorry, I encountered an error processing your request."
     
-    async def stream_response(self, user_input: str, verbose: bool = True) -> AsyncGenerator[str, None]:
+    async def run_query(self, user_input: str, timeout: Optional[float] = None) -> str:
+        """
+        Answer a standalone query, without conversation history or sticky routing
+        (bulk and offline workloads such as evaluation sets)
+        
+        Args:
+            user_input (str): User's query
+            timeout (Optional[float]): Seconds the query may take, capped at `request_timeout`
+            
+        Returns:
+            str: Agent's response
+        
+        Raises:
+            DeadlineExceeded: When the query runs out of time
+        """
+        with deadline_scope(self._get_timeout(timeout)):
+            return await self.manager.achat(query=user_input, chat_history=[], verbose=False)
+
+    async def stream_query(self, user_input: str, timeout: Optional[float] = None) -> AsyncGenerator[str, None]:
+        """
+        Stream the answer to a standalone query, without conversation history or sticky routing
+        
+        Args:
+            user_input (str): User's query
+            timeout (Optional[float]): Seconds the query may take, capped at `request_timeout`
+            
+        Returns:
+            AsyncGenerator[str, None]: Stream of agent's response chunks
+        """
+        refined = []
+        with deadline_scope(self._get_timeout(timeout)):
+            async with aclosing(self.manager.astream_chat(
+                query=user_input,
+                chat_history=[],
+                verbose=False,
+                on_refined=refined.append
+            )) as stream:
+                async for chunk in stream:
+                    yield chunk
+        if refined and not has_event_sink():
+            # Plain text streams cannot take the streamed answer back
+            yield "\n\n" + refined[-1]
+
+    async def stream_response(
+        self,
+        user_input: str,
+        verbose: bool = True,
+        session_id: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> AsyncGenerator[str, None]:
         """
         Process user input and stream the response from the appropriate agent
         
         Args:
             user_input (str): User's query
             verbose (bool): Whether to log detailed information
+            session_id (Optional[str]): Conversation the query belongs to
+            timeout (Optional[float]): Seconds the whole turn may take, capped at `request_timeout`
             
         Returns:
             AsyncGenerator[str, None]: Stream of agent's response chunks
         """
+        session = self.sessions.get(session_id)
+        with deadline_scope(self._get_timeout(timeout)):
+            async with self.sessions.turn(session):
+                async with aclosing(self._stream_response(session, user_input, verbose)) as stream:
+                    async for chunk in stream:
+                        yield chunk
+
+    async def _stream_response(self, session: Session, user_input: str, verbose: bool) -> AsyncGenerator[str, None]:
+        full_response = ""
+        refined = []
         try:
-            # First add the user message to history
+            await self.sessions.ensure_loaded(session)
             logger.info(f"User input: {user_input}")
-            self.chat_history.append(ChatMessage(role="user", content=user_input))
+            chat_history = list(session.history)
             
-            # Get streaming response from planning agent
-            full_response = ""
+            # Get streaming response from the selected agent
             async for chunk in self.manager.astream_chat(
                 query=user_input,
-                chat_history=self.chat_history[:-1],  # Exclude the user message we just added
-                verbose=verbose
+                chat_history=chat_history,
+                verbose=verbose,
+                session_id=session.session_id,
+                on_refined=refined.append
             ):
                 full_response += chunk
                 yield chunk
             
+            if refined:
+                # The refined answer replaces the streamed one, as in `get_response`
+                full_response = refined[-1]
+                if not has_event_sink():
+                    # Plain text streams cannot take the streamed answer back
+                    yield "\n\n" + full_response
+            
             # After streaming is complete, update chat history with the full response
-            self.chat_history.append(ChatMessage(role="assistant", content=full_response))
+            await self.sessions.append(
+                session,
+                ChatMessage(role="user", content=user_input),
+                ChatMessage(role="assistant", content=full_response)
+            )
             logger.info(f"Final response: {full_response}")
-            # Trim chat history to last 10 messages
-            self.chat_history = self.chat_history[-10:]
             
+        except DeadlineExceeded:
+            logger.warning(f"Streaming request timed out in session {session.session_id}")
+            if has_event_sink():
+                emit_event("error", message=TIMEOUT_MESSAGE, reason="timeout")
+            else:
+                yield "\n" + TIMEOUT_MESSAGE
+            await self.sessions.append(
+                session,
+                ChatMessage(role="user", content=user_input),
+                ChatMessage(role="assistant", content=full_response + "\n" + TIMEOUT_MESSAGE)
+            )
         except Exception as e:
             logger.error(f"Error in stream_response: {e}")
             error_msg = "I'm sorry, I encountered an error processing your request."
-            yield error_msg
+            if has_event_sink():
+                emit_event("error", message=error_msg, reason="error")
+            else:
+                yield error_msg
             
             # Add error message to chat history
-            self.chat_history.append(ChatMessage(role="assistant", content=error_msg))
+            await self.sessions.append(
+                session,
+                ChatMessage(role="user", content=user_input),
+                ChatMessage(role="assistant", content=error_msg)
+            )
     
-    def reset_chat(self):
-        """Reset the chat history"""
-        self.chat_history = []
\ No newline at end of file
+    async def stream_events(
+        self,
+        user_input: str,
+        verbose: bool = True,
+        session_id: Optional[str] = None,
+        timeout: Optional[float] = None,
+        stateless: bool = False
+    ) -> AsyncGenerator[AgentEvent, None]:
+        """
+        Stream a turn as typed events: routing decision, plan and step
+        progress, tool calls, answer tokens, errors, and a closing "final"
+        event carrying the full answer. When validation refines the answer a
+        "refined" event carries the new text, which replaces the streamed tokens
+        
+        Args:
+            user_input (str): User's query
+            verbose (bool): Whether to log detailed information
+            session_id (Optional[str]): Conversation the query belongs to
+            timeout (Optional[float]): Seconds the whole turn may take, capped at `request_timeout`
+            stateless (bool): Answer as a standalone query (see `stream_query`), ignoring `session_id`
+            
+        Returns:
+            AsyncGenerator[AgentEvent, None]: Events in the order they happened
+        """
+        sink = EventSink()
+        done = object()
+
+        async def produce():
+            text = ""
+            try:
+                if stateless:
+                    stream = self.stream_query(user_input, timeout)
+                else:
+                    stream = self.stream_response(user_input, verbose, session_id, timeout)
+                with event_sink_scope(sink):
+                    async for chunk in stream:
+                        text += chunk
+                        sink.emit(AgentEvent("token", {"text": chunk}))
+                sink.emit(AgentEvent("final", {"text": text}))
+            finally:
+                sink.queue.put_nowait(done)
+
+        # Own task, so the event sink is only visible to this turn
+        producer = asyncio.create_task(produce())
+        try:
+            refined = None
+            while True:
+                event = await sink.queue.get()
+                if event is done:
+                    break
+                if event.type == "refined":
+                    refined = event.data["text"]
+                elif event.type == "final" and refined is not None:
+                    event.data["text"] = refined
+                yield event
+            await producer
+        finally:
+            # Returns once the agent run has actually stopped
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+    async def warm_up(self) -> None:
+        """Initialize the LLM client and render static prompt fragments before the first request"""
+        self.llm.warm_up()
+        self.manager.warm_up()
+
+    async def close(self):
+        """Flush persisted history and close the state backend"""
+        # Waits for the history writer thread to commit its queue
+        await asyncio.to_thread(self.sessions.close)
+        await self.state_backend.close()
+
+    async def reset_chat(self, session_id: Optional[str] = None):
+        """Reset the chat history of a session"""
+        await self.sessions.reset(session_id)
+        await self.manager.route_store.delete(session_id or DEFAULT_SESSION_ID)
+
+class AgentServiceProvider:
+    """
+    Builds the AgentService on first use or at start-up warm-up instead of at
+    import, so the API starts (and answers /health) before the LLM client is
+    ready, and a missing key fails warm-up instead of the import.
+    """
+
+    def __init__(self, factory: Callable[[], AgentService] = AgentService):
+        self.factory = factory
+        self._service: Optional[AgentService] = None
+        self._build_lock = threading.Lock()
+        self._warming: Optional[asyncio.Future] = None
+        self.ready = False
+        self.ready_at: Optional[float] = None  # time.perf_counter() when warm-up finished
+        self.error: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+
+    @property
+    def built(self) -> bool:
+        return self._service is not None
+
+    def get(self) -> AgentService:
+        """The service, built synchronously if needed (blocks; prefer `aget` in request handlers)"""
+        if self._service is None:
+            with self._build_lock:
+                if self._service is None:
+                    started = time.perf_counter()
+                    self._service = self.factory()
+                    self.timings["build_seconds"] = time.perf_counter() - started
+        return self._service
+
+    async def aget(self) -> AgentService:
+        """The warmed-up service; the first callers wait for the warm-up"""
+        if not self.ready:
+            await self.warm_up()
+        return self._service
+
+    async def warm_up(self) -> AgentService:
+        """Build and warm up the service once; concurrent callers share the same warm-up"""
+        if self._warming is None:
+            self._warming = asyncio.ensure_future(self._warm_up())
+        try:
+            # A caller giving up must not abort the warm-up for everyone else
+            return await asyncio.shield(self._warming)
+        except Exception:
+            # Let the next request try again
+            self._warming = None
+            raise
+
+    async def _warm_up(self) -> AgentService:
+        started = time.perf_counter()
+        try:
+            # Building looks the model up at the provider; keep that off the event loop
+            service = await asyncio.to_thread(self.get)
+            warm_up_started = time.perf_counter()
+            await service.warm_up()
+            self.timings["warm_up_seconds"] = time.perf_counter() - warm_up_started
+        except Exception as e:
+            self.error = str(e).strip()
+            logger.error(f"Agent service warm-up failed: {self.error}")
+            raise
+        self.timings["ready_seconds"] = time.perf_counter() - started
+        self.ready = True
+        self.ready_at = time.perf_counter()
+        self.error = None
+        logger.info(
+            f"Agent service ready in {self.timings['ready_seconds']:.2f}s "
+            f"(build {self.timings['build_seconds']:.2f}s, warm-up {self.timings['warm_up_seconds']:.2f}s)"
+        )
+        return service
+
+    def get_status(self) -> Dict[str, Any]:
+        return {"ready": self.ready, "error": self.error, **self.timings}
+
+    async def close(self) -> None:
+        if self._warming is not None and not self._warming.done():
+            self._warming.cancel()
+        if self._service is not None:
+            await self._service.close()
@@ -0,0 +1,119 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+from pydantic import BaseModel, Field, ValidationError
+from api.services.admission import AdmissionController, AdmissionRejected, Priority
+from api.services.session_store import DEFAULT_SESSION_ID
+from src.logger import get_formatted_logger
+
+logger = get_formatted_logger(__name__)
+
+
+class SocketMessage(BaseModel):
+    """
+    Client message on a chat WebSocket.
+
+    {"type": "chat", "request_id": ..., "query": ..., "session_id": ..., "timeout": ...}
+    starts a turn, {"type": "cancel", "request_id": ...} aborts it and
+    {"type": "ping"} is answered with a pong.
+    """
+    type: str
+    request_id: Optional[str] = None
+    query: Optional[str] = None
+    session_id: Optional[str] = None
+    timeout: Optional[float] = Field(None, gt=0)
+
+
+class ChatSocket:
+    """
+    Serves the conversations multiplexed over one WebSocket connection.
+
+    Every turn runs in its own task and its agent events are sent tagged with
+    the client's `request_id`, so several sessions can stream at once. Each
+    turn ends with exactly one "done" event whose status is "completed",
+    "cancelled", "rejected" or "failed".
+    """
+
+    def __init__(
+        self,
+        agent_chat: Any,
+        admission: AdmissionController,
+        send: Callable[[Dict[str, Any]], Awaitable[None]],
+        max_in_flight: int = 8
+    ):
+        self.agent_chat = agent_chat
+        self.admission = admission
+        self._send = send
+        self.max_in_flight = max_in_flight
+        self._send_lock = asyncio.Lock()
+        self._turns: Dict[str, asyncio.Task] = {}
+        self._closing = False
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        # Turns stream concurrently; keep their frames from interleaving
+        async with self._send_lock:
+            await self._send(message)
+
+    async def handle(self, raw: Any) -> None:
+        """Process one client message; never blocks on a running turn"""
+        try:
+            message = SocketMessage.model_validate(raw)
+        except ValidationError as e:
+            await self.send({"type": "error", "reason": "invalid", "message": str(e)})
+            return
+
+        if message.type == "ping":
+            await self.send({"type": "pong"})
+        elif message.type == "cancel":
+            task = self._turns.get(message.request_id)
+            if task is not None:
+                task.cancel()
+        elif message.type == "chat":
+            await self._start(message)
+        else:
+            await self.send({"type": "error", "reason": "invalid", "message": f"Unknown message type: {message.type}"})
+
+    async def _start(self, message: SocketMessage) -> None:
+        request_id = message.request_id
+        if not request_id or not message.query:
+            await self.send({"type": "error", "reason": "invalid", "request_id": request_id, "message": "chat needs a request_id and a query"})
+        elif request_id in self._turns:
+            await self._done(request_id, "rejected", message="request_id is already in use")
+        elif len(self._turns) >= self.max_in_flight:
+            await self._done(request_id, "rejected", message=f"At most {self.max_in_flight} turns per connection")
+        else:
+            self._turns[request_id] = asyncio.create_task(self._run(message), name=f"ws-turn-{request_id}")
+
+    async def _done(self, request_id: str, status: str, **data: Any) -> None:
+        await self.send({"type": "done", "request_id": request_id, "status": status, **data})
+
+    async def _run(self, message: SocketMessage) -> None:
+        request_id = message.request_id
+        try:
+            async with self.admission.admit(message.session_id or DEFAULT_SESSION_ID, Priority.INTERACTIVE):
+                async for event in self.agent_chat.stream_events(
+                    message.query,
+                    verbose=False,
+                    session_id=message.session_id,
+                    timeout=message.timeout
+                ):
+                    await self.send({"request_id": request_id, **event.to_dict()})
+            await self._done(request_id, "completed")
+        except asyncio.CancelledError:
+            logger.info(f"WebSocket turn {request_id} cancelled")
+            if not self._closing:
+                await self._done(request_id, "cancelled")
+        except AdmissionRejected as e:
+            await self._done(request_id, "rejected", message=str(e), retry_after=e.retry_after)
+        except Exception as e:
+            logger.error(f"WebSocket turn {request_id} failed: {str(e)}")
+            await self._done(request_id, "failed", message=str(e))
+        finally:
+            self._turns.pop(request_id, None)
+
+    async def close(self) -> None:
+        """Cancel the turns still running, e.g. after the client disconnected"""
+        self._closing = True
+        tasks = list(self._turns.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
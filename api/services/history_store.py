@@ -0,0 +1,199 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from llama_index.core.llms import ChatMessage
+from src.logger import get_formatted_logger
+
+logger = get_formatted_logger(__name__)
+
+_FLUSH = object()  # Queue marker asking the writer to commit immediately
+
+
+class SQLiteHistoryStore:
+    """
+    Durable conversation history in a local SQLite file.
+
+    Writes are write-behind: `append` and `delete` only enqueue, and a
+    background thread commits them in batches of up to `batch_size`
+    operations or every `flush_interval` seconds. Reads use their own
+    connection, which WAL mode lets run alongside the writer.
+    """
+
+    def __init__(
+        self,
+        path: str = "data/chat_history.sqlite3",
+        batch_size: int = 200,
+        flush_interval: float = 0.5
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._read_conn = self._connect()
+        self._read_conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_messages ("
+            "session_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, "
+            "content TEXT NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (session_id, seq))"
+        )
+        self._read_conn.commit()
+        self._read_lock = threading.Lock()
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._pending: Dict[str, int] = {}  # Operations per session not yet committed
+        self._pending_lock = threading.Lock()
+        self.stats: Dict[str, int] = {"batches": 0, "rows_written": 0, "errors": 0}
+        self._closed = False
+        self._writer = threading.Thread(target=self._run_writer, name="history-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _enqueue(self, session_id: str, operation: Tuple) -> None:
+        if self._closed:
+            raise RuntimeError("History store is closed")
+        with self._pending_lock:
+            self._pending[session_id] = self._pending.get(session_id, 0) + 1
+        self._queue.put(operation)
+
+    def append(self, session_id: str, start_seq: int, messages: List[ChatMessage]) -> None:
+        """Queue messages for persistence; never blocks on disk"""
+        now = time.time()
+        rows = [
+            (session_id, start_seq + i, getattr(message.role, "value", str(message.role)), message.content or "", now)
+            for i, message in enumerate(messages)
+        ]
+        self._enqueue(session_id, ("append", session_id, rows))
+
+    def delete(self, session_id: str) -> None:
+        """Queue deletion of a session, ordered after its earlier appends"""
+        self._enqueue(session_id, ("delete", session_id, None))
+
+    def load_recent(self, session_id: str, limit: int) -> Tuple[List[ChatMessage], int]:
+        """
+        Return the last `limit` messages of a session and the next sequence number.
+        Blocking; call it off the event loop.
+        """
+        with self._pending_lock:
+            pending = self._pending.get(session_id, 0)
+        if pending:
+            # Let earlier writes of this session land before reading it back
+            try:
+                self.flush()
+            except RuntimeError as e:
+                logger.error(f"Reading history of {session_id} without its pending writes: {str(e)}")
+        with self._read_lock:
+            rows = self._read_conn.execute(
+                "SELECT seq, role, content FROM chat_messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+                (session_id, limit)
+            ).fetchall()
+            if rows:
+                next_seq = rows[0][0] + 1
+            else:
+                next_seq = self._read_conn.execute(
+                    "SELECT COALESCE(MAX(seq), -1) + 1 FROM chat_messages WHERE session_id = ?", (session_id,)
+                ).fetchone()[0]
+        messages = [ChatMessage(role=role, content=content) for _, role, content in reversed(rows)]
+        return messages, next_seq
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """
+        Block until every queued operation is committed, or `timeout` seconds passed.
+        Raises RuntimeError when the writer thread is not running, as nothing would commit them.
+        """
+        if not self._writer.is_alive():
+            raise RuntimeError("History writer is not running")
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not done.wait(0.1 if deadline is None else max(0.0, min(0.1, deadline - time.monotonic()))):
+            if not self._writer.is_alive():
+                raise RuntimeError("History writer stopped before flushing")
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+
+    def _run_writer(self) -> None:
+        conn = self._connect()
+        try:
+            while True:
+                operations, waiters, stop = [], [], False
+                try:
+                    item = self._queue.get()
+                    deadline = time.monotonic() + self.flush_interval
+                    while True:
+                        if item is None:
+                            stop = True
+                            break
+                        if isinstance(item, tuple) and item[0] is _FLUSH:
+                            waiters.append(item[1])
+                            break
+                        operations.append(item)
+                        if len(operations) >= self.batch_size:
+                            break
+                        try:
+                            item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                        except queue.Empty:
+                            break
+                    self._commit(conn, operations)
+                except Exception as e:
+                    # Keep the writer alive: a dead writer would strand every later write and flush
+                    self.stats["errors"] += 1
+                    logger.error(f"Error in chat history writer: {str(e)}")
+                finally:
+                    for waiter in waiters:
+                        waiter.set()
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def _commit(self, conn: sqlite3.Connection, operations: List[Tuple]) -> None:
+        if not operations:
+            return
+        try:
+            with conn:
+                for kind, session_id, rows in operations:
+                    if kind == "append":
+                        conn.executemany(
+                            "INSERT OR REPLACE INTO chat_messages (session_id, seq, role, content, created_at) "
+                            "VALUES (?, ?, ?, ?, ?)",
+                            rows
+                        )
+                        self.stats["rows_written"] += len(rows)
+                    else:
+                        conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
+            self.stats["batches"] += 1
+        except Exception as e:
+            # The batch is dropped; sqlite errors, bad rows and the like must not stop the writer
+            self.stats["errors"] += 1
+            logger.error(f"Error persisting chat history: {str(e)}")
+        finally:
+            with self._pending_lock:
+                for operation in operations:
+                    session_id = operation[1]
+                    remaining = self._pending.get(session_id, 0) - 1
+                    if remaining > 0:
+                        self._pending[session_id] = remaining
+                    else:
+                        self._pending.pop(session_id, None)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {**self.stats, "queued": self._queue.qsize()}
+
+    def close(self) -> None:
+        """Flush pending writes and stop the writer thread; blocking, call it off the event loop"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        self._read_conn.close()
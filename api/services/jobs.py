@@ -0,0 +1,220 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from src.logger import get_formatted_logger
+
+logger = get_formatted_logger(__name__)
+
+
+class JobStatus(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_STATUSES = (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class JobQueueFullError(RuntimeError):
+    pass
+
+
+@dataclass
+class Job:
+    job_id: str
+    query: str
+    session_id: Optional[str] = None
+    timeout: Optional[float] = None
+    status: JobStatus = JobStatus.QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[str] = None
+    error: Optional[str] = None
+    events: List[Dict[str, Any]] = field(default_factory=list)  # Progress events, replayed to late subscribers
+    changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+    expires_at: Optional[float] = None  # Monotonic time after which a finished job is forgotten
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def add_event(self, event: Dict[str, Any]) -> None:
+        self.events.append(event)
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status.value,
+            "session_id": self.session_id,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+            "events": len(self.events),
+        }
+
+
+# Runs a job and yields its agent events; the text of "token" events makes up the result
+JobRunner = Callable[[Job], AsyncIterator[Dict[str, Any]]]
+
+
+class JobManager:
+    """
+    Runs long agent requests in the background.
+
+    `submit` returns immediately; `workers` tasks take jobs from a queue of at
+    most `max_queue` entries and run them with `runner`, recording every
+    agent event as a progress event. Finished jobs are kept for `result_ttl`
+    seconds (and at most `max_jobs` in total) so clients can poll for them.
+    """
+
+    def __init__(
+        self,
+        runner: JobRunner,
+        workers: int = 4,
+        max_queue: int = 100,
+        result_ttl: float = 3600.0,
+        max_jobs: int = 10_000
+    ):
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self.stats: Dict[str, int] = {"submitted": 0, "rejected": 0, "succeeded": 0, "failed": 0, "cancelled": 0, "expired": 0}
+
+    def _start_workers(self) -> None:
+        # Started on first use, inside the serving event loop
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        if not self._worker_tasks:
+            self._worker_tasks = [asyncio.create_task(self._work(), name=f"job-worker-{i}") for i in range(self.workers)]
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.expires_at is not None and job.expires_at <= now]:
+            del self._jobs[job_id]
+            self.stats["expired"] += 1
+        # Over capacity: forget the oldest finished jobs first
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished][:max(0, len(self._jobs) - self.max_jobs)]:
+            del self._jobs[job_id]
+            self.stats["expired"] += 1
+
+    def submit(self, query: str, session_id: Optional[str] = None, timeout: Optional[float] = None) -> Job:
+        """Queue a job; raises JobQueueFullError when the queue is full"""
+        self._start_workers()
+        self._evict()
+        job = Job(job_id=uuid.uuid4().hex, query=query, session_id=session_id, timeout=timeout)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise JobQueueFullError(f"Too many queued jobs ({self.max_queue})")
+        self._jobs[job.job_id] = job
+        self.stats["submitted"] += 1
+        job.add_event({"type": "status", "status": job.status.value})
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._evict()
+        return self._jobs.get(job_id)
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job, returning once it is marked cancelled"""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return job
+        if job.task is not None:
+            job.task.cancel()
+            await asyncio.wait({job.task})
+        else:
+            # Still queued: the worker skips it
+            self._finish(job, JobStatus.CANCELLED)
+        return job
+
+    def _finish(self, job: Job, status: JobStatus, result: Optional[str] = None, error: Optional[str] = None) -> None:
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        job.expires_at = time.monotonic() + self.result_ttl
+        self.stats[status.value] += 1
+        job.add_event({"type": "status", "status": status.value, "result": result, "error": error})
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                if not job.finished:
+                    job.task = asyncio.create_task(self._run(job))
+                    try:
+                        # Cancelling a job cancels its task only; _run records the cancellation
+                        await asyncio.shield(job.task)
+                    except asyncio.CancelledError:
+                        # The worker itself is shutting down
+                        job.task.cancel()
+                        raise
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        job.status = JobStatus.RUNNING
+        job.started_at = time.time()
+        job.add_event({"type": "status", "status": job.status.value})
+        output = []
+        try:
+            async for event in self.runner(job):
+                if event.get("type") == "token":
+                    output.append(event["text"])
+                job.add_event(event)
+        except asyncio.CancelledError:
+            self._finish(job, JobStatus.CANCELLED, "".join(output) or None)
+        except Exception as e:
+            logger.error(f"Job {job.job_id} failed: {str(e)}")
+            self._finish(job, JobStatus.FAILED, "".join(output) or None, str(e))
+        else:
+            self._finish(job, JobStatus.SUCCEEDED, "".join(output))
+
+    async def subscribe(self, job: Job, start: int = 0) -> AsyncIterator[Dict[str, Any]]:
+        """Replay the events of a job from `start`, then follow it live until it finishes"""
+        index = start
+        while True:
+            changed = job.changed
+            while index < len(job.events):
+                yield job.events[index]
+                index += 1
+            if job.finished:
+                return
+            await changed.wait()
+
+    def get_stats(self) -> Dict[str, Any]:
+        by_status = {status.value: 0 for status in JobStatus}
+        for job in self._jobs.values():
+            by_status[job.status.value] += 1
+        return {
+            **self.stats,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "workers": self.workers,
+            "jobs": by_status,
+        }
+
+    async def close(self) -> None:
+        """Stop the workers, cancelling running jobs"""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
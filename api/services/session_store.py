@@ -0,0 +1,246 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+from llama_index.core.llms import ChatMessage
+from src.logger import get_formatted_logger
+from api.services.history_store import SQLiteHistoryStore
+from api.services.state_backend import StateBackend
+
+logger = get_formatted_logger(__name__)
+
+DEFAULT_SESSION_ID = "default"
+
+
+@dataclass
+class Session:
+    session_id: str
+    history: List[ChatMessage] = field(default_factory=list)
+    lock: Any = field(default_factory=asyncio.Lock)  # Async context manager serializing turns of one conversation
+    last_access: float = field(default_factory=time.monotonic)
+    size: int = 0  # Characters held in history, counted against the store's memory cap
+    next_seq: int = 0  # Sequence number of the next persisted message
+    loaded: bool = False  # Whether recent turns were paged in from the history backend
+    turns: int = 0  # Turns running or waiting for the lock; such a session is never evicted
+
+
+class SessionStore:
+    """
+    In-process conversation store keyed by session id.
+
+    Sessions are kept in LRU order and evicted when idle for longer than
+    `idle_ttl`, when there are more than `max_sessions`, or when the history of
+    all sessions together exceeds `max_total_chars`. Sessions with a turn in
+    progress are skipped, so a conversation never gets a second lock and history
+    while one of its turns runs. With a `history_backend`,
+    appended turns are also persisted (write-behind) and an evicted or
+    restarted session pages its recent turns back in on first access.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 10_000,
+        idle_ttl: Optional[float] = 3600.0,
+        max_history: int = 10,
+        max_total_chars: int = 50_000_000,
+        history_backend: Optional[SQLiteHistoryStore] = None
+    ):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_history = max_history  # Messages kept per session
+        self.max_total_chars = max_total_chars
+        self.history_backend = history_backend
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._total_chars = 0
+        self.evictions: Dict[str, int] = {"idle": 0, "capacity": 0, "memory": 0}
+
+    @staticmethod
+    def _message_size(message: ChatMessage) -> int:
+        return len(message.content or "")
+
+    def _drop(self, session_id: str, reason: str) -> None:
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._total_chars -= session.size
+            self.evictions[reason] += 1
+            logger.debug(f"Evicted session {session_id} ({reason})")
+
+    @staticmethod
+    def _busy(session: Session) -> bool:
+        return session.turns > 0 or session.lock.locked()
+
+    def _evictable(self, keep: Optional[str] = None) -> Iterator[str]:
+        """Ids of idle sessions, least recently used first"""
+        for session_id, session in list(self._sessions.items()):
+            if session_id != keep and not self._busy(session):
+                yield session_id
+
+    def _evict_expired(self) -> None:
+        if self.idle_ttl is None:
+            return
+        deadline = time.monotonic() - self.idle_ttl
+        # Sessions are in access order, so expired ones are at the front
+        for session_id in self._evictable():
+            if self._sessions[session_id].last_access > deadline:
+                break
+            self._drop(session_id, "idle")
+
+    def _enforce_limits(self, keep: Optional[str] = None) -> None:
+        candidates = self._evictable(keep)
+        while len(self._sessions) > self.max_sessions:
+            oldest = next(candidates, None)
+            if oldest is None:
+                return
+            self._drop(oldest, "capacity")
+        while self._total_chars > self.max_total_chars and len(self._sessions) > 1:
+            oldest = next(candidates, None)
+            if oldest is None:
+                return
+            self._drop(oldest, "memory")
+
+    def get(self, session_id: Optional[str] = None) -> Session:
+        """Return the session, creating it if needed, and mark it as recently used"""
+        session_id = session_id or DEFAULT_SESSION_ID
+        self._evict_expired()
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = Session(session_id=session_id)
+            self._sessions[session_id] = session
+            self._enforce_limits(keep=session_id)
+        else:
+            self._sessions.move_to_end(session_id)
+        session.last_access = time.monotonic()
+        return session
+
+    @asynccontextmanager
+    async def turn(self, session: Session) -> AsyncIterator[Session]:
+        """Run one turn of a conversation: holds its lock and keeps it from being evicted"""
+        session.turns += 1
+        try:
+            async with session.lock:
+                yield session
+        finally:
+            session.turns -= 1
+
+    async def ensure_loaded(self, session: Session) -> None:
+        """Page the recent turns of a session in from the history backend, once"""
+        if session.loaded:
+            return
+        session.loaded = True
+        if self.history_backend is None:
+            return
+        history, next_seq = await asyncio.to_thread(self.history_backend.load_recent, session.session_id, self.max_history)
+        size = sum(self._message_size(message) for message in history)
+        session.history = history + session.history
+        session.next_seq = max(session.next_seq, next_seq)
+        session.size += size
+        if self._sessions.get(session.session_id) is session:
+            self._total_chars += size
+
+    async def append(self, session: Session, *messages: ChatMessage) -> None:
+        """Append messages to a session, trimming it to `max_history` messages"""
+        if self.history_backend is not None:
+            self.history_backend.append(session.session_id, session.next_seq, list(messages))
+        session.next_seq += len(messages)
+        session.history.extend(messages)
+        trimmed = session.history[:-self.max_history] if len(session.history) > self.max_history else []
+        session.history = session.history[-self.max_history:]
+        delta = sum(self._message_size(message) for message in messages) - sum(self._message_size(message) for message in trimmed)
+        session.size += delta
+        if self._sessions.get(session.session_id) is session:
+            self._total_chars += delta
+            self._enforce_limits(keep=session.session_id)
+
+    async def reset(self, session_id: Optional[str] = None) -> None:
+        session_id = session_id or DEFAULT_SESSION_ID
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._total_chars -= session.size
+            session.history = []
+            session.size = 0
+            session.loaded = True
+        if self.history_backend is not None:
+            self.history_backend.delete(session_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {
+            "sessions": len(self._sessions),
+            "total_chars": self._total_chars,
+            "evictions": dict(self.evictions),
+        }
+        if self.history_backend is not None:
+            stats["persistence"] = self.history_backend.get_stats()
+        return stats
+
+    def close(self) -> None:
+        if self.history_backend is not None:
+            self.history_backend.close()
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class SharedSessionStore:
+    """
+    Session store on a StateBackend, for running the API under several
+    workers or nodes: history is read from the backend at the start of every
+    turn and the session lock is held in the backend, so any worker can serve
+    any turn.
+    """
+
+    def __init__(
+        self,
+        backend: StateBackend,
+        max_history: int = 10,
+        idle_ttl: Optional[float] = 7 * 24 * 3600.0,
+        lock_ttl: float = 300.0
+    ):
+        self.backend = backend
+        self.max_history = max_history
+        self.idle_ttl = idle_ttl  # Seconds an untouched conversation is kept in the backend
+        self.lock_ttl = lock_ttl  # Upper bound on a turn, after which a crashed worker's lock expires
+
+    def get(self, session_id: Optional[str] = None) -> Session:
+        session_id = session_id or DEFAULT_SESSION_ID
+        return Session(session_id=session_id, lock=self.backend.lock(f"session:{session_id}", ttl=self.lock_ttl))
+
+    @asynccontextmanager
+    async def turn(self, session: Session) -> AsyncIterator[Session]:
+        """Run one turn of a conversation under its lock in the backend"""
+        async with session.lock:
+            yield session
+
+    async def ensure_loaded(self, session: Session) -> None:
+        if session.loaded:
+            return
+        session.loaded = True
+        items = await self.backend.list_tail(f"history:{session.session_id}", self.max_history)
+        session.history = [ChatMessage(**json.loads(item)) for item in items]
+        session.size = sum(len(message.content or "") for message in session.history)
+
+    async def append(self, session: Session, *messages: ChatMessage) -> None:
+        await self.backend.list_append(
+            f"history:{session.session_id}",
+            [
+                json.dumps({"role": getattr(message.role, "value", str(message.role)), "content": message.content or ""}, ensure_ascii=False)
+                for message in messages
+            ],
+            max_len=self.max_history,
+            ttl=self.idle_ttl
+        )
+        session.history = (session.history + list(messages))[-self.max_history:]
+
+    async def reset(self, session_id: Optional[str] = None) -> None:
+        await self.backend.delete(f"history:{session_id or DEFAULT_SESSION_ID}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": type(self.backend).__name__}
+
+    def close(self) -> None:
+        pass
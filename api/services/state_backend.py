@@ -0,0 +1,228 @@
+import asyncio
+import json
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from dataclasses import asdict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from src.agents.utils import StickyRoute
+from src.logger import get_formatted_logger
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Optional dependency, only needed for redis:// backends
+    aioredis = None
+
+logger = get_formatted_logger(__name__)
+
+
+class StateBackend(ABC):
+    """
+    Key-value state shared by every worker serving the API.
+
+    Values are strings; lists hold conversation turns. `lock` serializes work
+    on a key across workers (e.g. the turns of one session).
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        pass
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        pass
+
+    @abstractmethod
+    async def list_append(self, key: str, values: List[str], max_len: Optional[int] = None, ttl: Optional[float] = None) -> None:
+        """Append values to a list, keeping only its last `max_len` items"""
+        pass
+
+    @abstractmethod
+    async def list_tail(self, key: str, count: int) -> List[str]:
+        """The last `count` items of a list, oldest first"""
+        pass
+
+    @abstractmethod
+    def lock(self, key: str, ttl: float = 120.0):
+        """Async context manager holding an exclusive lock on a key for at most `ttl` seconds"""
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryStateBackend(StateBackend):
+    """Process-local backend; state is not shared between workers"""
+
+    def __init__(self):
+        self._values: Dict[str, Tuple[Any, Optional[float]]] = {}
+        # Lock and number of holders/waiters per key; dropped once nobody uses it
+        self._locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+
+    def _get_entry(self, key: str) -> Optional[Any]:
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._values[key]
+            return None
+        return value
+
+    @staticmethod
+    def _expiry(ttl: Optional[float]) -> Optional[float]:
+        return time.monotonic() + ttl if ttl else None
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self._get_entry(key)
+        return value if isinstance(value, str) else None
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        self._values[key] = (value, self._expiry(ttl))
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._values.pop(key, None)
+
+    async def list_append(self, key: str, values: List[str], max_len: Optional[int] = None, ttl: Optional[float] = None) -> None:
+        items = list(self._get_entry(key) or []) + list(values)
+        if max_len is not None:
+            items = items[-max_len:]
+        self._values[key] = (items, self._expiry(ttl))
+
+    async def list_tail(self, key: str, count: int) -> List[str]:
+        items = self._get_entry(key) or []
+        return list(items[-count:]) if count > 0 else []
+
+    @asynccontextmanager
+    async def lock(self, key: str, ttl: float = 120.0) -> AsyncIterator[None]:
+        lock, users = self._locks.get(key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._locks[key] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[key]
+            if users == 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
+
+
+class RedisStateBackend(StateBackend):
+    """
+    Backend on a Redis-compatible server, shared by every worker and node.
+
+    `client` may be any redis.asyncio compatible client (e.g. fakeredis in tests).
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", client: Any = None, namespace: str = "agent"):
+        if client is None:
+            if aioredis is None:
+                raise ImportError("RedisStateBackend requires the 'redis' package: pip install redis")
+            client = aioredis.from_url(url, decode_responses=True)
+        self.client = client
+        self.namespace = namespace
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    @staticmethod
+    def _decode(value: Any) -> Any:
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._decode(await self.client.get(self._key(key)))
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        await self.client.set(self._key(key), value, px=int(ttl * 1000) if ttl else None)
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*[self._key(key) for key in keys])
+
+    async def list_append(self, key: str, values: List[str], max_len: Optional[int] = None, ttl: Optional[float] = None) -> None:
+        if not values:
+            return
+        full_key = self._key(key)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.rpush(full_key, *values)
+            if max_len is not None:
+                pipe.ltrim(full_key, -max_len, -1)
+            if ttl:
+                pipe.pexpire(full_key, int(ttl * 1000))
+            await pipe.execute()
+
+    async def list_tail(self, key: str, count: int) -> List[str]:
+        if count <= 0:
+            return []
+        return [self._decode(value) for value in await self.client.lrange(self._key(key), -count, -1)]
+
+    @asynccontextmanager
+    async def lock(
+        self,
+        key: str,
+        ttl: float = 120.0,
+        poll_interval: float = 0.01,
+        max_poll_interval: float = 0.5
+    ) -> AsyncIterator[None]:
+        # SET NX with an owner token; released with WATCH/MULTI so an expired lock
+        # taken over by another worker is never deleted (no server-side scripting needed).
+        # Waiters back off exponentially up to `max_poll_interval` so a long turn does not
+        # cost a Redis round trip every few milliseconds per waiting request.
+        full_key, token = self._key(f"lock:{key}"), uuid.uuid4().hex
+        delay = poll_interval
+        while not await self.client.set(full_key, token, nx=True, px=int(ttl * 1000)):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_poll_interval)
+        try:
+            yield
+        finally:
+            async with self.client.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(full_key)
+                    if self._decode(await pipe.get(full_key)) == token:
+                        pipe.multi()
+                        pipe.delete(full_key)
+                        await pipe.execute()
+                    else:
+                        logger.warning(f"Lock {full_key} expired before release")
+                except aioredis.WatchError:
+                    logger.warning(f"Lock {full_key} changed hands before release")
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def create_state_backend(url: Optional[str]) -> StateBackend:
+    """Backend for a URL: "memory://" (default) or "redis://host:port/db" """
+    if not url or url.startswith("memory://"):
+        return InMemoryStateBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStateBackend(url)
+    raise ValueError(f"Unsupported state backend: {url}")
+
+
+class BackendRouteStore:
+    """Sticky routes (see StickyRouteStore) kept in a StateBackend so every worker sees them"""
+
+    def __init__(self, backend: StateBackend, ttl: Optional[float] = 3600.0):
+        self.backend = backend
+        self.ttl = ttl
+
+    async def get(self, session_id: str) -> Optional[StickyRoute]:
+        raw = await self.backend.get(f"route:{session_id}")
+        return StickyRoute(**json.loads(raw)) if raw else None
+
+    async def set(self, session_id: str, route: StickyRoute) -> None:
+        await self.backend.set(f"route:{session_id}", json.dumps(asdict(route)), ttl=self.ttl)
+
+    async def delete(self, session_id: str) -> None:
+        await self.backend.delete(f"route:{session_id}")
@@ -1,12 +1,38 @@
-from fastapi import FastAPI
+import time
+_import_started = time.perf_counter()
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from api.routers.agent import agent_router  # Import the router we just created
+from api.routers.agent import agent_router, agent_service, jobs  # Import the router we just created
+
+# Seconds spent importing the app; `python -X importtime -c "import app_fastapi"` breaks it down by module
+IMPORT_SECONDS = time.perf_counter() - _import_started
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the agent service up in the background: /health answers right away and /ready
+    # once the LLM client is initialized. With AGENT_WARM_UP=0 it is built on first use.
+    warm_up = None
+    if os.getenv("AGENT_WARM_UP", "1") != "0":
+        warm_up = asyncio.create_task(agent_service.warm_up())
+        # Failures are reported by /ready and retried on the next request
+        warm_up.add_done_callback(lambda task: task.cancelled() or task.exception())
+    yield
+    # Stop background jobs and flush write-behind chat history before the process exits
+    if warm_up is not None:
+        warm_up.cancel()
+    await jobs.close()
+    await agent_service.close()
 
 # Create FastAPI app
 app = FastAPI(
     title="Multi-Agent Chat API",
     description="API for interacting with multi-agent chat system",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware to allow Streamlit to communicate with the API
@@ -24,4 +50,18 @@ app.include_router(agent_router)
 # Optional: Add a health check endpoint
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+# Readiness: 503 until the agent service is warmed up, so load balancers hold traffic back
+@app.get("/ready")
+async def readiness_check(response: Response):
+    status = agent_service.get_status()
+    if not status["ready"]:
+        response.status_code = 503
+    return {
+        "status": "ready" if status["ready"] else ("failed" if status["error"] else "starting"),
+        "import_seconds": IMPORT_SECONDS,
+        # From the start of the app import until the agent service was warmed up
+        "time_to_ready_seconds": agent_service.ready_at - _import_started if agent_service.ready_at else None,
+        **status,
+    }
@@ -4,15 +4,23 @@ import requests
 import json
 from typing import List, Dict, Iterator, Optional
 import time
+import uuid
 from dotenv import load_dotenv
+from websockets.exceptions import ConnectionClosed
+from websockets.sync.client import connect as connect_websocket
 
 load_dotenv()
 # Get API URL from environment variable, with a default fallback
 API_URL = os.getenv('API_URL', 'http://localhost:8000')
+# WebSocket endpoint; one connection per browser session is reused across turns
+WS_URL = os.getenv('WS_URL', API_URL.replace('http', 'ws', 1) + '/agent/ws')
 
 def initialize_session_state():
     if 'messages' not in st.session_state:
         st.session_state.messages = []
+    if 'session_id' not in st.session_state:
+        # Keeps this browser session's conversation separate on the API
+        st.session_state.session_id = str(uuid.uuid4())
 
 def add_message(role: str, content: str):
     st.session_state.messages.append({"role": role, "content": content})
@@ -31,7 +39,7 @@ def get_agent_response(prompt: str) -> str:
         # Use the environment variable for the API URL
         full_url = f"{API_URL}/agent/chat"
         
-        response = requests.post(full_url, json={"query": prompt})
+        response = requests.post(full_url, json={"query": prompt, "session_id": st.session_state.session_id})
         response.raise_for_status()  # Raise an error for bad responses
         
         return response.json()['response']
@@ -39,35 +47,103 @@ def get_agent_response(prompt: str) -> str:
         st.error(f"Error communicating with agent: {e}")
         return "Sorry, there was an error processing your request."
 
-def stream_agent_response(prompt: str) -> Iterator[str]:
+def get_agent_socket():
+    """Open the WebSocket of this browser session, or reuse the one already open"""
+    if st.session_state.get('agent_socket') is None:
+        st.session_state.agent_socket = connect_websocket(WS_URL)
+    return st.session_state.agent_socket
+
+def stream_agent_socket_response(prompt: str) -> Iterator[Dict]:
     """
-    Stream response from agent API
+    Stream response events over the session's WebSocket
     
     Args:
         prompt (str): User input query
     
     Returns:
-        Iterator[str]: Stream of response chunks
+        Iterator[Dict]: Stream of agent events, as from stream_agent_response
     """
+    socket = get_agent_socket()
+    request_id = str(uuid.uuid4())
+    socket.send(json.dumps({"type": "chat", "request_id": request_id, "query": prompt, "session_id": st.session_state.session_id}))
+    finished = False
+    try:
+        while True:
+            event = json.loads(socket.recv())
+            # Skip leftovers of a turn that was stopped earlier
+            if event.get("request_id") != request_id:
+                continue
+            if event["type"] == "done":
+                finished = True
+                if event["status"] != "completed":
+                    yield {"type": "final", "text": event.get("message") or "Sorry, there was an error processing your request."}
+                return
+            yield event
+    finally:
+        if not finished:
+            # The run was stopped (e.g. the user sent a new message): stop the agent as well
+            try:
+                socket.send(json.dumps({"type": "cancel", "request_id": request_id}))
+            except ConnectionClosed:
+                pass
+
+def stream_agent_response(prompt: str) -> Iterator[Dict]:
+    """
+    Stream response events from agent API, falling back to the HTTP stream
+    when the WebSocket cannot be used
+    
+    Args:
+        prompt (str): User input query
+    
+    Returns:
+        Iterator[Dict]: Stream of agent events ("routing", "step_start", "token", ..., "final")
+    """
+    try:
+        events = stream_agent_socket_response(prompt)
+        first = next(events)
+    except (OSError, ConnectionClosed):
+        st.session_state.agent_socket = None
+    else:
+        yield first
+        try:
+            yield from events
+        except (OSError, ConnectionClosed) as e:
+            st.session_state.agent_socket = None
+            st.error(f"Error streaming from agent: {e}")
+            yield {"type": "final", "text": "Sorry, there was an error processing your request."}
+        return
+
     try:
         # Use the environment variable for the API URL
         full_url = f"{API_URL}/agent/stream"
         
         # Make a streaming request to the server
-        with requests.post(full_url, json={"query": prompt}, stream=True) as response:
+        with requests.post(full_url, json={"query": prompt, "session_id": st.session_state.session_id}, stream=True) as response:
             response.raise_for_status()
             
-            # Process server-sent events
-            for line in response.iter_lines():
-                if line:
-                    # SSE format: "data: {chunk}"
-                    chunk = line.decode('utf-8')
-                    if chunk == "[DONE]":
-                        break
-                    yield chunk
+            # Process server-sent events: "event: <type>" followed by "data: <json>"
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                event = json.loads(line[len("data:"):])
+                yield event
+                if event["type"] == "final":
+                    break
     except requests.RequestException as e:
         st.error(f"Error streaming from agent: {e}")
-        yield "Sorry, there was an error processing your request."
+        yield {"type": "final", "text": "Sorry, there was an error processing your request."}
+
+def describe_event(event: Dict) -> Optional[str]:
+    """Short progress line for a non-token event, None for events not worth showing"""
+    if event["type"] == "routing" and event.get("agent_id"):
+        return f"Routed to {event['agent_id']}"
+    if event["type"] == "plan":
+        return f"Planned {len(event.get('steps', []))} steps"
+    if event["type"] == "step_start":
+        return f"Running: {event.get('description') or event.get('step')}"
+    if event["type"] == "tool_call":
+        return f"Calling tool {event.get('tool')}"
+    return None
 
 def reset_chat_history():
     """
@@ -76,7 +152,7 @@ def reset_chat_history():
     try:
         full_url = f"{API_URL}/agent/reset"
         
-        response = requests.post(full_url)
+        response = requests.post(full_url, json={"session_id": st.session_state.session_id})
         response.raise_for_status()
         
         # Clear local session state messages
@@ -106,14 +182,27 @@ def main():
 
         # Get agent response with streaming
         with st.chat_message("assistant"):
+            progress_placeholder = st.empty()
             response_placeholder = st.empty()
             full_response = ""
             
             # Stream the response
-            for chunk in stream_agent_response(prompt):
-                full_response += chunk
-                response_placeholder.markdown(full_response + "▌")
-                time.sleep(0.01)  # Small delay for smoother animation
+            for event in stream_agent_response(prompt):
+                if event["type"] == "token":
+                    full_response += event["text"]
+                    response_placeholder.markdown(full_response + "▌")
+                    time.sleep(0.01)  # Small delay for smoother animation
+                elif event["type"] == "refined":
+                    # Validation replaced the streamed answer
+                    full_response = event["text"]
+                    response_placeholder.markdown(full_response + "▌")
+                elif event["type"] == "final":
+                    full_response = event["text"]
+                elif event["type"] == "error":
+                    st.warning(event.get("message", "The agent ran into an error"))
+                elif progress := describe_event(event):
+                    progress_placeholder.caption(progress)
+            progress_placeholder.empty()
             
             # Update with the final response (without cursor)
             response_placeholder.markdown(full_response)
@@ -1,10 +1,10 @@
 from .planning_agent import PlanningAgent
 from .reflection_agent import ReflectionAgent
 from .base import BaseAgent, AgentOptions
-from .manager_agent import ManagerAgent
+from .manager_agent import ManagerAgent, ValidationMode
 __all__ = [
     "PlanningAgent", 
     "ReflectionAgent",
-    "ManagerAgent","BaseAgent", "AgentOptions"
+    "ManagerAgent","BaseAgent", "AgentOptions", "ValidationMode"
 ]
 
@@ -4,11 +4,16 @@ import datetime
 from enum import Enum
 import json
 from typing import Any, Dict, Generator, List, Optional, Union
-from src.agents.utils import clean_json_response
+from src.agents.utils import clean_json_response, validate_arguments, ToolIndex, DeadlineExceeded, emit_event
+from src.logger import get_formatted_logger
 from src.agents.llm import BaseLLM
 from llama_index.core.llms import ChatMessage
 from typing import AsyncGenerator
 from llama_index.core.tools import FunctionTool
+# Module import: src.tools.tool_executor itself imports src.agents.llm
+from src.tools import tool_executor as tool_execution
+
+logger = get_formatted_logger(__file__)
 
 # Base Types and Data Classes
 class AgentType(Enum):
@@ -50,6 +55,9 @@ class AgentOptions:
     region: Optional[str] = None
     save_chat: bool = True
     callbacks: Optional[AgentCallbacks] = None
+    examples: List[str] = field(default_factory=list)  # Example utterances used for local routing
+    tool_top_k: int = 5  # Tool signatures included per prompt, the most relevant to the step
+    tool_executor: Optional[Any] = None  # ToolExecutor running this agent's tools, the shared default if None
     
 @dataclass
 class Message:
@@ -69,8 +77,12 @@ class BaseAgent(ABC):
         self.region = options.region
         self.save_chat = options.save_chat
         self.callbacks = options.callbacks or AgentCallbacks()
+        self.examples = options.examples
         self.tools = tools
         self.tools_dict = {tool.metadata.name: tool for tool in tools}
+        self.tool_index = ToolIndex(tools, top_k=options.tool_top_k)
+        # Caches, deduplicates and isolates tool calls
+        self.tool_executor: "tool_execution.ToolExecutor" = options.tool_executor or tool_execution.default_tool_executor
         
     @staticmethod
     def generate_key_from_name(name: str) -> str:
@@ -84,39 +96,85 @@ class BaseAgent(ABC):
         """Create a system message with the given prompt"""
         return ChatMessage(role="system", content=prompt)
     
-    def _format_tool_signatures(self) -> str:
-        """Format all tool signatures into a string format LLM can understand"""
+    def _format_tool_signatures(self, query: Optional[str] = None) -> str:
+        """
+        Format tool signatures into a string format LLM can understand.
+        With a query, only the `tool_top_k` most relevant tools are included.
+        """
         if not self.tools:
             return "No tools are available. Respond based on your general knowledge only."
-            
-        tool_descriptions = []
-        for tool in self.tools:
-            metadata = tool.metadata
-            parameters = metadata.get_parameters_dict()
-            
-            tool_descriptions.append(
-                f"""
-                Function: {metadata.name}
-                Description: {metadata.description}
-                Parameters: {json.dumps(parameters, indent=2)}
-                """
-            )
-        
-        return "\n".join(tool_descriptions)
+        return self.tool_index.format(query)
+
+    def _select_tools(self, query: Optional[str] = None) -> List[FunctionTool]:
+        """The tools most relevant to a query, for native function calling"""
+        return self.tool_index.search(query)
+
+    def get_tool_prompt_stats(self) -> Dict[str, float]:
+        return self.tool_index.get_stats()
     
-    async def _execute_tool(self, tool_name: str, description: str,requires_tool: bool) -> Optional[Any]:
-        """Execute a tool with better error handling"""
+    async def _execute_tool(
+        self,
+        tool_name: str,
+        description: str,
+        requires_tool: bool,
+        arguments: Optional[Dict[str, Any]] = None
+    ) -> Optional[Any]:
+        """
+        Execute a tool with better error handling.
+
+        Inline `arguments` (e.g. emitted by the planner) are validated against the
+        tool schema and used directly; the LLM is only asked to generate
+        arguments when they are missing or invalid.
+        """
         if not requires_tool or not tool_name:
             return None
   
         tool = self.tools_dict.get(tool_name)
         if not tool:
             return None
+
+        try:
+            if arguments is not None:
+                errors = validate_arguments(arguments, tool.metadata.get_parameters_dict())
+                if not errors:
+                    emit_event("tool_call", agent=self.name, tool=tool_name, arguments=arguments)
+                    return await self.tool_executor.acall(tool, **arguments)
+                logger.warning(f"Inline arguments for tool {tool_name} are invalid, regenerating: {'; '.join(errors)}")
+
+            arguments = await self._resolve_tool_arguments(tool, description)
+            emit_event("tool_call", agent=self.name, tool=tool_name, arguments=arguments)
+            result = await self.tool_executor.acall(tool, **arguments)
+            return result
             
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            if requires_tool:
+                raise
+            return None
+
+    async def _resolve_tool_arguments(self, tool: FunctionTool, description: str) -> Dict[str, Any]:
+        """
+        Get the arguments of a tool call from the LLM, through native function
+        calling when the provider supports it and a JSON prompt otherwise.
+        """
+        if self.llm.supports_function_calling:
+            response = await self.llm.achat_with_tools(
+                f"Call the tool for this step: {description}",
+                [tool],
+                tool_choice=tool.metadata.name
+            )
+            if response.tool_calls:
+                return response.tool_calls[0].arguments
+        params = await self._generate_tool_arguments(tool, description)
+        return params['arguments']
+
+    async def _generate_tool_arguments(self, tool: FunctionTool, description: str) -> Dict[str, Any]:
+        """Ask the LLM for the arguments of a tool call"""
         prompt = f"""
         Generate parameters to call this tool:
         Step: {description}
-        Tool: {tool_name}
+        Tool: {tool.metadata.name}
         
         Tool specification:
         {json.dumps(tool.metadata.get_parameters_dict(), indent=2)}
@@ -128,19 +186,9 @@ class BaseAgent(ABC):
             }}
         }}
         """
-        
-        try:
-            response = await self.llm.achat(query=prompt)
-            response = clean_json_response(response)
-            params = json.loads(response)
-            
-            result = await tool.acall(**params['arguments'])
-            return result
-            
-        except Exception as e:
-            if requires_tool:
-                raise
-            return None
+        response = await self.llm.achat(query=prompt)
+        response = clean_json_response(response)
+        return json.loads(response)
         
     @abstractmethod
     def chat(
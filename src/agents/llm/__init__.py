@@ -1,7 +1,20 @@
-from .base import BaseLLM
+from .base import BaseLLM, ToolCall, ToolCallResponse
 from .unified_llm import UnifiedLLM
+from .cache import CacheBackend, MemoryCache, SQLiteCache, ResponseCache
+from .singleflight import SingleFlight
+from .mock import MockLLM, MockLLMConfig, LatencyConfig
 
 __all__ = [
     "BaseLLM", 
+    "ToolCall",
+    "ToolCallResponse",
     "UnifiedLLM",
+    "CacheBackend",
+    "MemoryCache",
+    "SQLiteCache",
+    "ResponseCache",
+    "SingleFlight",
+    "MockLLM",
+    "MockLLMConfig",
+    "LatencyConfig",
 ]
@@ -1,16 +1,30 @@
 from abc import ABC, abstractmethod
 from contextlib import asynccontextmanager
-from typing import Any, AsyncGenerator, Generator, List, Optional
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, Dict, Generator, List, Optional, Sequence
 from llama_index.core.llms import ChatMessage
-# from llama_index.llms.anthropic import Anthropic
-from llama_index.llms.gemini import Gemini
-# from llama_index.llms.openai import OpenAI
+from llama_index.core.tools import BaseTool
+# SDK của các provider (Gemini, ...) được import khi khởi tạo model, không phải khi import module
 from src.config import Config
 from src.logger import get_formatted_logger
+from .mock import MockLLM, MockLLMConfig
 
 
 logger = get_formatted_logger(__file__)
 
+@dataclass
+class ToolCall:
+    """Một lời gọi tool có cấu trúc do model trả về"""
+    tool_name: str
+    arguments: Dict[str, Any] = field(default_factory=dict)
+    tool_id: Optional[str] = None
+
+@dataclass
+class ToolCallResponse:
+    """Kết quả của achat_with_tools: nội dung text và các tool call"""
+    content: str = ""
+    tool_calls: List[ToolCall] = field(default_factory=list)
+
 class BaseLLM(ABC):
     def __init__(
         self, 
@@ -19,7 +33,8 @@ class BaseLLM(ABC):
         model_id: str, 
         temperature: float, 
         max_tokens: int, 
-        system_prompt: str
+        system_prompt: str,
+        mock_config: Optional[MockLLMConfig] = None
     ):
         """
         Khởi tạo base LLM class.
@@ -31,6 +46,7 @@ class BaseLLM(ABC):
             temperature (float): Nhiệt độ cho việc sinh text
             max_tokens (int): Số tokens tối đa cho mỗi response
             system_prompt (str): System prompt mặc định
+            mock_config (Optional[MockLLMConfig]): Cấu hình cho provider "mock" (offline)
         """
         self.api_key = api_key
         self.model_name = model_name
@@ -38,25 +54,40 @@ class BaseLLM(ABC):
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.system_prompt = system_prompt
+        self.mock_config = mock_config
+        # model_id và temperature sau khi áp dụng cấu hình mặc định, đặt bởi _initialize_model
+        self.resolved_model_id: Optional[str] = model_id
+        self.resolved_temperature: Optional[float] = temperature
 
     def _initialize_model(self) -> None:
         try:
             global_settings = Config()
             if self.model_name.lower() == "gemini":
+                from llama_index.llms.gemini import Gemini
+                config = global_settings.GEMINI_CONFIG
+                # Giá trị thực sự gửi tới provider; 0.0 là nhiệt độ hợp lệ, không phải "chưa đặt"
+                self.resolved_model_id = self.model_id or config.model_id
+                self.resolved_temperature = self.temperature if self.temperature is not None else config.temperature
                 self.model = Gemini(
-                    api_key=self.api_key if self.api_key else global_settings.GEMINI_CONFIG.api_key,
-                    model=self.model_id if self.model_id else global_settings.GEMINI_CONFIG.model_id,
-                    temperature=self.temperature if self.temperature else global_settings.GEMINI_CONFIG.temperature,
-                    max_tokens=self.max_tokens if self.max_tokens else global_settings.GEMINI_CONFIG.max_tokens,
+                    api_key=self.api_key if self.api_key else config.api_key,
+                    model=self.resolved_model_id,
+                    temperature=self.resolved_temperature,
+                    max_tokens=self.max_tokens if self.max_tokens else config.max_tokens,
                     additional_kwargs={
                         'generation_config': {
-                            'temperature': self.temperature if self.temperature else global_settings.GEMINI_CONFIG.temperature,
+                            'temperature': self.resolved_temperature,
                             'top_p': 0.8,
                             'top_k': 40,
                         }
                     },
                 )
+            elif self.model_name.lower() == "mock":
+                # Mock provider là deterministic: mặc định coi như nhiệt độ 0
+                self.resolved_model_id = self.model_id or "mock"
+                self.resolved_temperature = self.temperature if self.temperature is not None else 0.0
+                self.model = MockLLM(config=self.mock_config)
             # elif self.model_name == "claude":
+            #     from llama_index.llms.anthropic import Anthropic
             #     self.model = Anthropic(
             #         api_key=self.api_key,
             #         model=self.model_id,
@@ -64,6 +95,7 @@ class BaseLLM(ABC):
             #         max_tokens=self.max_tokens
             #     )
             # elif self.model_name == "openai":
+            #     from llama_index.llms.openai import OpenAI
             #     self.model = OpenAI(
             #         api_key=self.api_key,
             #         model=self.model_id,
@@ -76,6 +108,23 @@ class BaseLLM(ABC):
             logger.error(f"Failed to initialize {self.model_name} model: {str(e)}")
             raise
 
+    def warm_up(self) -> None:
+        """
+        Khởi tạo trước client của provider để request đầu tiên không phải trả chi phí này.
+        Gọi trong event loop phục vụ request, vì client async gắn với loop đó.
+        """
+        if getattr(self, "model", None) is None:
+            self._initialize_model()
+        if self.model_name.lower() == "gemini":
+            # google-generativeai tạo async client ở lần gọi đầu tiên và cache nó theo tiến trình;
+            # tạo trước client mặc định qua API public, model sẽ dùng lại chính client này
+            try:
+                from google.generativeai import client
+                client.get_default_generative_async_client()
+            except Exception as e:
+                # Warm-up chỉ là tối ưu: client sẽ được tạo ở request đầu tiên
+                logger.warning(f"Could not pre-create the Gemini async client: {str(e)}")
+
     @abstractmethod
     def _prepare_messages(
         self, 
@@ -109,12 +158,35 @@ class BaseLLM(ABC):
         except Exception as e:
             logger.error(f"Error extracting response from {self.model_name}: {str(e)}")
             return response.message.content
+
+    def _extract_delta(self, chunk: Any, previous: str) -> str:
+        """
+        Extract the newly generated text from a streaming chunk.
+
+        Providers such as llama-index Gemini put the accumulated text in
+        `message.content` and only the new part in `delta`.
+        
+        Args:
+            chunk: The streaming chunk from the LLM
+            previous: Text accumulated from the previous chunks
+            
+        Returns:
+            str: The new text of this chunk
+        """
+        delta = getattr(chunk, 'delta', None)
+        if delta is not None:
+            return delta
+        content = self._extract_response(chunk) or ""
+        if previous and content.startswith(previous):
+            return content[len(previous):]
+        return content
         
     @abstractmethod
     def chat(
         self, 
         query: str, 
-        chat_history: Optional[List[ChatMessage]] = None
+        chat_history: Optional[List[ChatMessage]] = None,
+        use_cache: bool = True
     ) -> str:
         pass
 
@@ -122,10 +194,28 @@ class BaseLLM(ABC):
     async def achat(
         self, 
         query: str, 
-        chat_history: Optional[List[ChatMessage]] = None
+        chat_history: Optional[List[ChatMessage]] = None,
+        use_cache: bool = True
     ) -> str:
         pass
 
+    @property
+    def supports_function_calling(self) -> bool:
+        """Model có hỗ trợ function calling native của provider hay không"""
+        metadata = getattr(getattr(self, "model", None), "metadata", None)
+        return bool(getattr(metadata, "is_function_calling_model", False)) and hasattr(self.model, "achat_with_tools")
+
+    @abstractmethod
+    async def achat_with_tools(
+        self,
+        query: str,
+        tools: Sequence[BaseTool],
+        chat_history: Optional[List[ChatMessage]] = None,
+        tool_choice: str = "auto",
+        allow_parallel_tool_calls: bool = False
+    ) -> ToolCallResponse:
+        pass
+
     @abstractmethod
     def stream_chat(
         self, 
@@ -148,8 +238,8 @@ class BaseLLM(ABC):
     def get_model_config(self) -> dict:
         return {
             "model_name": self.model_name,
-            "model_id": self.model_id,
-            "temperature": self.temperature,
+            "model_id": self.resolved_model_id,
+            "temperature": self.resolved_temperature,
             "max_tokens": self.max_tokens,
             "system_prompt": self.system_prompt
         }
@@ -0,0 +1,319 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from llama_index.core.llms import ChatMessage
+from src.logger import get_formatted_logger
+
+logger = get_formatted_logger(__file__)
+
+
+def make_cache_key(
+    messages: List[ChatMessage],
+    model_id: Optional[str],
+    temperature: Optional[float],
+    namespace: str = "chat"
+) -> str:
+    """
+    Build a stable hash for a prepared message list.
+
+    Args:
+        messages (List[ChatMessage]): Messages exactly as they are sent to the provider
+        model_id (Optional[str]): Model id used for the call
+        temperature (Optional[float]): Sampling temperature used for the call
+        namespace (str): Separates keys of different call types (chat, tools, ...)
+
+    Returns:
+        str: Hex digest identifying the request
+    """
+    payload = {
+        "namespace": namespace,
+        "model_id": model_id,
+        "temperature": temperature,
+        "messages": [
+            {
+                "role": getattr(message.role, "value", str(message.role)),
+                "content": message.content or "",
+            }
+            for message in messages
+        ],
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CacheBackend(ABC):
+    """Storage tier used by ResponseCache"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+
+class MemoryCache(CacheBackend):
+    """Thread-safe in-memory LRU cache with per-entry TTL"""
+
+    def __init__(self, max_entries: int = 1024, default_ttl: Optional[float] = 3600):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache(CacheBackend):
+    """
+    On-disk cache tier backed by a local SQLite file, survives restarts.
+
+    The number of entries is tracked in memory, so writes and `len()` do not
+    scan the table; once it exceeds `max_entries` the table is trimmed to
+    `evict_ratio` of the limit in one go.
+    """
+
+    def __init__(
+        self,
+        path: str = "cache/llm_cache.sqlite3",
+        max_entries: int = 100_000,
+        default_ttl: Optional[float] = 86400,
+        evict_ratio: float = 0.9
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.evict_ratio = evict_ratio
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._count -= self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,)).rowcount
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return value
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now)
+            )
+            if exists is None:
+                self._count += 1
+            if self._count > self.max_entries:
+                self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        # Expired entries first, then the least recently accessed ones
+        self._conn.execute("DELETE FROM llm_cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        # Recount here only: other processes may share the file
+        count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        target = int(self.max_entries * self.evict_ratio)
+        if count > target:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY accessed_at ASC LIMIT ?)",
+                (count - target,)
+            )
+            count = target
+        self._count = count
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._count -= self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,)).rowcount
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+            self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """
+    Two-tier response cache: an in-memory LRU + TTL tier in front of an
+    optional persistent tier. Hits on the persistent tier are promoted to memory.
+
+    `aget`/`aset` run the persistent tier in a worker thread so SQLite I/O never
+    blocks the event loop; async callers should use them instead of `get`/`set`.
+    """
+
+    def __init__(
+        self,
+        memory: Optional[MemoryCache] = None,
+        disk: Optional[CacheBackend] = None,
+        ttl: Optional[float] = 3600
+    ):
+        self.memory = memory or MemoryCache(default_ttl=ttl)
+        self.disk = disk
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            self.memory_hits += 1
+            return value
+        if self.disk is not None:
+            try:
+                value = self.disk.get(key)
+            except Exception as e:
+                logger.error(f"Error reading from disk cache: {str(e)}")
+                value = None
+            if value is not None:
+                self.hits += 1
+                self.disk_hits += 1
+                self.memory.set(key, value, self.ttl)
+                return value
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        self.memory.set(key, value, self.ttl)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value, self.ttl)
+            except Exception as e:
+                logger.error(f"Error writing to disk cache: {str(e)}")
+
+    async def aget(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            self.memory_hits += 1
+            return value
+        if self.disk is not None:
+            try:
+                value = await asyncio.to_thread(self.disk.get, key)
+            except Exception as e:
+                logger.error(f"Error reading from disk cache: {str(e)}")
+                value = None
+            if value is not None:
+                self.hits += 1
+                self.disk_hits += 1
+                self.memory.set(key, value, self.ttl)
+                return value
+        self.misses += 1
+        return None
+
+    async def aset(self, key: str, value: str) -> None:
+        self.memory.set(key, value, self.ttl)
+        if self.disk is not None:
+            try:
+                await asyncio.to_thread(self.disk.set, key, value, self.ttl)
+            except Exception as e:
+                logger.error(f"Error writing to disk cache: {str(e)}")
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def get_stats(self, disk_entries: Optional[int] = None) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        if disk_entries is None:
+            disk_entries = len(self.disk) if self.disk is not None else 0
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "memory_entries": len(self.memory),
+            "disk_entries": disk_entries,
+        }
+
+    async def aget_stats(self) -> Dict[str, Any]:
+        """`get_stats` for async callers; counting a persistent tier may hit the disk"""
+        disk_entries = await asyncio.to_thread(len, self.disk) if self.disk is not None else 0
+        return self.get_stats(disk_entries)
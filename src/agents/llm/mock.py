@@ -0,0 +1,282 @@
+import asyncio
+import json
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, Callable, Dict, Generator, List, Optional, Sequence, Union
+from llama_index.core.llms import ChatMessage, ChatResponse, LLMMetadata
+from llama_index.core.llms.llm import ToolSelection
+
+
+@dataclass
+class LatencyConfig:
+    """
+    Latency distribution sampled by the mock provider.
+
+    distribution:
+        - "fixed": always `mean` seconds
+        - "normal": gaussian around `mean` with `stddev`, clipped at 0
+        - "long_tail": log-normal with median `mean` and shape `stddev`,
+          plus a `tail_probability` chance of a `tail_multiplier` slowdown
+    """
+    distribution: str = "fixed"
+    mean: float = 0.0
+    stddev: float = 0.0
+    tail_probability: float = 0.0
+    tail_multiplier: float = 10.0
+
+    def sample(self, rng: random.Random) -> float:
+        if self.distribution == "fixed":
+            value = self.mean
+        elif self.distribution == "normal":
+            value = rng.gauss(self.mean, self.stddev)
+        elif self.distribution == "long_tail":
+            value = self.mean * rng.lognormvariate(0.0, self.stddev)
+            if self.tail_probability and rng.random() < self.tail_probability:
+                value *= self.tail_multiplier
+        else:
+            raise ValueError(f"Unsupported latency distribution: {self.distribution}")
+        return max(0.0, value)
+
+
+@dataclass
+class MockLLMConfig:
+    """
+    Behaviour of the offline mock provider.
+
+    Args:
+        responses: Scripted replies keyed by a regex matched against the last user message.
+            Values are strings or callables receiving the prompt.
+        default_response: Reply used when no script or built-in rule matches.
+            `{query}` is replaced with the prompt.
+        latency: Delay before the first token (or the whole reply for non-streaming calls).
+        token_latency: Delay between streamed tokens.
+        seed: Seed of the random generator used for latency sampling.
+        failure_rate: Probability that a call raises RuntimeError, for error-path testing.
+        function_calling: Whether the mock advertises native function calling. Tools are
+            called when forced by `tool_choice` or when their name appears in the prompt.
+    """
+    responses: Dict[str, Union[str, Callable[[str], str]]] = field(default_factory=dict)
+    default_response: str = "This is a mock response to: {query}"
+    latency: LatencyConfig = field(default_factory=LatencyConfig)
+    token_latency: LatencyConfig = field(default_factory=LatencyConfig)
+    seed: int = 0
+    failure_rate: float = 0.0
+    function_calling: bool = True
+
+
+class MockLLM:
+    """
+    Deterministic offline stand-in for a llama-index LLM.
+
+    Exposes the chat/achat/stream_chat/astream_chat surface UnifiedLLM relies on
+    and answers the framework's own prompts (classification, planning, tool
+    arguments, validation, reflection) with valid JSON so every agent can run
+    without network access.
+    """
+
+    def __init__(self, config: Optional[MockLLMConfig] = None):
+        self.config = config or MockLLMConfig()
+        self._rng = random.Random(self.config.seed)
+        self._scripts = [(re.compile(pattern, re.IGNORECASE | re.DOTALL), reply) for pattern, reply in self.config.responses.items()]
+        self.call_count = 0
+        self.prompts: List[str] = []
+
+    # Reply generation
+    def _render(self, messages: List[ChatMessage]) -> str:
+        self.call_count += 1
+        prompt = (messages[-1].content or "") if messages else ""
+        system = "\n".join(m.content or "" for m in messages if getattr(m.role, "value", m.role) == "system")
+        self.prompts.append(prompt)
+
+        if self.config.failure_rate and self._rng.random() < self.config.failure_rate:
+            raise RuntimeError("Mock provider failure")
+
+        for pattern, reply in self._scripts:
+            if pattern.search(prompt):
+                return reply(prompt) if callable(reply) else reply
+
+        rule_reply = self._rule_based_reply(prompt, system)
+        if rule_reply is not None:
+            return rule_reply
+        return self.config.default_response.replace("{query}", prompt.strip()[:200])
+
+    def _rule_based_reply(self, prompt: str, system: str) -> Optional[str]:
+        if "AgentMatcher" in prompt:
+            return self._classification_reply(prompt)
+        if "ValidatorAgent" in prompt:
+            return json.dumps({
+                "is_valid": True,
+                "score": 0.9,
+                "reasoning": "Mock validation",
+                "needs_refinement": False,
+                "refinement_suggestions": ""
+            })
+        if "Generate parameters to call this tool" in prompt:
+            return self._tool_arguments_reply(prompt)
+        if '"steps"' in prompt and "plan" in prompt.lower():
+            return self._plan_reply(prompt)
+        if "generating critique" in system or "generating critique" in prompt:
+            return "<OK>"
+        return None
+
+    @staticmethod
+    def _words(text: str) -> set:
+        return set(re.findall(r"\w+", text.lower()))
+
+    def _classification_reply(self, prompt: str) -> str:
+        agents = re.findall(r"(?:^|: )- (.+?) \(ID: ([^)]+)\): (.*)$", prompt, re.MULTILINE)
+        user_input = re.search(r"User input: (.*)", prompt)
+        query_words = self._words(user_input.group(1) if user_input else "")
+        best_id, best_overlap = (agents[0][1] if agents else "unknown"), 0
+        for name, agent_id, description in agents:
+            overlap = len(query_words & self._words(f"{name} {description}"))
+            if overlap > best_overlap:
+                best_id, best_overlap = agent_id, overlap
+        return json.dumps({
+            "selected_agent": best_id,
+            "confidence": 0.9 if best_overlap else 0.65,
+            "reasoning": f"Mock classification with {best_overlap} matching keywords"
+        })
+
+    def _plan_reply(self, prompt: str) -> str:
+        task = re.search(r"Task to accomplish: (.*)", prompt)
+        task = task.group(1).strip() if task else "the task"
+        inline_arguments = '"arguments"' in prompt
+        tools = re.findall(r"Function: (\S+)", prompt)
+        steps = []
+        for i, tool in enumerate(tools, 1):
+            step = {"id": str(i), "description": f"Use {tool} for: {task}", "requires_tool": True, "tool_name": tool, "depends_on": []}
+            if inline_arguments:
+                step["arguments"] = self._arguments_for(self._tool_parameters(prompt, tool), task)
+            steps.append(step)
+        if not steps:
+            steps = [{"id": "1", "description": f"Answer: {task}", "requires_tool": False, "tool_name": None, "depends_on": []}]
+        return json.dumps({"steps": steps})
+
+    @staticmethod
+    def _tool_parameters(prompt: str, tool: str) -> Dict[str, Any]:
+        match = re.search(rf"Function: {re.escape(tool)}\s.*?Parameters: ", prompt, re.DOTALL)
+        if not match:
+            return {}
+        try:
+            spec, _ = json.JSONDecoder().raw_decode(prompt[match.end():])
+        except ValueError:
+            return {}
+        return spec
+
+    @staticmethod
+    def _arguments_for(spec: Dict[str, Any], text: str) -> Dict[str, Any]:
+        defaults = {"integer": 0, "number": 0, "boolean": False, "array": [], "object": {}}
+        arguments: Dict[str, Any] = {}
+        for name in spec.get("required", []):
+            param_type = spec.get("properties", {}).get(name, {}).get("type", "string")
+            arguments[name] = defaults.get(param_type, text)
+        return arguments
+
+    def _tool_arguments_reply(self, prompt: str) -> str:
+        step = re.search(r"Step: (.*)", prompt)
+        step = step.group(1).strip() if step else ""
+        start, end = prompt.find("Tool specification:"), prompt.find("Response format:")
+        try:
+            spec = json.loads(prompt[start + len("Tool specification:"):end].strip())
+        except ValueError:
+            spec = {}
+        return json.dumps({"arguments": self._arguments_for(spec, step)})
+
+    @staticmethod
+    def _tokenize(text: str) -> List[str]:
+        return re.findall(r"\S+\s*|\s+", text)
+
+    # llama-index compatible surface
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name="mock", is_function_calling_model=self.config.function_calling)
+
+    async def achat_with_tools(
+        self,
+        tools: Sequence[Any],
+        user_msg: Optional[Union[str, ChatMessage]] = None,
+        chat_history: Optional[List[ChatMessage]] = None,
+        allow_parallel_tool_calls: bool = False,
+        tool_choice: str = "auto",
+        **kwargs: Any
+    ) -> ChatResponse:
+        if isinstance(user_msg, str):
+            user_msg = ChatMessage(role="user", content=user_msg)
+        messages = list(chat_history or []) + ([user_msg] if user_msg else [])
+        prompt = (messages[-1].content or "") if messages else ""
+        if tool_choice == "auto":
+            selected = [tool for tool in tools if tool.metadata.name.lower() in prompt.lower()]
+        elif tool_choice in ("any", "required"):
+            selected = list(tools[:1])
+        else:
+            selected = [tool for tool in tools if tool.metadata.name == tool_choice]
+        if not allow_parallel_tool_calls:
+            selected = selected[:1]
+
+        # Forced calls carry no text; otherwise reply as for a plain chat
+        content = self._render(messages) if tool_choice == "auto" else self._count_call(prompt)
+        await asyncio.sleep(self.config.latency.sample(self._rng))
+        tool_calls = [
+            {
+                "tool_id": f"call_{i}",
+                "tool_name": tool.metadata.name,
+                "tool_kwargs": self._arguments_for(tool.metadata.get_parameters_dict(), prompt.strip()[:200]),
+            }
+            for i, tool in enumerate(selected)
+        ]
+        return ChatResponse(message=ChatMessage(role="assistant", content=content, additional_kwargs={"tool_calls": tool_calls}))
+
+    def _count_call(self, prompt: str) -> str:
+        self.call_count += 1
+        self.prompts.append(prompt)
+        return ""
+
+    def get_tool_calls_from_response(
+        self,
+        response: ChatResponse,
+        error_on_no_tool_call: bool = True,
+        **kwargs: Any
+    ) -> List[ToolSelection]:
+        tool_calls = response.message.additional_kwargs.get("tool_calls", [])
+        if not tool_calls and error_on_no_tool_call:
+            raise ValueError("Expected at least one tool call")
+        return [ToolSelection(**call) for call in tool_calls]
+
+    def chat(self, messages: List[ChatMessage], **kwargs: Any) -> ChatResponse:
+        content = self._render(messages)
+        time.sleep(self.config.latency.sample(self._rng))
+        return ChatResponse(message=ChatMessage(role="assistant", content=content))
+
+    async def achat(self, messages: List[ChatMessage], **kwargs: Any) -> ChatResponse:
+        content = self._render(messages)
+        await asyncio.sleep(self.config.latency.sample(self._rng))
+        return ChatResponse(message=ChatMessage(role="assistant", content=content))
+
+    def stream_chat(self, messages: List[ChatMessage], **kwargs: Any) -> Generator[ChatResponse, None, None]:
+        content = self._render(messages)
+
+        def gen() -> Generator[ChatResponse, None, None]:
+            time.sleep(self.config.latency.sample(self._rng))
+            text = ""
+            for token in self._tokenize(content):
+                text += token
+                yield ChatResponse(message=ChatMessage(role="assistant", content=text), delta=token)
+                time.sleep(self.config.token_latency.sample(self._rng))
+
+        return gen()
+
+    async def astream_chat(self, messages: List[ChatMessage], **kwargs: Any) -> AsyncGenerator[ChatResponse, None]:
+        content = self._render(messages)
+
+        async def gen() -> AsyncGenerator[ChatResponse, None]:
+            await asyncio.sleep(self.config.latency.sample(self._rng))
+            text = ""
+            for token in self._tokenize(content):
+                text += token
+                yield ChatResponse(message=ChatMessage(role="assistant", content=text), delta=token)
+                await asyncio.sleep(self.config.token_latency.sample(self._rng))
+
+        return gen()
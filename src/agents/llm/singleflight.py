@@ -0,0 +1,127 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call:
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class _StreamFanout:
+    def __init__(self):
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Event()
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+
+    def notify(self) -> None:
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls so they share one upstream execution.
+
+    `do` shares the result (or exception) of a coroutine between every caller
+    awaiting the same key; `stream` fans a single upstream async iterator out
+    to every subscriber of the same key, replaying chunks to late joiners.
+    The upstream work is cancelled only once every waiter has gone away.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _StreamFanout] = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.streams = 0
+        self.streams_coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget_call(key, call))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                # Forget the call first: a caller arriving before the task has
+                # unwound must start a fresh call, not join a cancelled one
+                self._forget_call(key, call)
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        fanout = self._streams.get(key)
+        if fanout is None:
+            fanout = _StreamFanout()
+            self._streams[key] = fanout
+            fanout.task = asyncio.ensure_future(self._pump(key, fanout, factory))
+            self.streams += 1
+        else:
+            self.streams_coalesced += 1
+
+        fanout.subscribers += 1
+        index = 0
+        try:
+            while True:
+                changed = fanout.changed
+                while index < len(fanout.chunks):
+                    yield fanout.chunks[index]
+                    index += 1
+                if fanout.done:
+                    if fanout.error is not None:
+                        raise fanout.error
+                    return
+                await changed.wait()
+        finally:
+            fanout.subscribers -= 1
+            if fanout.subscribers == 0 and not fanout.done:
+                if self._streams.get(key) is fanout:
+                    del self._streams[key]
+                fanout.task.cancel()
+
+    async def _pump(self, key: str, fanout: _StreamFanout, factory: Callable[[], AsyncIterator[T]]) -> None:
+        try:
+            async for chunk in factory():
+                fanout.chunks.append(chunk)
+                fanout.notify()
+        except asyncio.CancelledError:
+            fanout.error = asyncio.CancelledError()
+        except Exception as e:
+            fanout.error = e
+        finally:
+            fanout.done = True
+            if self._streams.get(key) is fanout:
+                del self._streams[key]
+            fanout.notify()
+
+    def _forget_call(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def is_in_flight(self, key: str) -> bool:
+        return key in self._calls or key in self._streams
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "streams": self.streams,
+            "streams_coalesced": self.streams_coalesced,
+            "in_flight": len(self._calls) + len(self._streams),
+        }
@@ -1,9 +1,17 @@
-from contextlib import asynccontextmanager
-from typing import AsyncGenerator, Generator, List, Optional
+from contextlib import aclosing, asynccontextmanager
+import json
+from typing import Any, AsyncGenerator, Dict, Generator, List, Optional, Sequence, Union
 from llama_index.core.llms import ChatMessage
+from llama_index.core.tools import BaseTool
+from src.agents.utils.pattern import clean_json_response
+from src.agents.utils.deadline import with_deadline, iterate_with_deadline
+from src.agents.utils.batch import map_bounded
 from src.logger import get_formatted_logger
 import asyncio
-from .base import BaseLLM
+from .base import BaseLLM, ToolCall, ToolCallResponse
+from .cache import ResponseCache, make_cache_key
+from .singleflight import SingleFlight
+from .mock import MockLLMConfig
 
 logger = get_formatted_logger(__file__)
 
@@ -16,6 +24,9 @@ class UnifiedLLM(BaseLLM):
         temperature: float = None, 
         max_tokens: int = None, 
         system_prompt: str = None,
+        cache: Optional[ResponseCache] = None,
+        coalesce: bool = False,
+        mock_config: Optional[MockLLMConfig] = None,
     ):
         super().__init__(
             api_key=api_key,
@@ -23,8 +34,11 @@ class UnifiedLLM(BaseLLM):
             model_id=model_id,
             temperature=temperature,
             max_tokens=max_tokens,
-            system_prompt=system_prompt
+            system_prompt=system_prompt,
+            mock_config=mock_config
         )
+        self.cache = cache
+        self.singleflight = SingleFlight() if coalesce else None
         self._initialize_model()
 
     def _prepare_messages(
@@ -43,15 +57,166 @@ class UnifiedLLM(BaseLLM):
         messages.append(ChatMessage(role="user", content=query))
         return messages
 
+    def _get_cache_key(self, messages: List[ChatMessage], use_cache: bool) -> Optional[str]:
+        """
+        Return the cache key for a call, or None when caching is disabled or bypassed.
+
+        Calls sampled at a non-zero temperature are expected to vary, so only
+        calls whose effective temperature (after config defaults) is 0 are cached.
+        """
+        if self.cache is None or not use_cache or self.resolved_temperature:
+            return None
+        return self._get_request_key(messages)
+
+    def _get_request_key(self, messages: List[ChatMessage], namespace: str = "chat") -> str:
+        return make_cache_key(messages, self.resolved_model_id, self.resolved_temperature, namespace=namespace)
+
+    async def _achat_messages(self, messages: List[ChatMessage]) -> str:
+        response = await self.model.achat(messages)
+        return self._extract_response(response)
+
+    async def _astream_messages(self, messages: List[ChatMessage]) -> AsyncGenerator[str, None]:
+        response = await self.model.astream_chat(messages)
+        
+        if asyncio.iscoroutine(response):
+            response = await response
+        
+        if hasattr(response, '__aiter__'):
+            text = ""
+            async for chunk in response:
+                delta = self._extract_delta(chunk, text)
+                text += delta
+                if delta:
+                    yield delta
+        else:
+            yield self._extract_response(response)
+
+    @staticmethod
+    def _format_tools(tools: Sequence[BaseTool]) -> str:
+        return "\n".join(
+            f"- {tool.metadata.name}: {tool.metadata.description}\n"
+            f"  Parameters: {json.dumps(tool.metadata.get_parameters_dict())}"
+            for tool in tools
+        )
+
+    async def _achat_with_prompted_tools(
+        self,
+        query: str,
+        tools: Sequence[BaseTool],
+        chat_history: Optional[List[ChatMessage]],
+        tool_choice: str
+    ) -> ToolCallResponse:
+        """Fallback for providers without native function calling: ask for the calls as JSON"""
+        requirement = "You must call a tool." if tool_choice != "auto" else "Call tools only if they are needed."
+        if tool_choice not in ("auto", "any", "required"):
+            requirement = f"You must call the tool {tool_choice}."
+        prompt = f"""{query}
+
+        Available tools:
+        {self._format_tools(tools)}
+
+        {requirement}
+        Respond in JSON format:
+        {{
+            "content": "your answer or remarks, may be empty",
+            "tool_calls": [{{"tool_name": "name", "arguments": {{}}}}]
+        }}
+        """
+        response = await self.achat(query=prompt, chat_history=chat_history, use_cache=False)
+        try:
+            data = json.loads(clean_json_response(response))
+        except ValueError:
+            return ToolCallResponse(content=response)
+        tool_names = {tool.metadata.name for tool in tools}
+        return ToolCallResponse(
+            content=data.get("content") or "",
+            tool_calls=[
+                ToolCall(tool_name=call["tool_name"], arguments=call.get("arguments") or {})
+                for call in data.get("tool_calls") or []
+                if isinstance(call, dict) and call.get("tool_name") in tool_names
+            ]
+        )
+
+    async def achat_with_tools(
+        self,
+        query: str,
+        tools: Sequence[BaseTool],
+        chat_history: Optional[List[ChatMessage]] = None,
+        tool_choice: str = "auto",
+        allow_parallel_tool_calls: bool = False
+    ) -> ToolCallResponse:
+        """
+        Let the model answer and/or call tools in a single round trip.
+
+        Tool metadata goes through the provider's native function-calling
+        interface when available, so arguments come back structured instead of
+        as JSON text. `tool_choice` is "auto", "any" (some tool must be called)
+        or a tool name.
+        """
+        try:
+            if not self.supports_function_calling:
+                return await self._achat_with_prompted_tools(query, tools, chat_history, tool_choice)
+
+            messages = self._prepare_messages(query, chat_history)
+            user_msg = messages.pop()
+            response = await with_deadline(
+                self.model.achat_with_tools(
+                    tools,
+                    user_msg=user_msg,
+                    chat_history=messages,
+                    allow_parallel_tool_calls=allow_parallel_tool_calls,
+                    tool_choice=tool_choice
+                ),
+                f"{self.model_name} tool calling"
+            )
+            selections = self.model.get_tool_calls_from_response(response, error_on_no_tool_call=False)
+            return ToolCallResponse(
+                content=self._extract_response(response) or "",
+                tool_calls=[
+                    ToolCall(tool_name=selection.tool_name, arguments=selection.tool_kwargs, tool_id=selection.tool_id)
+                    for selection in selections
+                ]
+            )
+        except Exception as e:
+            logger.error(f"Error in {self.model_name} tool calling: {str(e)}")
+            raise
+
+    def get_coalescing_stats(self) -> Dict[str, Any]:
+        """Counters of identical in-flight calls that shared one provider round trip"""
+        if self.singleflight is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.singleflight.get_stats()}
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of the response cache"""
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.get_stats()}
+
+    async def aget_cache_stats(self) -> Dict[str, Any]:
+        """`get_cache_stats` without blocking the event loop on the persistent tier"""
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **(await self.cache.aget_stats())}
+
     def chat(
         self,
         query: str,
-        chat_history: Optional[List[ChatMessage]] = None
+        chat_history: Optional[List[ChatMessage]] = None,
+        use_cache: bool = True
     ) -> str:
         try:
             messages = self._prepare_messages(query, chat_history)
+            cache_key = self._get_cache_key(messages, use_cache)
+            if cache_key:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
             response = self.model.chat(messages)
-            return self._extract_response(response)
+            content = self._extract_response(response)
+            if cache_key:
+                self.cache.set(cache_key, content)
+            return content
         except Exception as e:
             logger.error(f"Error in {self.model_name} chat: {str(e)}")
             raise
@@ -59,16 +224,61 @@ class UnifiedLLM(BaseLLM):
     async def achat(
         self,
         query: str,
-        chat_history: Optional[List[ChatMessage]] = None
+        chat_history: Optional[List[ChatMessage]] = None,
+        use_cache: bool = True
     ) -> str:
         try:
             messages = self._prepare_messages(query, chat_history)
-            response = await self.model.achat(messages)
-            return self._extract_response(response)
+            cache_key = self._get_cache_key(messages, use_cache)
+            if cache_key:
+                cached = await self.cache.aget(cache_key)
+                if cached is not None:
+                    return cached
+            # Bounded by the request deadline; a cancelled shared call keeps running for its other waiters
+            if self.singleflight is not None:
+                content = await with_deadline(
+                    self.singleflight.do(
+                        self._get_request_key(messages),
+                        lambda: self._achat_messages(messages)
+                    ),
+                    f"{self.model_name} chat"
+                )
+            else:
+                content = await with_deadline(self._achat_messages(messages), f"{self.model_name} chat")
+            if cache_key:
+                await self.cache.aset(cache_key, content)
+            return content
         except Exception as e:
             logger.error(f"Error in {self.model_name} async chat: {str(e)}")
             raise
 
+    async def abatch_chat(
+        self,
+        queries: Sequence[str],
+        chat_history: Optional[List[ChatMessage]] = None,
+        max_concurrency: int = 8,
+        use_cache: bool = True,
+        return_exceptions: bool = False
+    ) -> List[Union[str, BaseException]]:
+        """
+        Answer many independent queries, at most `max_concurrency` in flight.
+
+        Results are in the order of `queries`. With `return_exceptions` a failed
+        query yields its exception in place of the answer; otherwise the first
+        failure cancels the rest and is raised.
+        """
+        results: List[Union[str, BaseException, None]] = [None] * len(queries)
+        async with aclosing(map_bounded(
+            queries,
+            lambda query: self.achat(query, chat_history=chat_history, use_cache=use_cache),
+            max_concurrency
+        )) as completed:
+            async for index, result, error in completed:
+                if error is not None and not return_exceptions:
+                    raise error
+                results[index] = error if error is not None else result
+        return results
+
     def stream_chat(
         self,
         query: str,
@@ -77,8 +287,12 @@ class UnifiedLLM(BaseLLM):
         try:
             messages = self._prepare_messages(query, chat_history)
             response_stream = self.model.stream_chat(messages)
+            text = ""
             for response in response_stream:
-                yield self._extract_response(response)
+                delta = self._extract_delta(response, text)
+                text += delta
+                if delta:
+                    yield delta
         except Exception as e:
             logger.error(f"Error in {self.model_name} stream chat: {str(e)}")
             raise
@@ -90,16 +304,16 @@ class UnifiedLLM(BaseLLM):
     ) -> AsyncGenerator[str, None]:
         try:
             messages = self._prepare_messages(query, chat_history)
-            response = await self.model.astream_chat(messages)
-            
-            if asyncio.iscoroutine(response):
-                response = await response
-            
-            if hasattr(response, '__aiter__'):
-                async for chunk in response:
-                    yield self._extract_response(chunk)
+            if self.singleflight is not None:
+                stream = self.singleflight.stream(
+                    self._get_request_key(messages, namespace="stream"),
+                    lambda: self._astream_messages(messages)
+                )
             else:
-                yield self._extract_response(response)
+                stream = self._astream_messages(messages)
+            
+            async for chunk in iterate_with_deadline(stream, f"{self.model_name} stream chat"):
+                yield chunk
                 
         except Exception as e:
             logger.error(f"Error in {self.model_name} async stream chat: {str(e)}")
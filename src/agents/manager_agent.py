@@ -1,4 +1,6 @@
-from typing import Any, Dict, List, Optional, Tuple, Generator, AsyncGenerator
+from collections import deque
+from enum import Enum
+from typing import Any, Deque, Dict, List, Optional, Tuple, Generator, AsyncGenerator, Union
 from llama_index.core.llms import ChatMessage
 from llama_index.core.tools import FunctionTool
 from src.agents.llm import BaseLLM
@@ -6,10 +8,30 @@ from src.logger import get_formatted_logger
 import json
 import asyncio
 from src.agents.base import BaseAgent, AgentOptions
-from src.agents.utils import clean_json_response
+from src.agents.utils import (clean_json_response,
+                              LocalRouter,
+                              FollowUpDetector,
+                              StickyRoute,
+                              StickyRouteStore,
+                              VectorIndex,
+                              DeadlineExceeded,
+                              check_deadline,
+                              has_budget,
+                              no_deadline,
+                              emit_event)
+import random
+import time
 
 logger = get_formatted_logger(__file__)
 
+FAST_PATH_REASONING = "Local fast-path routing"
+
+class ValidationMode(Enum):
+    ALWAYS = "always"              # Validate every routed response before returning it
+    SAMPLED = "sampled"            # Validate a random fraction (validation_sample_rate) of responses
+    ASYNC_SHADOW = "async-shadow"  # Return immediately, validate in the background and record scores only
+    NEVER = "never"
+
 CLASSIFY_PROMPT = """\
 You are AgentMatcher, an intelligent assistant designed to analyze user queries and match them with 
 the most suitable agent or department. Your task is to understand the user request,
@@ -70,22 +92,101 @@ And only give the answer about User Query asked.
 """
 
 class ManagerAgent(BaseAgent):
-    def __init__(self, llm: BaseLLM, options: AgentOptions, system_prompt:str = "", tools: List[FunctionTool] = [],validation_threshold = 0.7):
+    def __init__(
+        self,
+        llm: BaseLLM,
+        options: AgentOptions,
+        system_prompt:str = "",
+        tools: List[FunctionTool] = [],
+        validation_threshold = 0.7,
+        fast_path_threshold: float = 0.85,
+        follow_up_detector: Optional[FollowUpDetector] = None,
+        route_store: Optional[StickyRouteStore] = None,
+        sticky_max_turns: int = 5,
+        sticky_ttl: float = 600.0,
+        speculative: bool = False,
+        speculation_min_prior: float = 0.5,
+        validation_mode: Union[ValidationMode, str] = ValidationMode.ALWAYS,
+        validation_sample_rate: float = 1.0,
+        adaptive_validation: bool = True,
+        healthy_validation_score: float = 0.9,
+        healthy_sample_rate_factor: float = 0.25,
+        validation_window: int = 20,
+        classification_top_k: int = 10
+    ):
         super().__init__(llm, options, system_prompt, tools)
         self.agent_registry: Dict[str, BaseAgent] = {}
         self.validation_threshold = validation_threshold # Minimum validation score to accept response
+        self.fast_path_threshold = fast_path_threshold # Minimum local router confidence to skip the LLM classification
+        self.router = LocalRouter()
+        # Registry index: only the `classification_top_k` agents closest to the query go into the classification prompt
+        self.classification_top_k = classification_top_k
+        self.agent_index = VectorIndex()
+        self._agent_descriptions: Dict[str, str] = {}
+        self._all_agent_descriptions: Optional[str] = None  # Rendered once per registry change
+        self.follow_up_detector = follow_up_detector or FollowUpDetector()
+        self.route_store = route_store or StickyRouteStore()
+        self.sticky_max_turns = sticky_max_turns # Follow-up turns routed to the same agent before re-classifying
+        self.sticky_ttl = sticky_ttl # Seconds a sticky route stays valid
+        self.routing_stats: Dict[str, int] = {"sticky": 0, "fast_path": 0, "llm": 0}
+        # Speculative execution runs the most likely agent while the request is classified.
+        # Only enable it when the registered agents' tools are free of side effects.
+        self.speculative = speculative
+        self.speculation_min_prior = speculation_min_prior # Minimum local router confidence to speculate
+        self.speculation_stats: Dict[str, float] = {"attempts": 0, "hits": 0, "misses": 0, "saved_seconds": 0.0}
+        # Validation policy. With adaptive validation, agents whose rolling score over the
+        # last `validation_window` validations is above `healthy_validation_score` are
+        # validated `healthy_sample_rate_factor` times as often.
+        self.validation_mode = ValidationMode(validation_mode)
+        self.validation_sample_rate = validation_sample_rate
+        self.adaptive_validation = adaptive_validation
+        self.healthy_validation_score = healthy_validation_score
+        self.healthy_sample_rate_factor = healthy_sample_rate_factor
+        self.validation_window = validation_window
+        self.validation_scores: Dict[str, Deque[float]] = {}
+        self.validation_stats: Dict[str, int] = {"validated": 0, "skipped": 0, "shadow": 0, "refined": 0, "validation_errors": 0}
+        self._validation_rng = random.Random()
+        self._background_tasks: set = set()
         
-    def register_agent(self, agent: BaseAgent) -> None:
-        """Register a new agent with the manager"""
+    def register_agent(self, agent: BaseAgent, examples: Optional[List[str]] = None) -> None:
+        """Register a new agent with the manager, optionally with example utterances for local routing"""
         self.agent_registry[agent.id] = agent
+        documents = [agent.name, agent.description] + list(agent.examples) + list(examples or [])
+        self.router.add(agent.id, documents)
+        self.agent_index.add(agent.id, "\n".join(documents))
+        self._agent_descriptions[agent.id] = f"- {agent.name} (ID: {agent.id}): {agent.description}"
+        self._all_agent_descriptions = None
         logger.info(f"Registered agent: {agent.id} ({agent.name})")
 
-    def _get_agent_descriptions(self) -> str:
-        """Generate formatted descriptions of all registered agents"""
-        descriptions = []
-        for agent_id, agent in self.agent_registry.items():
-            descriptions.append(f"- {agent.name} (ID: {agent_id}): {agent.description}")
-        return "\n".join(descriptions)
+    def unregister_agent(self, agent_id: str) -> None:
+        """Remove an agent from the manager"""
+        if self.agent_registry.pop(agent_id, None) is not None:
+            self.router.remove(agent_id)
+            self.agent_index.remove(agent_id)
+            self._agent_descriptions.pop(agent_id, None)
+            self._all_agent_descriptions = None
+            logger.info(f"Unregistered agent: {agent_id}")
+
+    def _shortlist_agents(self, query: Optional[str] = None) -> List[str]:
+        """Ids of the agents most similar to the query, or every agent for small registries"""
+        if not query or len(self.agent_registry) <= self.classification_top_k:
+            return list(self.agent_registry.keys())
+        return [agent_id for agent_id, _ in self.agent_index.search(query, self.classification_top_k)]
+
+    def _get_agent_descriptions(self, query: Optional[str] = None) -> str:
+        """Generate formatted descriptions of the registered agents, shortlisted for the query if given"""
+        agent_ids = self._shortlist_agents(query)
+        if len(agent_ids) == len(self.agent_registry):
+            # No shortlist: the same text for every query
+            if self._all_agent_descriptions is None:
+                self._all_agent_descriptions = "\n".join(self._agent_descriptions[agent_id] for agent_id in agent_ids)
+            return self._all_agent_descriptions
+        return "\n".join(self._agent_descriptions[agent_id] for agent_id in agent_ids)
+
+    def warm_up(self) -> None:
+        """Render the static prompt fragments and run the local router once, ahead of the first request"""
+        self._get_agent_descriptions()
+        self.router.route("warm up")
 
     def _format_chat_history(self, chat_history: List[ChatMessage]) -> str:
         """Format recent chat history for context"""
@@ -104,19 +205,33 @@ class ManagerAgent(BaseAgent):
         user_input: str,
         chat_history: List[ChatMessage]
     ) -> Tuple[Optional[BaseAgent], float, str]:
-        """Classify user request using LLM and return appropriate agent with confidence score and reasoning"""
+        """
+        Classify user request and return appropriate agent with confidence score and reasoning.
+        The local router answers first; the LLM is only called when it is not confident enough.
+        """
+        agent_id, confidence = self.router.route(user_input)
+        if agent_id is not None and confidence >= self.fast_path_threshold:
+            self.routing_stats["fast_path"] += 1
+            selected_agent = self.agent_registry[agent_id]
+            logger.info(
+                f"Request routed locally to {selected_agent.name} "
+                f"(confidence: {confidence:.2f})"
+            )
+            return selected_agent, confidence, FAST_PATH_REASONING
+        if len(self.agent_registry) == 0:
+            logger.warning("No agents registered with manager")
+            return None, 0.0, "No agents available"
+        self.routing_stats["llm"] += 1
+        check_deadline("request classification")
+
         try:
             # Prepare classification prompt
             classification_prompt = CLASSIFY_PROMPT.format(
-                agent_descriptions=self._get_agent_descriptions(),
+                agent_descriptions=self._get_agent_descriptions(user_input),
                 user_input=user_input,
                 chat_history=self._format_chat_history(chat_history)
             )
             
-            if len(self.agent_registry) == 0:
-                logger.warning("No agents registered with manager")
-                return None, 0.0, "No agents available"
-                
             # Get classification from LLM
             response = await self.llm.achat(classification_prompt)
             response = clean_json_response(response)
@@ -147,11 +262,174 @@ class ManagerAgent(BaseAgent):
                 default_agent = next(iter(self.agent_registry.values())) if self.agent_registry else None
                 return default_agent, 0.5, f"Error in classification: {str(e)}"
                 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error during request classification: {str(e)}")
             default_agent = next(iter(self.agent_registry.values())) if self.agent_registry else None
             return default_agent, 0.5, f"Exception in classification: {str(e)}"
 
+    async def _get_sticky_agent(self, session_id: str, query: str) -> Optional[BaseAgent]:
+        """Return the session's previous agent when the query is a follow-up and the route has not expired"""
+        route = await self.route_store.get(session_id)
+        if route is None:
+            return None
+        
+        now = time.time()
+        agent = self.agent_registry.get(route.agent_id)
+        if agent is None or route.turns >= self.sticky_max_turns or now - route.updated_at > self.sticky_ttl:
+            await self.route_store.delete(session_id)
+            return None
+        
+        if not self.follow_up_detector.is_follow_up(query):
+            return None
+        
+        await self.route_store.set(
+            session_id,
+            StickyRoute(agent_id=route.agent_id, turns=route.turns + 1, updated_at=now)
+        )
+        return agent
+
+    async def _route(
+        self,
+        query: str,
+        chat_history: List[ChatMessage],
+        verbose: bool = False,
+        session_id: Optional[str] = None,
+        trace: Optional[Dict[str, Any]] = None
+    ) -> Optional[BaseAgent]:
+        """
+        Pick the agent for a request, or None when the manager should answer with the LLM directly.
+        `trace["method"]` is set to how it was picked: "sticky", "fast_path" or "llm".
+        """
+        trace = trace if trace is not None else {}
+        if session_id is not None:
+            sticky_agent = await self._get_sticky_agent(session_id, query)
+            if sticky_agent:
+                trace["method"] = "sticky"
+                self.routing_stats["sticky"] += 1
+                emit_event("routing", agent_id=sticky_agent.id, agent=sticky_agent.name, confidence=None, reason="Follow-up of the previous turn")
+                if verbose:
+                    logger.info(f"Follow-up routed to previous agent {sticky_agent.name}")
+                return sticky_agent
+        
+        selected_agent, confidence, reasoning = await self.classify_request(query, chat_history)
+        trace["method"] = "fast_path" if reasoning == FAST_PATH_REASONING else "llm"
+        
+        if not selected_agent or confidence < 0.6:
+            # The manager answers with the LLM directly
+            emit_event("routing", agent_id=None, agent=None, confidence=confidence, reason=reasoning)
+        else:
+            emit_event("routing", agent_id=selected_agent.id, agent=selected_agent.name, confidence=confidence, reason=reasoning)
+        
+        if not selected_agent:
+            if verbose:
+                logger.info("No appropriate agent found, falling back to LLM")
+            if session_id is not None:
+                await self.route_store.delete(session_id)
+            return None
+        
+        # If confidence is too low, maybe ask for clarification or fall back to LLM
+        if confidence < 0.6:
+            if verbose:
+                logger.info(
+                    f"Low confidence classification ({confidence:.2f}). "
+                    f"Falling back to LLM."
+                )
+            if session_id is not None:
+                await self.route_store.delete(session_id)
+            return None
+        
+        if session_id is not None:
+            await self.route_store.set(session_id, StickyRoute(agent_id=selected_agent.id))
+        
+        # Log the classification
+        if verbose:
+            logger.info(
+                f"Request classified to {selected_agent.name} "
+                f"with confidence {confidence:.2f}"
+            )
+        return selected_agent
+
+    async def _predict_agent(self, query: str, session_id: Optional[str] = None) -> Optional[BaseAgent]:
+        """Cheap guess of the agent the classification will pick: local router prior, then the session's last agent"""
+        agent_id, confidence = self.router.route(query)
+        if agent_id is not None and confidence >= self.fast_path_threshold:
+            # Routed locally at once: there is no classification to overlap with
+            return None
+        if agent_id is not None and confidence >= self.speculation_min_prior:
+            return self.agent_registry.get(agent_id)
+        if session_id is not None:
+            route = await self.route_store.get(session_id)
+            if route is not None:
+                return self.agent_registry.get(route.agent_id)
+        return None
+
+    async def _route_speculatively(
+        self,
+        query: str,
+        chat_history: List[ChatMessage],
+        verbose: bool,
+        additional_params: Dict[str, Any],
+        session_id: Optional[str] = None
+    ) -> Tuple[Optional[BaseAgent], Optional[str]]:
+        """
+        Run the predicted agent concurrently with the classification.
+        Returns the selected agent and, when the prediction was right, its response.
+        """
+        candidate = await self._predict_agent(query, session_id)
+        if candidate is None:
+            return await self._route(query, chat_history, verbose, session_id), None
+        
+        started = time.perf_counter()
+        agent_elapsed = {}
+
+        async def run_candidate() -> str:
+            try:
+                return await candidate.achat(
+                    query=query,
+                    verbose=verbose,
+                    chat_history=chat_history,
+                    **additional_params
+                )
+            finally:
+                agent_elapsed["seconds"] = time.perf_counter() - started
+
+        speculative_task = asyncio.create_task(run_candidate())
+        trace: Dict[str, Any] = {}
+        try:
+            selected_agent = await self._route(query, chat_history, verbose, session_id, trace)
+        except BaseException:
+            speculative_task.cancel()
+            raise
+        route_elapsed = time.perf_counter() - started
+        # Only an LLM classification is slow enough for the overlap to count; sticky
+        # and local routes would have started the agent right away anyway
+        counted = trace.get("method") == "llm"
+        if counted:
+            self.speculation_stats["attempts"] += 1
+        
+        if selected_agent is candidate:
+            response = await speculative_task
+            if counted:
+                self.speculation_stats["hits"] += 1
+                # Serial execution would have cost route + agent time; the overlap is what we saved
+                self.speculation_stats["saved_seconds"] += min(route_elapsed, agent_elapsed.get("seconds", 0.0))
+            if verbose:
+                logger.info(f"Speculation hit for {candidate.name}")
+            return selected_agent, response
+        
+        if counted:
+            self.speculation_stats["misses"] += 1
+        speculative_task.cancel()
+        try:
+            await speculative_task
+        except (asyncio.CancelledError, Exception):
+            pass
+        if verbose:
+            logger.info(f"Speculation miss: predicted {candidate.name}, cancelled")
+        return selected_agent, None
+
     async def validate_response(
         self,
         user_query: str,
@@ -174,30 +452,35 @@ class ManagerAgent(BaseAgent):
             
             try:
                 validation_result = json.loads(validation_response)
+                if not isinstance(validation_result, dict):
+                    return self._validation_fallback("Validation result is not a JSON object")
                 if verbose:
                     logger.info(f"Validation result: {validation_result}")
                 return validation_result
             except json.JSONDecodeError as e:
                 if verbose:
                     logger.error(f"Error parsing validation response: {str(e)}")
-                return {
-                    "is_valid": True,  # Default to accepting the response
-                    "score": 0.75,
-                    "reasoning": "Failed to parse validation result",
-                    "needs_refinement": False,
-                    "refinement_suggestions": ""
-                }
+                return self._validation_fallback("Failed to parse validation result")
                 
         except Exception as e:
             if verbose:
                 logger.error(f"Error during response validation: {str(e)}")
-            return {
-                "is_valid": True,  # Default to accepting the response
-                "score": 0.75,
-                "reasoning": f"Validation error: {str(e)}",
-                "needs_refinement": False,
-                "refinement_suggestions": ""
-            }
+            return self._validation_fallback(f"Validation error: {str(e)}")
+
+    @staticmethod
+    def _validation_fallback(reasoning: str) -> Dict[str, Any]:
+        """
+        Result used when the validator failed: accepts the response, and is marked
+        with "error" so it is not recorded as a quality score
+        """
+        return {
+            "is_valid": True,  # Default to accepting the response
+            "score": 0.75,
+            "reasoning": reasoning,
+            "needs_refinement": False,
+            "refinement_suggestions": "",
+            "error": True
+        }
             
     async def refine_response(
         self,
@@ -230,88 +513,57 @@ class ManagerAgent(BaseAgent):
         chat_history: List[ChatMessage] = [],
         verbose: bool = False,
         additional_params: Dict[str, Any] = {},
-        max_retries: int = 1
+        max_retries: int = 1,
+        session_id: Optional[str] = None
     ) -> str:
         """Process user request by classifying and delegating to appropriate agent"""
         try:
             if self.callbacks:
                 self.callbacks.on_agent_start(self.name)
                 
-            # Classify the request
-            selected_agent, confidence, reasoning = await self.classify_request(query, chat_history)
+            # Classify the request, speculatively running the most likely agent meanwhile
+            if self.speculative:
+                selected_agent, agent_response = await self._route_speculatively(
+                    query, chat_history, verbose, additional_params, session_id
+                )
+            else:
+                selected_agent = await self._route(query, chat_history, verbose, session_id)
+                agent_response = None
             
             if not selected_agent:
-                if verbose:
-                    logger.info("No appropriate agent found, falling back to LLM")
                 response = await self.llm.achat("Answer this question: " + query, chat_history=chat_history)
                 
                 if self.callbacks:
                     self.callbacks.on_agent_end(self.name)
                 return response
             
-            # If confidence is too low, maybe ask for clarification or fall back to LLM
-            if confidence < 0.6:
-                if verbose:
-                    logger.info(
-                        f"Low confidence classification ({confidence:.2f}). "
-                        f"Falling back to LLM."
-                    )
-                response = await self.llm.achat("Answer this question: " + query, chat_history=chat_history)
-                
-                if self.callbacks:
-                    self.callbacks.on_agent_end(self.name)
-                return response
-            
-            # Log the classification
-            if verbose:
-                logger.info(
-                    f"Request classified to {selected_agent.name} "
-                    f"with confidence {confidence:.2f}"
+            # Execute the request with the selected agent
+            if agent_response is None:
+                agent_response = await selected_agent.achat(
+                    query=query,
+                    verbose=verbose,
+                    chat_history=chat_history,
+                    **additional_params
                 )
             
-            # Execute the request with the selected agent
-            agent_response = await selected_agent.achat(
+            # Validate the response according to the validation policy
+            final_response = await self._apply_validation(
                 query=query,
-                verbose=verbose,
-                chat_history=chat_history,
-                **additional_params
-            )
-            
-            # Validate the response
-            validation_result = await self.validate_response(
-                user_query=query,
-                agent_name=selected_agent.name,
+                agent=selected_agent,
                 agent_response=agent_response,
                 chat_history=chat_history,
                 verbose=verbose
             )
-            
-            if verbose:
-                logger.info(f"Validation score: {validation_result['score']:.2f}")
-                
-            # Check if refinement is needed
-            if (validation_result.get("needs_refinement", False) and 
-                validation_result.get("score", 1.0) < self.validation_threshold):
-                
-                if verbose:
-                    logger.info(f"Refining response based on validation feedback")
-                
-                refined_response = await self.refine_response(
-                    user_query=query,
-                    agent_response=agent_response,
-                    validation_feedback=validation_result,
-                    verbose=verbose
-                )
-                
-                final_response = refined_response
-            else:
-                final_response = agent_response
                 
             if self.callbacks:
                 self.callbacks.on_agent_end(self.name)
                 
             return final_response
             
+        except DeadlineExceeded:
+            if self.callbacks:
+                self.callbacks.on_agent_end(self.name)
+            raise
         except Exception as e:
             logger.error(f"Error processing request: {str(e)}")
             if self.callbacks:
@@ -322,15 +574,199 @@ class ManagerAgent(BaseAgent):
                 "Please try again or rephrase your question."
             )
 
+    def _get_validation_rate(self, agent: BaseAgent) -> float:
+        """Probability of validating a response of this agent under the current policy"""
+        if self.validation_mode == ValidationMode.NEVER:
+            return 0.0
+        rate = self.validation_sample_rate if self.validation_mode == ValidationMode.SAMPLED else 1.0
+        scores = self.validation_scores.get(agent.id)
+        if (self.adaptive_validation and scores and len(scores) >= min(5, self.validation_window) and
+            sum(scores) / len(scores) >= self.healthy_validation_score):
+            rate *= self.healthy_sample_rate_factor
+        return rate
+
+    def _should_validate(self, agent: BaseAgent) -> bool:
+        should_validate = self._validation_rng.random() < self._get_validation_rate(agent)
+        if not should_validate:
+            self.validation_stats["skipped"] += 1
+        return should_validate
+
+    def _record_validation(self, agent: BaseAgent, validation_result: Dict[str, Any]) -> None:
+        # Failed validations say nothing about the agent; keep them out of its rolling score
+        if validation_result.get("error"):
+            self.validation_stats["validation_errors"] += 1
+            return
+        try:
+            score = float(validation_result.get("score", 1.0))
+        except (TypeError, ValueError):
+            self.validation_stats["validation_errors"] += 1
+            return
+        self.validation_scores.setdefault(agent.id, deque(maxlen=self.validation_window)).append(score)
+        self.validation_stats["validated"] += 1
+
+    def _needs_refinement(self, validation_result: Dict[str, Any]) -> bool:
+        return (validation_result.get("needs_refinement", False) and 
+                validation_result.get("score", 1.0) < self.validation_threshold)
+
+    def _start_shadow_validation(
+        self,
+        query: str,
+        agent: BaseAgent,
+        agent_response: str,
+        chat_history: List[ChatMessage],
+        verbose: bool = False
+    ) -> None:
+        """Validate off the critical path; the result only feeds the rolling scores"""
+        async def shadow_validate():
+            # Not bounded by the request's deadline, which may pass as soon as the response is sent
+            with no_deadline():
+                validation_result = await self.validate_response(
+                    user_query=query,
+                    agent_name=agent.name,
+                    agent_response=agent_response,
+                    chat_history=chat_history,
+                    verbose=verbose
+                )
+            self._record_validation(agent, validation_result)
+        
+        self.validation_stats["shadow"] += 1
+        task = asyncio.create_task(shadow_validate())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _apply_validation(
+        self,
+        query: str,
+        agent: BaseAgent,
+        agent_response: str,
+        chat_history: List[ChatMessage],
+        verbose: bool = False
+    ) -> str:
+        """Validate (and maybe refine) a response according to the validation policy"""
+        if not has_budget() or not self._should_validate(agent):
+            # Past the deadline an unvalidated answer beats no answer
+            return agent_response
+        
+        if self.validation_mode == ValidationMode.ASYNC_SHADOW:
+            self._start_shadow_validation(query, agent, agent_response, chat_history, verbose)
+            return agent_response
+        
+        validation_result = await self.validate_response(
+            user_query=query,
+            agent_name=agent.name,
+            agent_response=agent_response,
+            chat_history=chat_history,
+            verbose=verbose
+        )
+        self._record_validation(agent, validation_result)
+        
+        if verbose:
+            logger.info(f"Validation score: {validation_result.get('score', 1.0):.2f}")
+            
+        # Check if refinement is needed
+        if not self._needs_refinement(validation_result):
+            return agent_response
+        
+        if verbose:
+            logger.info(f"Refining response based on validation feedback")
+        self.validation_stats["refined"] += 1
+        return await self.refine_response(
+            user_query=query,
+            agent_response=agent_response,
+            validation_feedback=validation_result,
+            verbose=verbose
+        )
+
+    async def _validate_streamed_response(
+        self,
+        query: str,
+        agent: BaseAgent,
+        response: str,
+        chat_history: List[ChatMessage],
+        mode: str,
+        verbose: bool = False
+    ) -> Optional[str]:
+        """Validation stage for an already streamed response; returns the refined answer, if any"""
+        if mode == "none" or not has_budget() or not self._should_validate(agent):
+            return None
+        
+        if mode == "background":
+            self._start_shadow_validation(query, agent, response, chat_history, verbose)
+            return None
+        
+        validation_result = await self.validate_response(
+            user_query=query,
+            agent_name=agent.name,
+            agent_response=response,
+            chat_history=chat_history,
+            verbose=verbose
+        )
+        self._record_validation(agent, validation_result)
+        if not self._needs_refinement(validation_result):
+            return None
+        
+        if verbose:
+            logger.info(f"Refining streamed response based on validation feedback")
+        self.validation_stats["refined"] += 1
+        # Same refinement as the blocking path, so both end with the same answer
+        return await self.refine_response(
+            user_query=query,
+            agent_response=response,
+            validation_feedback=validation_result,
+            verbose=verbose
+        )
+
+    def get_validation_stats(self) -> Dict[str, Any]:
+        """Validation counters and rolling scores per agent, for dashboards"""
+        return {
+            **self.validation_stats,
+            "mode": self.validation_mode.value,
+            "agents": {
+                agent_id: {
+                    "rolling_score": sum(scores) / len(scores) if scores else None,
+                    "samples": len(scores),
+                    "validation_rate": self._get_validation_rate(self.agent_registry[agent_id]),
+                }
+                for agent_id, scores in self.validation_scores.items()
+                if agent_id in self.agent_registry
+            },
+        }
+
+    def get_routing_stats(self) -> Dict[str, Any]:
+        """How often requests were routed by stickiness or locally instead of by the LLM"""
+        total = sum(self.routing_stats.values())
+        return {
+            **self.routing_stats,
+            "sticky_ratio": self.routing_stats["sticky"] / total if total else 0.0,
+            "fast_path_ratio": self.routing_stats["fast_path"] / total if total else 0.0,
+        }
+
+    def get_speculation_stats(self) -> Dict[str, Any]:
+        """Hit rate of speculative execution and the latency it saved"""
+        attempts = self.speculation_stats["attempts"]
+        hits = self.speculation_stats["hits"]
+        return {
+            **self.speculation_stats,
+            "enabled": self.speculative,
+            "hit_rate": hits / attempts if attempts else 0.0,
+            "avg_saved_seconds": self.speculation_stats["saved_seconds"] / hits if hits else 0.0,
+        }
+
     async def get_agent_status(self) -> Dict[str, Any]:
         """Get status information about all registered agents"""
         return {
             "total_agents": len(self.agent_registry),
+            "routing": self.get_routing_stats(),
+            "speculation": self.get_speculation_stats(),
+            "validation": self.get_validation_stats(),
+            "tools": self.tool_executor.get_stats(),
+            "tool_pools": self.tool_executor.get_pool_stats(),
             "registered_agents": [
                 {
                     "id": agent_id,
                     "name": agent.name,
                     "description": agent.description,
+                    "tool_prompt": agent.get_tool_prompt_stats(),
                     "status": "active"  # Could be expanded to check actual agent status
                 }
                 for agent_id, agent in self.agent_registry.items()
@@ -349,13 +785,15 @@ class ManagerAgent(BaseAgent):
         """Async chat implementation for BaseAgent"""
         additional_params = kwargs.get("additional_params", {})
         max_retries = kwargs.get("max_retries", 1)
+        session_id = kwargs.get("session_id")
         
         return await self.run(
             query=query,
             chat_history=chat_history,
             verbose=verbose,
             additional_params=additional_params,
-            max_retries=max_retries
+            max_retries=max_retries,
+            session_id=session_id
         )
         
     def chat(
@@ -393,30 +831,69 @@ class ManagerAgent(BaseAgent):
         *args,
         **kwargs
     ) -> AsyncGenerator[str, None]:
-        """Async streaming chat implementation for BaseAgent"""
+        """
+        Async streaming chat implementation for BaseAgent.
+
+        Tokens of the selected agent are forwarded as they are produced.
+        `stream_validation` controls the validation stage once the stream is complete:
+        "none" skips it, "post" validates and streams a refined answer if needed,
+        "background" validates in a background task and only records the result.
+        It follows the configured validation mode: "background" in async-shadow mode
+        and "post" otherwise, where the validation policy (never, sampled, adaptive)
+        still decides whether a given response is validated.
+
+        A refined answer replaces the streamed one rather than extending it: it is
+        emitted as a "refined" event and passed to the `on_refined` callback. Without
+        a callback it is streamed after the original answer, separated by a blank line.
+        """
         chat_history = chat_history or []
         additional_params = kwargs.get("additional_params", {})
-        max_retries = kwargs.get("max_retries", 1)
+        stream_validation = kwargs.get(
+            "stream_validation",
+            "background" if self.validation_mode == ValidationMode.ASYNC_SHADOW else "post"
+        )
+        session_id = kwargs.get("session_id")
+        on_refined = kwargs.get("on_refined")
         
         if self.callbacks:
             self.callbacks.on_agent_start(self.name)
             
         try:
-            response = await self.run(
-                query=query,
-                chat_history=chat_history,
-                verbose=verbose,
-                additional_params=additional_params,
-                max_retries=max_retries
-            )  
-            # Simulate streaming by yielding chunks
-            chunk_size = 5  # Characters per chunk
-            for i in range(0, len(response), chunk_size):
-                chunk = response[i:i+chunk_size]
+            selected_agent = await self._route(query, chat_history, verbose, session_id)
+            
+            if selected_agent:
+                stream = selected_agent.astream_chat(
+                    query=query,
+                    verbose=verbose,
+                    chat_history=chat_history,
+                    **additional_params
+                )
+            else:
+                stream = self.llm.astream_chat("Answer this question: " + query, chat_history=chat_history)
+            
+            # Pipe the selected agent's stream straight to the caller
+            response = ""
+            async for chunk in stream:
+                response += chunk
                 if self.callbacks:
                     self.callbacks.on_llm_new_token(chunk)
                 yield chunk
-                await asyncio.sleep(0.05)  # Small delay to simulate streaming
+            
+            if selected_agent:
+                refined = await self._validate_streamed_response(
+                    query=query,
+                    agent=selected_agent,
+                    response=response,
+                    chat_history=chat_history,
+                    mode=stream_validation,
+                    verbose=verbose
+                )
+                if refined is not None:
+                    emit_event("refined", agent=selected_agent.name, text=refined)
+                    if on_refined is not None:
+                        on_refined(refined)
+                    else:
+                        yield "\n\n" + refined
                     
         except Exception as e:
             logger.error(f"Error in streaming: {str(e)}")
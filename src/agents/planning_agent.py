@@ -1,10 +1,16 @@
 import json
-from typing import AsyncGenerator, Generator, List,Any, Optional
+from typing import AsyncGenerator, Dict, Generator, List,Any, Optional, Tuple
 from colorama import Fore
 from llama_index.core.tools import FunctionTool
 from llama_index.core.llms import ChatMessage
 from src.agents.llm import BaseLLM
-from src.agents.utils import PlanStep, ExecutionPlan, clean_json_response
+from src.agents.utils import (PlanStep,
+                              ExecutionPlan,
+                              clean_json_response,
+                              DeadlineExceeded,
+                              check_deadline,
+                              emit_event,
+                              has_event_sink)
 from src.agents.base import BaseAgent, AgentOptions
 import asyncio
 from src.logger import get_formatted_logger
@@ -15,18 +21,34 @@ logger = get_formatted_logger(__name__)
 class PlanningAgent(BaseAgent):
     """Agent that creates and executes plans using available tools"""
     
-    def __init__(self, llm: BaseLLM, options: AgentOptions, system_prompt:str = "", tools: List[FunctionTool] = []):
+    def __init__(
+        self,
+        llm: BaseLLM,
+        options: AgentOptions,
+        system_prompt:str = "",
+        tools: List[FunctionTool] = [],
+        max_parallel_steps: int = 4,
+        inline_tool_arguments: bool = True
+    ):
         super().__init__(llm, options, system_prompt, tools)
+        self.max_parallel_steps = max(1, max_parallel_steps)  # Cap on steps executed concurrently
+        self.inline_tool_arguments = inline_tool_arguments  # Planner emits tool arguments with each step
 
     async def _get_initial_plan(self, task: str, verbose:bool) -> ExecutionPlan:
         """Generate initial execution plan with focus on available tools"""
+        arguments_rule, arguments_field = "", ""
+        if self.inline_tool_arguments:
+            arguments_rule = """
+        8. For tool steps, fill "arguments" with values matching the tool Parameters exactly; use null if they depend on results of earlier steps"""
+            arguments_field = """,
+                    "arguments": {"parameter_name": "value"} or null"""
         prompt = f"""
         You are a planning assistant with access to specific tools. Create a focused plan using ONLY the tools listed below.
         
         Task to accomplish: {task}
         
         Available tools and specifications:
-        {self._format_tool_signatures()}
+        {self._format_tool_signatures(task)}
         
         Important rules:
         1. ONLY use the tools listed above - do not assume any other tools exist
@@ -34,14 +56,18 @@ class PlanningAgent(BaseAgent):
         3. For information retrieval tasks, immediately use the RAG search tool if available
         4. Keep the plan simple and focused - avoid unnecessary steps
         5. Never include web searches or external tool usage in the plan
+        6. Give every step a unique id and list in "depends_on" the ids of the steps whose results it needs
+        7. Steps that do not need each other's results (e.g. the same lookup for different inputs) must have an empty "depends_on" so they can run in parallel{arguments_rule}
         
         Format your response as JSON:
         {{
             "steps": [
                 {{
+                    "id": "1",
                     "description": "step description",
                     "requires_tool": true/false,
-                    "tool_name": "tool_name or null"
+                    "tool_name": "tool_name or null",
+                    "depends_on": []{arguments_field}
                 }},
                 ...
             ]
@@ -64,11 +90,17 @@ class PlanningAgent(BaseAgent):
                         # Skip invalid tool steps
                         continue
                 
+                step_id = step_data.get('id')
                 plan.add_step(PlanStep(
                     description=step_data['description'],
                     tool_name=step_data.get('tool_name'),
-                    requires_tool=step_data.get('requires_tool', True)
+                    requires_tool=step_data.get('requires_tool', True),
+                    step_id=str(step_id) if step_id is not None else None,
+                    depends_on=[str(dep) for dep in step_data.get('depends_on') or []],
+                    arguments=step_data.get('arguments') if self.inline_tool_arguments else None
                 ))
+            # Dependencies on skipped or unknown steps are dropped
+            plan.normalize_dependencies()
             if verbose:
                 logger.info(f"Initial plan generated successfully with: {len(plan.steps)} step.")
             return plan
@@ -78,8 +110,7 @@ class PlanningAgent(BaseAgent):
                 logger.error(f"Error generating initial plan: {str(e)}")
             raise e
 
-    async def _generate_summary(self, task: str, results: List[Any], verbose:bool) -> str:
-        """Generate a coherent summary of the results"""
+    def _build_summary_prompt(self, task: str, results: List[Any]) -> str:
         prompt = f"""
         Create a clear and concise summary based on the following:
         
@@ -92,11 +123,14 @@ class PlanningAgent(BaseAgent):
         3. Focus on providing a direct, informative answer
         4. If the information seems insufficient, acknowledge that
         """
-        
+        return self.system_prompt + "\n" + prompt
+
+    async def _generate_summary(self, task: str, results: List[Any], verbose:bool) -> str:
+        """Generate a coherent summary of the results"""
         if verbose:
             logger.info("Generating summary...")
         
-        summary_prompt = self.system_prompt + "\n" + prompt
+        summary_prompt = self._build_summary_prompt(task, results)
         
         try:
             result = await self.llm.achat(query=summary_prompt)
@@ -108,6 +142,109 @@ class PlanningAgent(BaseAgent):
                 logger.error(f"Error generating summary: {str(e)}")
             raise e
 
+    async def _astream_summary(self, task: str, results: List[Any], verbose:bool) -> AsyncGenerator[str, None]:
+        """Stream the summary of the results token by token"""
+        if verbose:
+            logger.info("Streaming summary...")
+        
+        try:
+            async for chunk in self.llm.astream_chat(query=self._build_summary_prompt(task, results)):
+                yield chunk
+        except Exception as e:
+            if verbose:
+                logger.error(f"Error streaming summary: {str(e)}")
+            raise e
+
+    def _describe_step(self, step: PlanStep, plan: ExecutionPlan) -> str:
+        """Step description including the results of the steps it depends on"""
+        dependencies = [dep for dep in plan.get_dependencies(step) if dep.result is not None]
+        if not dependencies:
+            return step.description
+        context = "\n".join(f"- {dep.description}: {dep.result}" for dep in dependencies)
+        return f"{step.description}\n\nResults from previous steps:\n{context}"
+
+    async def _execute_step(self, step: PlanStep, plan: ExecutionPlan, verbose: bool) -> Any:
+        """Execute a single step, feeding in the results of its dependencies"""
+        description = self._describe_step(step, plan)
+        if step.requires_tool:
+            result = await self._execute_tool(step.tool_name, description, step.requires_tool, step.arguments)
+            if verbose:
+                logger.info(f"Tool {step.tool_name} executed successfully with result: {result}")
+            return result
+        # Non-tool step - use LLM directly
+        return await self.llm.achat(query=description)
+
+    async def _aexecute_plan(
+        self,
+        plan: ExecutionPlan,
+        verbose: bool
+    ) -> AsyncGenerator[Tuple[str, PlanStep], None]:
+        """
+        Execute the plan as a dependency graph.
+
+        Steps whose dependencies are complete run concurrently, up to
+        `max_parallel_steps` at a time. Yields ("start", step) when a step is
+        scheduled and ("end", step) as soon as it finishes, so wall time is
+        roughly the critical path of the plan.
+        """
+        emit_event(
+            "plan",
+            agent=self.name,
+            steps=[
+                {"id": step.id, "description": step.description, "tool": step.tool_name, "depends_on": step.depends_on}
+                for step in plan.steps
+            ]
+        )
+        running: Dict[asyncio.Future, PlanStep] = {}
+        try:
+            while not plan.is_complete():
+                for step in plan.get_ready_steps(running.values()):
+                    if len(running) >= self.max_parallel_steps:
+                        break
+                    check_deadline(f"plan step {step.id}")
+                    if verbose:
+                        logger.info(f"\nStep {step.id}/{len(plan.steps)}: {step.description}")
+                    running[asyncio.ensure_future(self._execute_step(step, plan, verbose))] = step
+                    emit_event("step_start", agent=self.name, step_id=step.id, description=step.description, tool=step.tool_name)
+                    yield "start", step
+
+                if not running:
+                    # normalize_dependencies guarantees progress; guard against malformed plans anyway
+                    raise RuntimeError("Plan has steps with unsatisfiable dependencies")
+
+                done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    step = running.pop(task)
+                    error = task.exception()
+                    if isinstance(error, DeadlineExceeded):
+                        raise error
+                    if error is not None:
+                        if verbose:
+                            logger.error(f"Error in step {step.id}: {str(error)}")
+                        if step.requires_tool:
+                            raise error
+                    plan.mark_complete(step.id, None if error else task.result(), error)
+                    emit_event(
+                        "step_end",
+                        agent=self.name,
+                        step_id=step.id,
+                        result=None if step.result is None else str(step.result),
+                        error=None if error is None else str(error)
+                    )
+                    if verbose:
+                        logger.info(f"Step {step.id}/{len(plan.steps)} completed.")
+                    yield "end", step
+        finally:
+            for task in running:
+                task.cancel()
+
+    async def _execute_steps(self, plan: ExecutionPlan, max_steps: int, verbose: bool) -> List[Any]:
+        """Execute the plan steps and collect their results in plan order"""
+        plan.truncate(max_steps)
+        async for _ in self._aexecute_plan(plan, verbose):
+            pass
+        return [step.result for step in plan.steps if step.result is not None]
+
     async def run(
         self,
         query: str,
@@ -127,39 +264,14 @@ class PlanningAgent(BaseAgent):
                 logger.info("\nExecuting plan...")
             
             # Execute all steps and collect results
-            results = []
-            for step_num, step in enumerate(plan.steps, 1):
-                if step_num > max_steps:
-                    break
-                    
-                if verbose:
-                    logger.info(f"\nStep {step_num}/{len(plan.steps)}: {step.description}")
-                
-                try:
-                    if step.requires_tool:
-                        result = await self._execute_tool(step.tool_name, step.description,step.requires_tool)
-                        if verbose:
-                            logger.info(f"Tool {step.tool_name} executed successfully with arguments: {result}")
-                        if result is not None:
-                            results.append(result)
-                    else:
-                        # Non-tool step - use LLM directly
-                        result = await self.llm.achat(query=step.description)
-                        results.append(result)
-                        
-                except Exception as e:
-                    if verbose:
-                        logger.error(f"Error in step {step_num}: {str(e)}")
-                    if step.requires_tool:
-                        if verbose:
-                            logger.error(f"Error executing tool {step.tool_name}: {str(e)}")
-                        raise
-                if verbose:
-                    logger.info(f"Step {step_num}/{len(plan.steps)} completed.")
+            results = await self._execute_steps(plan, max_steps, verbose)
                         
             # Generate final summary
+            check_deadline("plan summary")
             return await self._generate_summary(query, results, verbose)
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             if verbose:
                 logger.error(f"Error in run: {str(e)}")
@@ -228,60 +340,63 @@ class PlanningAgent(BaseAgent):
         verbose: bool,
         chat_history: List[ChatMessage]
     ) -> AsyncGenerator[str, None]:
-        """Stream the plan execution process with status updates"""
+        """
+        Stream the plan execution process with status updates.
+        When a caller listens for structured events, progress is reported as
+        plan/step events instead and only the answer is streamed as text.
+        """
+        report = not has_event_sink()
         try:
             # Start with planning notification
-            yield "Planning your request...\n"
+            if report:
+                yield "Planning your request...\n"
             
             # Generate plan
             plan = await self._get_initial_plan(query, verbose)
             
-            yield f"Created plan with {len(plan.steps)} steps.\n"
+            if report:
+                yield f"Created plan with {len(plan.steps)} steps.\n"
             
-            # Execute all steps and collect results
-            results = []
-            for step_num, step in enumerate(plan.steps, 1):
-                if step_num > max_steps:
-                    yield "\nReached maximum number of steps. Finalizing results...\n"
-                    break
-                
-                # Stream step information
-                yield f"\nExecuting step {step_num}: {step.description}\n"
-                
-                try:
+            if len(plan.steps) > max_steps:
+                plan.truncate(max_steps)
+                if report:
+                    yield f"Reached maximum number of steps. Executing the first {max_steps} steps...\n"
+            
+            # Execute ready steps concurrently and report each one as it finishes
+            async for event, step in self._aexecute_plan(plan, verbose):
+                if event == "end" and step.error is not None:
+                    logger.error(f"Error in step {step.id}: {str(step.error)}")
+                if not report:
+                    continue
+                if event == "start":
+                    yield f"\nExecuting step {step.id}: {step.description}\n"
                     if step.requires_tool:
                         yield f"Using tool: {step.tool_name}\n"
-                        result = await self._execute_tool(step.tool_name, step.description, step.requires_tool)
-                        if result is not None:
-                            yield "Tool execution complete.\n"
-                            results.append(result)
                     else:
                         yield "Processing with general knowledge...\n"
-                        result = await self.llm.achat(query=step.description)
-                        results.append(result)
-                        
-                except Exception as e:
-                    error_msg = f"Error in step {step_num}: {str(e)}\n"
-                    yield error_msg
-                    logger.error(error_msg)
-                    if step.requires_tool:
-                        raise
+                elif step.error is not None:
+                    yield f"Error in step {step.id}: {str(step.error)}\n"
+                elif step.result is not None:
+                    yield f"Step {step.id} complete.\n"
+            results = [step.result for step in plan.steps if step.result is not None]
             
             # Generate and stream final summary
-            yield "\nGenerating final response based on collected information...\n\n"
+            check_deadline("plan summary")
+            if report:
+                yield "\nGenerating final response based on collected information...\n\n"
             
-                # Fallback if streaming is not available
-            summary = await self._generate_summary(query, results, verbose)
-            # Simulate streaming by yielding chunks
-            chunk_size = 15
-            for i in range(0, len(summary), chunk_size):
-                yield summary[i:i+chunk_size]
-                await asyncio.sleep(0.01)
+            async for chunk in self._astream_summary(query, results, verbose):
+                yield chunk
                 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             error_msg = f"Error during plan execution: {str(e)}"
             logger.error(error_msg)
-            yield f"\n{error_msg}\n"
+            if report:
+                yield f"\n{error_msg}\n"
+            else:
+                emit_event("error", agent=self.name, message=error_msg)
 
     async def astream_chat(
         self,
@@ -309,19 +424,13 @@ class PlanningAgent(BaseAgent):
                 ):
                     yield token
             else:
-                # Otherwise, just run the normal flow and stream the final result
-                result = await self.run(
-                    query=query,
-                    max_steps=max_steps,
-                    verbose=verbose,
-                    chat_history=chat_history
-                )
-                
-                # Stream the final result in chunks to simulate streaming
-                chunk_size = 5
-                for i in range(0, len(result), chunk_size):
-                    yield result[i:i+chunk_size]
-                    await asyncio.sleep(0.05)
+                # Otherwise, execute the plan and stream only the final summary
+                plan = await self._get_initial_plan(query, verbose)
+                results = await self._execute_steps(plan, max_steps, verbose)
+                async for chunk in self._astream_summary(query, results, verbose):
+                    if self.callbacks:
+                        self.callbacks.on_llm_new_token(chunk)
+                    yield chunk
         
         finally:
             if self.callbacks:
@@ -1,13 +1,13 @@
 import asyncio
-from typing import List, Any, Generator, Optional, AsyncGenerator, Union
+from typing import List, Any, Generator, Optional, AsyncGenerator, Tuple, Union
 from llama_index.core.llms import ChatMessage
 from llama_index.core.tools import FunctionTool
 import json
 from src.logger import get_formatted_logger
 from colorama import Fore
-from src.agents.llm import BaseLLM
+from src.agents.llm import BaseLLM, ToolCallResponse
 from src.agents.base import BaseAgent, AgentOptions
-from src.agents.utils import ChatHistory
+from src.agents.utils import ChatHistory, DeadlineExceeded, check_deadline, has_budget, emit_event
 
 logger = get_formatted_logger(__name__)
 
@@ -92,17 +92,89 @@ class ReflectionAgent(BaseAgent):
         if verbose:
             logger.debug("Calling async reflect")
         if self.tools:
-            history.get_messages()[-1].content += f"\nAvailable tools:\n{self._format_tool_signatures()}"
+            last_message = history.get_messages()[-1]
+            last_message.content += f"\nAvailable tools:\n{self._format_tool_signatures(last_message.content)}"
         return await self.agenerate_response(history.get_messages(), verbose)
 
+    async def areflect_with_tools(self, history: ChatHistory, verbose: bool = False) -> ToolCallResponse:
+        """
+        Reflect with the tools passed through native function calling, so the
+        critique and the tool calls (with arguments) come back in one round trip.
+        """
+        if verbose:
+            logger.debug("Calling async reflect with tools")
+        messages = history.get_messages()
+        return await self.llm.achat_with_tools(
+            messages[-1].content,
+            self._select_tools(messages[-1].content),
+            chat_history=messages[:-1],
+            allow_parallel_tool_calls=True
+        )
+
     def reflect(self, history: ChatHistory, verbose: bool = False) -> str:
         if verbose:
             logger.debug("Calling reflect")
         if self.tools:
-            history.get_messages()[-1].content += f"\nAvailable tools:\n{self._format_tool_signatures()}"
+            last_message = history.get_messages()[-1]
+            last_message.content += f"\nAvailable tools:\n{self._format_tool_signatures(last_message.content)}"
         return self.generate_response(history.get_messages(), verbose)
 
 
+    async def _acritique(
+        self,
+        generation: str,
+        generation_history: ChatHistory,
+        reflection_history: ChatHistory,
+        tool_steps_count: int,
+        max_tool_steps: int,
+        verbose: bool = False
+    ) -> Tuple[Optional[str], int]:
+        """
+        Reflect on a generation and record the critique in both histories.
+        Returns (None, tool_steps_count) when the content is satisfactory.
+        """
+        generation_history.add("assistant", generation)
+        reflection_history.add("user", generation)
+
+        # Reflect on the generation
+        if self.tools and self.llm.supports_function_calling:
+            response = await self.areflect_with_tools(reflection_history, verbose=verbose)
+            critique = response.content
+            # (tool_name, description, arguments); arguments come structured from the provider
+            tool_calls = [(call.tool_name, "Improve the content", call.arguments) for call in response.tool_calls]
+        else:
+            critique = await self.areflect(reflection_history, verbose=verbose)
+            tool_calls = None
+        
+        if "<OK>" in critique and not tool_calls:
+            if verbose:
+                logger.info("\nReflection complete - content is satisfactory\n")
+            return None, tool_steps_count
+
+        if tool_calls is None:
+            # Check for tool recommendations in critique
+            tool_calls = [
+                (tool_name, tool_description, None)
+                for tool_name, tool_description in self._extract_tool_recommendations(critique, verbose)
+            ]
+        
+        for tool_name, tool_description, arguments in tool_calls:
+            if tool_steps_count < max_tool_steps:
+                try:
+                    tool_result = await self._execute_tool(tool_name, tool_description, True, arguments)
+                    if not tool_result:
+                        critique += f"\nTool {tool_name} did not return any result"
+                    else:
+                        critique += f"\nTool {tool_name} result: {tool_result}"
+                    tool_steps_count += 1
+                except DeadlineExceeded:
+                    raise
+                except Exception as e:
+                    critique += f"\nTool {tool_name} execution failed: {str(e)}"
+        generation_history.add("user", critique)
+        reflection_history.add("assistant", critique)
+        return critique, tool_steps_count
+
     async def aloop(
         self,
         generation_history: ChatHistory,
@@ -115,55 +187,104 @@ class ReflectionAgent(BaseAgent):
         final_generation = ""
 
         for step in range(n_steps):
+            if final_generation and not has_budget():
+                # Out of time: the last generation is the best answer we have
+                if verbose:
+                    logger.info(f"Deadline reached, stopping reflection after {step} steps")
+                break
             if verbose:
                 logger.info(f"Step {step + 1}/{n_steps}")
 
             # Generate content
+            check_deadline("reflection generation")
+            emit_event("step_start", agent=self.name, step_id=str(step + 1), description=f"Reflection step {step + 1}/{n_steps}")
             generation = await self.agenerate(generation_history, verbose=verbose)
-            generation_history.add("assistant", generation)
-            reflection_history.add("user", generation)
+            final_generation = generation
 
-            # Reflect on the generation
-            critique = await self.areflect(reflection_history, verbose=verbose)
-            
-            if "<OK>" in critique:
+            try:
+                critique, tool_steps_count = await self._acritique(
+                    generation,
+                    generation_history,
+                    reflection_history,
+                    tool_steps_count,
+                    max_tool_steps,
+                    verbose
+                )
+            except DeadlineExceeded:
                 if verbose:
-                    logger.info("\nReflection complete - content is satisfactory\n")
-                final_generation = generation
+                    logger.info("Deadline reached during critique, returning the last generation")
+                break
+            emit_event("step_end", agent=self.name, step_id=str(step + 1), critique=critique)
+            if critique is None:
                 break
-
-            # Check for tool recommendations in critique
-            tool_recommendations = self._extract_tool_recommendations(critique,verbose)
-            
-            for tool_name, tool_description in tool_recommendations:
-                if tool_steps_count < max_tool_steps:
-                    try:
-                        tool_result = await self._execute_tool(tool_name, tool_description,True)
-                        if not tool_result:
-                            critique += f"\nTool {tool_name} did not return any result"
-                        else:
-                            critique += f"\nTool {tool_name} result: {tool_result}"
-                        tool_steps_count += 1
-                    except Exception as e:
-                        critique += f"\nTool {tool_name} execution failed: {str(e)}"
-            generation_history.add("user", critique)
-            reflection_history.add("assistant", critique)
-            final_generation = generation
             if verbose:
                 logger.info(f"Step {step + 1}/{n_steps} completed")
         if verbose:
             logger.info(f"\n\nFinal generation: {final_generation}\n\n")
         return final_generation
 
-    # Implement the required methods from BaseAgent
-    async def run(
+    async def astream_loop(
         self,
-        query: str,
-        n_steps: int = 3,
-        max_tool_steps: int = 2,
-        verbose: bool = False,
-        chat_history: List[ChatMessage] = []
-    ) -> str:
+        generation_history: ChatHistory,
+        reflection_history: ChatHistory,
+        n_steps: int,
+        max_tool_steps: int,
+        verbose: bool = False
+    ) -> AsyncGenerator[str, None]:
+        """
+        Same loop as `aloop`, but the last generation is streamed straight from the LLM.
+        The critique of the last generation is never used by `aloop`, so it is skipped here.
+        Like `aloop`, a deadline hit after the first draft yields that draft instead of failing.
+        """
+        tool_steps_count = 0
+        generation = ""
+
+        for step in range(n_steps - 1):
+            if generation and not has_budget():
+                if verbose:
+                    logger.info(f"Deadline reached, stopping reflection after {step} steps")
+                yield generation
+                return
+            if verbose:
+                logger.info(f"Step {step + 1}/{n_steps}")
+
+            check_deadline("reflection generation")
+            emit_event("step_start", agent=self.name, step_id=str(step + 1), description=f"Reflection step {step + 1}/{n_steps}")
+            generation = await self.agenerate(generation_history, verbose=verbose)
+            try:
+                critique, tool_steps_count = await self._acritique(
+                    generation,
+                    generation_history,
+                    reflection_history,
+                    tool_steps_count,
+                    max_tool_steps,
+                    verbose
+                )
+            except DeadlineExceeded:
+                if verbose:
+                    logger.info("Deadline reached during critique, returning the last generation")
+                yield generation
+                return
+            emit_event("step_end", agent=self.name, step_id=str(step + 1), critique=critique)
+            if critique is None:
+                yield generation
+                return
+
+        if n_steps < 1:
+            # `aloop` makes no generation at all here
+            yield ""
+            return
+        if generation and not has_budget():
+            yield generation
+            return
+        check_deadline("final generation")
+        if verbose:
+            logger.info(f"Step {n_steps}/{n_steps}: streaming final generation")
+        messages = generation_history.get_messages()
+        async for chunk in self.llm.astream_chat(query=messages[-1].content, chat_history=messages[:-1]):
+            yield chunk
+
+    def _build_histories(self, query: str, chat_history: List[ChatMessage]) -> Tuple[ChatHistory, ChatHistory]:
         # Initialize system prompts
         full_gen_prompt = self.system_prompt + "\n"  + BASE_GENERATION_SYSTEM_PROMPT
         full_ref_prompt = self.system_prompt + "\n"  + BASE_REFLECTION_SYSTEM_PROMPT
@@ -189,6 +310,18 @@ class ReflectionAgent(BaseAgent):
                     generation_history.add("user", msg.content)
                 elif msg.role == "assistant":
                     generation_history.add("assistant", msg.content)
+        return generation_history, reflection_history
+
+    # Implement the required methods from BaseAgent
+    async def run(
+        self,
+        query: str,
+        n_steps: int = 3,
+        max_tool_steps: int = 2,
+        verbose: bool = False,
+        chat_history: List[ChatMessage] = []
+    ) -> str:
+        generation_history, reflection_history = self._build_histories(query, chat_history)
 
         return await self.aloop(
             generation_history,
@@ -270,22 +403,17 @@ class ReflectionAgent(BaseAgent):
             self.callbacks.on_agent_start(self.name)
 
         try:
-            # First perform the reflection loop to get the final content
-            final_content = await self.run(
-                query=query,
-                n_steps=n_steps,
-                max_tool_steps=max_tool_steps,
-                verbose=verbose,
-                chat_history=chat_history
-            )
-            
-            # If no final polish, just yield the final content in chunks
-            # This simulates streaming for consistency
-            chunk_size = 5  # Adjust as needed
-            for i in range(0, len(final_content), chunk_size):
-                chunk = final_content[i:i+chunk_size]
+            generation_history, reflection_history = self._build_histories(query, chat_history)
+            async for chunk in self.astream_loop(
+                generation_history,
+                reflection_history,
+                n_steps,
+                max_tool_steps,
+                verbose
+            ):
+                if self.callbacks:
+                    self.callbacks.on_llm_new_token(chunk)
                 yield chunk
-                await asyncio.sleep(0.05)  # Small delay to simulate streaming
         except Exception as e:
             raise e           
         finally:
@@ -3,9 +3,52 @@ from .pattern import (ChatHistory,
                       ExecutionPlan,
                       clean_json_response
                       )
+from .vectorizer import HashingVectorizer
+from .router import LocalRouter
+from .sticky import FollowUpDetector, StickyRoute, StickyRouteStore
+from .schema import validate_arguments
+from .vector_index import VectorIndex
+from .tool_index import ToolIndex
+from .batch import map_bounded
+from .events import AgentEvent, EventSink, event_sink_scope, has_event_sink, emit_event
+from .deadline import (Deadline,
+                       DeadlineExceeded,
+                       deadline_scope,
+                       no_deadline,
+                       get_deadline,
+                       remaining_time,
+                       check_deadline,
+                       has_budget,
+                       with_deadline,
+                       iterate_with_deadline
+                       )
 __all__ = [
     "ChatHistory", 
     "PlanStep",
     "ExecutionPlan",
-    "clean_json_response"
+    "clean_json_response",
+    "HashingVectorizer",
+    "LocalRouter",
+    "FollowUpDetector",
+    "StickyRoute",
+    "StickyRouteStore",
+    "validate_arguments",
+    "VectorIndex",
+    "ToolIndex",
+    "Deadline",
+    "DeadlineExceeded",
+    "deadline_scope",
+    "no_deadline",
+    "get_deadline",
+    "remaining_time",
+    "check_deadline",
+    "has_budget",
+    "with_deadline",
+    "iterate_with_deadline",
+    "map_bounded",
+    "AgentEvent",
+    "EventSink",
+    "event_sink_scope",
+    "has_event_sink",
+    "emit_event"
 ]
@@ -0,0 +1,46 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+async def map_bounded(
+    items: Iterable[T],
+    fn: Callable[[T], Awaitable[R]],
+    max_concurrency: int = 8
+) -> AsyncIterator[Tuple[int, Optional[R], Optional[BaseException]]]:
+    """
+    Run `fn` over `items` with at most `max_concurrency` calls in flight.
+
+    Yields (index, result, error) as each call finishes, so results come back
+    in completion order; a call that was cancelled yields a CancelledError as
+    its error; tasks are created lazily, so a large input never
+    holds more than `max_concurrency` pending calls. Closing the iterator
+    cancels the calls still running.
+    """
+    max_concurrency = max(1, max_concurrency)
+    pending = iter(enumerate(items))
+    running: Dict[asyncio.Future, int] = {}
+
+    def fill() -> None:
+        while len(running) < max_concurrency:
+            try:
+                index, item = next(pending)
+            except StopIteration:
+                return
+            running[asyncio.ensure_future(fn(item))] = index
+
+    try:
+        fill()
+        while running:
+            done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index = running.pop(task)
+                # A cancelled call (e.g. by its deadline) fails its own item, not the batch
+                error = asyncio.CancelledError() if task.cancelled() else task.exception()
+                yield index, None if error else task.result(), error
+            fill()
+    finally:
+        for task in running:
+            task.cancel()
@@ -0,0 +1,125 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """The request ran out of its time budget"""
+    pass
+
+
+class Deadline:
+    """Absolute point in time by which a request must be answered"""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def check(self, stage: str) -> None:
+        """Raise DeadlineExceeded if there is no time left to start `stage`"""
+        if self.expired:
+            raise DeadlineExceeded(f"Deadline of {self.timeout}s exceeded before {stage}")
+
+
+# Deadline of the request being served; asyncio tasks inherit it from the task that created them
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("agent_deadline", default=None)
+
+
+def get_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left for the current request, or None when it has no deadline"""
+    deadline = _current_deadline.get()
+    return None if deadline is None else deadline.remaining()
+
+
+def check_deadline(stage: str) -> None:
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+def has_budget(seconds: float = 0.0) -> bool:
+    """Whether more than `seconds` are left for the current request"""
+    remaining = remaining_time()
+    return remaining is None or remaining > seconds
+
+
+@contextmanager
+def deadline_scope(timeout: Optional[float]) -> Iterator[Optional[Deadline]]:
+    """
+    Run the enclosed code under a deadline of `timeout` seconds.
+    A nested scope can only shorten the deadline of the enclosing one.
+    """
+    current = _current_deadline.get()
+    if timeout is None:
+        yield current
+        return
+    deadline = Deadline(timeout)
+    if current is not None and current.expires_at < deadline.expires_at:
+        deadline = current
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        try:
+            _current_deadline.reset(token)
+        except ValueError:
+            # An async generator finalized from another context; nothing to restore there
+            pass
+
+
+@contextmanager
+def no_deadline() -> Iterator[None]:
+    """Run the enclosed code without the deadline of the current request (e.g. background work)"""
+    token = _current_deadline.set(None)
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+
+async def with_deadline(awaitable: Awaitable[T], stage: str) -> T:
+    """Await under the current deadline, cancelling the awaitable when it runs out"""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return await awaitable
+    if deadline.expired:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        deadline.check(stage)
+    try:
+        return await asyncio.wait_for(awaitable, deadline.remaining())
+    except asyncio.TimeoutError:
+        if not deadline.expired:
+            raise
+        raise DeadlineExceeded(f"Deadline of {deadline.timeout}s exceeded during {stage}") from None
+
+
+async def iterate_with_deadline(stream: AsyncIterator[T], stage: str) -> AsyncIterator[T]:
+    """Re-yield an async iterator, giving up as soon as the current deadline runs out"""
+    iterator = stream.__aiter__()
+    try:
+        while True:
+            try:
+                chunk = await with_deadline(iterator.__anext__(), stage)
+            except StopAsyncIteration:
+                return
+            yield chunk
+    finally:
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -0,0 +1,58 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional
+
+
+@dataclass
+class AgentEvent:
+    """
+    Typed progress event of an agent run.
+
+    type: "routing", "plan", "step_start", "step_end", "tool_call", "token",
+    "refined", "final", "error" or "heartbeat"
+    """
+    type: str
+    data: Dict[str, Any] = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"type": self.type, "timestamp": self.timestamp, **self.data}
+
+
+class EventSink:
+    """Collects the events emitted while serving one request"""
+
+    def __init__(self):
+        self.queue: "asyncio.Queue[AgentEvent]" = asyncio.Queue()
+
+    def emit(self, event: AgentEvent) -> None:
+        self.queue.put_nowait(event)
+
+
+# Sink of the request being served; agent tasks inherit it from the task that created them
+_current_sink: ContextVar[Optional[EventSink]] = ContextVar("agent_event_sink", default=None)
+
+
+@contextmanager
+def event_sink_scope(sink: EventSink) -> Iterator[EventSink]:
+    """Route the events emitted by the enclosed code to `sink`"""
+    token = _current_sink.set(sink)
+    try:
+        yield sink
+    finally:
+        _current_sink.reset(token)
+
+
+def has_event_sink() -> bool:
+    """Whether someone is listening for structured events (instead of progress text)"""
+    return _current_sink.get() is not None
+
+
+def emit_event(event_type: str, **data: Any) -> None:
+    """Emit an event to the current request's sink; a no-op when nobody listens"""
+    sink = _current_sink.get()
+    if sink is not None:
+        sink.emit(AgentEvent(event_type, data))
@@ -1,4 +1,4 @@
-from typing import Any, List, Optional
+from typing import Any, Iterable, List, Optional
 from llama_index.core.llms import ChatMessage
 
 class ChatHistory:
@@ -15,12 +15,24 @@ class ChatHistory:
         return self.messages
     
 class PlanStep:
-    def __init__(self, description: str, requires_tool: bool = False, tool_name: str = None):
+    def __init__(
+        self,
+        description: str,
+        requires_tool: bool = False,
+        tool_name: str = None,
+        step_id: Optional[str] = None,
+        depends_on: Optional[List[str]] = None,
+        arguments: Optional[dict] = None
+    ):
+        self.id = step_id
         self.description = description
         self.requires_tool = requires_tool
         self.tool_name = tool_name
+        self.depends_on = list(depends_on or [])  # Ids of steps whose results this step needs
+        self.arguments = arguments  # Tool arguments emitted inline by the planner
         self.completed = False
         self.result = None
+        self.error: Optional[Exception] = None
 
 class ExecutionPlan:
     def __init__(self):
@@ -28,7 +40,15 @@ class ExecutionPlan:
         self.current_step = 0
         
     def add_step(self, step: PlanStep):
+        if step.id is None or self.get_step(step.id) is not None:
+            step.id = str(len(self.steps) + 1)
         self.steps.append(step)
+
+    def get_step(self, step_id: str) -> Optional[PlanStep]:
+        for step in self.steps:
+            if step.id == step_id:
+                return step
+        return None
         
     def get_current_step(self) -> Optional[PlanStep]:
         if self.current_step < len(self.steps):
@@ -40,9 +60,56 @@ class ExecutionPlan:
             self.steps[self.current_step].completed = True
             self.steps[self.current_step].result = result
             self.current_step += 1
+
+    def mark_complete(self, step_id: str, result: Any = None, error: Optional[Exception] = None):
+        step = self.get_step(step_id)
+        if step is not None:
+            step.completed = True
+            step.result = result
+            step.error = error
+            self.current_step = sum(1 for s in self.steps if s.completed)
+
+    def get_ready_steps(self, running: Iterable[PlanStep] = ()) -> List[PlanStep]:
+        """Steps not yet executed whose dependencies have all completed"""
+        running_ids = {step.id for step in running}
+        completed_ids = {step.id for step in self.steps if step.completed}
+        return [
+            step for step in self.steps
+            if not step.completed
+            and step.id not in running_ids
+            and all(dep in completed_ids for dep in step.depends_on)
+        ]
+
+    def get_dependencies(self, step: PlanStep) -> List[PlanStep]:
+        return [dep for dep in (self.get_step(dep_id) for dep_id in step.depends_on) if dep is not None]
+
+    def normalize_dependencies(self):
+        """
+        Drop dependencies on unknown steps and, if the dependency graph has a cycle,
+        fall back to running the steps sequentially in plan order.
+        """
+        known_ids = {step.id for step in self.steps}
+        for step in self.steps:
+            step.depends_on = [dep for dep in dict.fromkeys(step.depends_on) if dep in known_ids and dep != step.id]
+
+        visited, remaining = set(), list(self.steps)
+        while remaining:
+            ready = [step for step in remaining if all(dep in visited for dep in step.depends_on)]
+            if not ready:
+                for index, step in enumerate(self.steps):
+                    step.depends_on = [self.steps[index - 1].id] if index > 0 else []
+                return
+            for step in ready:
+                visited.add(step.id)
+                remaining.remove(step)
+
+    def truncate(self, max_steps: int):
+        """Keep only the first max_steps steps"""
+        self.steps = self.steps[:max_steps]
+        self.normalize_dependencies()
             
     def is_complete(self) -> bool:
-        return self.current_step >= len(self.steps)
+        return all(step.completed for step in self.steps)
     
     def get_progress(self) -> str:
         completed = sum(1 for step in self.steps if step.completed)
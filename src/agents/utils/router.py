@@ -0,0 +1,120 @@
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .vectorizer import HashingVectorizer
+
+
+class LocalRouter:
+    """
+    Nearest-centroid linear classifier over hashed n-gram TF-IDF features.
+
+    Each agent is represented by the centroid of its name, description and
+    example utterances. Routing a query is a single matrix-vector product, so
+    obvious requests can be dispatched without an LLM round trip.
+
+    Registering or removing an agent only updates the document frequencies;
+    IDF and centroids are recomputed once, on the first route after a change,
+    so registering N agents does not refit N times.
+    """
+
+    def __init__(
+        self,
+        vectorizer: Optional[HashingVectorizer] = None,
+        min_similarity: float = 0.1,
+        full_similarity: float = 0.3,
+        full_margin: float = 0.1,
+        min_agents: int = 2
+    ):
+        self.vectorizer = vectorizer or HashingVectorizer()
+        self.min_similarity = min_similarity  # Similarity below which the router has no confidence
+        self.full_similarity = full_similarity  # Similarity needed for full confidence
+        self.full_margin = full_margin  # Lead over the runner-up needed for full confidence
+        self.min_agents = min_agents  # With fewer agents there is no runner-up to compare against
+        # Sparse (buckets, term weights) of every training document, hashed once
+        self._features: Dict[str, List[Tuple[np.ndarray, np.ndarray]]] = {}
+        self._document_frequency = np.zeros(self.vectorizer.n_features, dtype=np.float32)
+        self._n_documents = 0
+        self._dirty = False
+        self._agent_ids: List[str] = []
+        self._centroids: np.ndarray = np.zeros((0, self.vectorizer.n_features), dtype=np.float32)
+        self._idf: Optional[np.ndarray] = None
+
+    def _document_features(self, document: str) -> Tuple[np.ndarray, np.ndarray]:
+        counts = self.vectorizer.features(document)
+        buckets = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        weights = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        # Same sublinear term frequency as HashingVectorizer.transform
+        weights = np.where(weights >= 1.0, 1.0 + np.log(np.maximum(weights, 1.0)), weights).astype(np.float32)
+        return buckets, weights
+
+    def add(self, agent_id: str, documents: List[str]) -> None:
+        """Add or replace the training utterances of an agent"""
+        self._discard(agent_id)
+        features = [self._document_features(doc) for doc in documents if doc]
+        for buckets, _ in features:
+            self._document_frequency[buckets] += 1.0
+        self._n_documents += len(features)
+        self._features[agent_id] = features
+        self._dirty = True
+
+    def remove(self, agent_id: str) -> None:
+        if self._discard(agent_id):
+            self._dirty = True
+
+    def _discard(self, agent_id: str) -> bool:
+        features = self._features.pop(agent_id, None)
+        if features is None:
+            return False
+        for buckets, _ in features:
+            self._document_frequency[buckets] -= 1.0
+        self._n_documents -= len(features)
+        return True
+
+    def _fit(self) -> None:
+        self._idf = np.log((1.0 + self._n_documents) / (1.0 + self._document_frequency)) + 1.0
+        self._agent_ids = list(self._features.keys())
+        centroids = np.zeros((len(self._agent_ids), self.vectorizer.n_features), dtype=np.float32)
+        for row, agent_id in enumerate(self._agent_ids):
+            centroid = centroids[row]
+            for buckets, weights in self._features[agent_id]:
+                values = weights * self._idf[buckets]
+                norm = np.linalg.norm(values)
+                if norm > 0:
+                    centroid[buckets] += values / norm
+            norm = np.linalg.norm(centroid)
+            if norm > 0:
+                centroid /= norm
+        self._centroids = centroids
+        self._dirty = False
+
+    def scores(self, query: str) -> List[Tuple[str, float]]:
+        """Cosine similarity of the query to every agent, best first"""
+        if self._dirty:
+            self._fit()
+        if not self._agent_ids:
+            return []
+        similarities = self._centroids @ self.vectorizer.transform(query, self._idf)
+        order = np.argsort(-similarities)
+        return [(self._agent_ids[i], float(similarities[i])) for i in order]
+
+    def route(self, query: str) -> Tuple[Optional[str], float]:
+        """
+        Return the best agent id and a confidence in [0, 1].
+
+        Confidence needs both an absolute match (similarity rising from
+        `min_similarity` to `full_similarity`) and a clear lead over the
+        runner-up (`full_margin`), so an off-topic query that merely resembles
+        one agent more than the other stays unconfident.
+        """
+        scores = self.scores(query)
+        if not scores:
+            return None, 0.0
+        agent_id, top_similarity = scores[0]
+        if len(scores) < self.min_agents:
+            return agent_id, 0.0
+        match = (top_similarity - self.min_similarity) / (self.full_similarity - self.min_similarity)
+        lead = (top_similarity - scores[1][1]) / self.full_margin
+        confidence = min(1.0, max(match, 0.0)) * min(1.0, max(lead, 0.0))
+        return agent_id, float(confidence)
+
+    def __len__(self) -> int:
+        return len(self._features)
@@ -0,0 +1,62 @@
+from typing import Any, Dict, List
+
+JSON_TYPES = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "array": (list, tuple),
+    "object": (dict,),
+    "null": (type(None),),
+}
+
+
+def _matches_type(value: Any, expected: str) -> bool:
+    if expected not in JSON_TYPES:
+        return True  # Unknown type names are not enforced
+    if isinstance(value, bool) and expected in ("integer", "number"):
+        return False
+    return isinstance(value, JSON_TYPES[expected])
+
+
+def validate_arguments(arguments: Any, schema: Dict[str, Any], path: str = "arguments") -> List[str]:
+    """
+    Validate tool arguments against the JSON schema of a FunctionTool.
+
+    Covers the subset of JSON schema produced by `ToolMetadata.get_parameters_dict`
+    (types, required, properties, items, enum, anyOf). Returns a list of error
+    messages, empty when the arguments are valid.
+    """
+    if not schema:
+        return []
+
+    if "anyOf" in schema:
+        if any(not validate_arguments(arguments, option, path) for option in schema["anyOf"]):
+            return []
+        return [f"{path}: does not match any allowed schema"]
+
+    expected = schema.get("type")
+    if expected is not None:
+        expected_types = expected if isinstance(expected, list) else [expected]
+        if not any(_matches_type(arguments, t) for t in expected_types):
+            return [f"{path}: expected {expected}, got {type(arguments).__name__}"]
+
+    if "enum" in schema and arguments not in schema["enum"]:
+        return [f"{path}: {arguments!r} is not one of {schema['enum']}"]
+
+    errors = []
+    if isinstance(arguments, dict):
+        properties = schema.get("properties", {})
+        for name in schema.get("required", []):
+            if name not in arguments:
+                errors.append(f"{path}: missing required parameter '{name}'")
+        for name, value in arguments.items():
+            if name in properties:
+                errors.extend(validate_arguments(value, properties[name], f"{path}.{name}"))
+            elif properties:
+                # Function tools reject unexpected keyword arguments
+                errors.append(f"{path}: unknown parameter '{name}'")
+    elif isinstance(arguments, (list, tuple)) and isinstance(schema.get("items"), dict):
+        for index, item in enumerate(arguments):
+            errors.extend(validate_arguments(item, schema["items"], f"{path}[{index}]"))
+    return errors
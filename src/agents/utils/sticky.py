@@ -0,0 +1,97 @@
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Optional
+
+# Confirmations and requests to continue only: question words ("why", "how") and
+# fillers ("please", "more", "next") also start new questions, which must be routed
+DEFAULT_AFFIRMATIONS = {
+    # English
+    "yes", "yeah", "yep", "yup", "ok", "okay", "sure", "go on", "continue", "go ahead",
+    "tell me more", "i want to know more", "and then", "correct", "exactly", "thanks", "thank you",
+    # Vietnamese
+    "có", "vâng", "ừ", "ừm", "dạ", "đúng", "đúng rồi", "được", "tiếp", "tiếp tục",
+    "nói thêm", "cảm ơn",
+}
+
+NUMERIC_CHOICE_PATTERN = re.compile(r"^(?:option|số|#)?\s*\d{1,2}[.)]?$")
+
+
+@dataclass
+class StickyRoute:
+    agent_id: str
+    turns: int = 0  # Follow-up turns routed without classification
+    updated_at: float = field(default_factory=time.time)
+
+
+class FollowUpDetector:
+    """
+    Cheap local detector for follow-up turns ("yes", "ok", "1", "tell me more")
+    that should go to the previously selected agent.
+
+    A short message is a follow-up when it is made of whole affirmation phrases
+    ("ok thanks", "yes go on"); sharing a word with one is not enough.
+    """
+
+    def __init__(
+        self,
+        max_words: int = 4,
+        affirmations: Optional[Iterable[str]] = None,
+        patterns: Optional[List[str]] = None,
+        rules: Optional[List[Callable[[str], bool]]] = None
+    ):
+        self.max_words = max_words
+        self.affirmations = set(affirmations) if affirmations is not None else set(DEFAULT_AFFIRMATIONS)
+        self._phrases = {tuple(phrase.split()) for phrase in self.affirmations}
+        self._max_phrase_words = max((len(phrase) for phrase in self._phrases), default=0)
+        self.patterns = [re.compile(pattern, re.IGNORECASE) for pattern in (patterns or [])]
+        self.rules = rules or []
+
+    def is_follow_up(self, text: str) -> bool:
+        normalized = re.sub(r"[^\w\s#]", " ", text.lower()).strip()
+        normalized = re.sub(r"\s+", " ", normalized)
+        if not normalized:
+            return False
+        if normalized in self.affirmations or NUMERIC_CHOICE_PATTERN.match(normalized):
+            return True
+        if any(pattern.search(text) for pattern in self.patterns):
+            return True
+        if any(rule(text) for rule in self.rules):
+            return True
+        words = normalized.split()
+        return len(words) <= self.max_words and self._is_phrase_sequence(words)
+
+    def _is_phrase_sequence(self, words: List[str]) -> bool:
+        """Whether the words split into consecutive affirmation phrases"""
+        # reachable[i]: the first i words are whole phrases
+        reachable = [True] + [False] * len(words)
+        for end in range(1, len(words) + 1):
+            for start in range(max(0, end - self._max_phrase_words), end):
+                if reachable[start] and tuple(words[start:end]) in self._phrases:
+                    reachable[end] = True
+                    break
+        return reachable[-1]
+
+
+class StickyRouteStore:
+    """
+    In-process store of the last selected agent per session.
+    Methods are async so shared backends can implement the same interface.
+    """
+
+    def __init__(self, max_sessions: int = 10_000):
+        self.max_sessions = max_sessions
+        self._routes: "OrderedDict[str, StickyRoute]" = OrderedDict()
+
+    async def get(self, session_id: str) -> Optional[StickyRoute]:
+        return self._routes.get(session_id)
+
+    async def set(self, session_id: str, route: StickyRoute) -> None:
+        self._routes[session_id] = route
+        self._routes.move_to_end(session_id)
+        while len(self._routes) > self.max_sessions:
+            self._routes.popitem(last=False)
+
+    async def delete(self, session_id: str) -> None:
+        self._routes.pop(session_id, None)
@@ -0,0 +1,70 @@
+import json
+from typing import Dict, List, Optional, Sequence
+from llama_index.core.tools import BaseTool
+from .vector_index import VectorIndex
+
+
+class ToolIndex:
+    """
+    Pre-rendered tool signatures plus a retrieval index over tool names and
+    descriptions, so prompts only carry the `top_k` tools relevant to a step.
+    """
+
+    def __init__(self, tools: Sequence[BaseTool], top_k: int = 5, index: Optional[VectorIndex] = None):
+        self.top_k = top_k
+        self.index = index or VectorIndex()
+        self._tools: Dict[str, BaseTool] = {}
+        self._signatures: Dict[str, str] = {}
+        self.stats: Dict[str, int] = {"prompts": 0, "full_chars": 0, "selected_chars": 0}
+        for tool in tools:
+            self.add(tool)
+
+    @staticmethod
+    def render_signature(tool: BaseTool) -> str:
+        metadata = tool.metadata
+        return (
+            f"Function: {metadata.name}\n"
+            f"Description: {metadata.description}\n"
+            f"Parameters: {json.dumps(metadata.get_parameters_dict())}"
+        )
+
+    def add(self, tool: BaseTool) -> None:
+        name = tool.metadata.name
+        self._tools[name] = tool
+        self._signatures[name] = self.render_signature(tool)
+        self.index.add(name, f"{name.replace('_', ' ')} {tool.metadata.description}")
+
+    def remove(self, tool_name: str) -> None:
+        self._tools.pop(tool_name, None)
+        self._signatures.pop(tool_name, None)
+        self.index.remove(tool_name)
+
+    def search(self, query: Optional[str], k: Optional[int] = None) -> List[BaseTool]:
+        """The k tools most relevant to the query, or every tool when there are at most k"""
+        k = self.top_k if k is None else k
+        if not query or len(self._tools) <= k:
+            return list(self._tools.values())
+        return [self._tools[name] for name, _ in self.index.search(query, k)]
+
+    def format(self, query: Optional[str] = None, k: Optional[int] = None) -> str:
+        """Signatures of the relevant tools, recording how much of the full list was left out"""
+        selected = [self._signatures[tool.metadata.name] for tool in self.search(query, k)]
+        rendered = "\n\n".join(selected)
+        self.stats["prompts"] += 1
+        self.stats["full_chars"] += sum(len(signature) for signature in self._signatures.values()) + 2 * max(len(self._signatures) - 1, 0)
+        self.stats["selected_chars"] += len(rendered)
+        return rendered
+
+    def get_stats(self) -> Dict[str, float]:
+        """Prompt-size savings of top-k selection compared to listing every tool"""
+        full, selected = self.stats["full_chars"], self.stats["selected_chars"]
+        return {
+            "tools": len(self._tools),
+            "top_k": self.top_k,
+            **self.stats,
+            "saved_chars": full - selected,
+            "saved_ratio": (full - selected) / full if full else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._tools)
@@ -0,0 +1,57 @@
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .vectorizer import HashingVectorizer
+
+
+class VectorIndex:
+    """
+    Array-backed in-process index of one hashed n-gram vector per key.
+
+    Vectors live in a single float32 matrix that is updated in place when keys
+    are added or removed; a search is one matrix-vector product followed by a
+    partial sort, so it stays fast with thousands of entries.
+    """
+
+    def __init__(self, vectorizer: Optional[HashingVectorizer] = None):
+        self.vectorizer = vectorizer or HashingVectorizer(n_features=2 ** 12)
+        self._keys: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._matrix: np.ndarray = np.zeros((0, self.vectorizer.n_features), dtype=np.float32)
+
+    def add(self, key: str, text: str) -> None:
+        """Add or replace the vector of a key"""
+        vector = self.vectorizer.transform(text)
+        position = self._positions.get(key)
+        if position is not None:
+            self._matrix[position] = vector
+            return
+        self._positions[key] = len(self._keys)
+        self._keys.append(key)
+        self._matrix = np.vstack([self._matrix, vector[np.newaxis, :]])
+
+    def remove(self, key: str) -> None:
+        position = self._positions.pop(key, None)
+        if position is None:
+            return
+        self._matrix = np.delete(self._matrix, position, axis=0)
+        del self._keys[position]
+        for moved_key in self._keys[position:]:
+            self._positions[moved_key] -= 1
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """Top-k keys by cosine similarity to the query, best first"""
+        if not self._keys or k <= 0:
+            return []
+        similarities = self._matrix @ self.vectorizer.transform(query)
+        if k < len(self._keys):
+            top = np.argpartition(-similarities, k - 1)[:k]
+        else:
+            top = np.arange(len(self._keys))
+        top = top[np.argsort(-similarities[top], kind="stable")]
+        return [(self._keys[i], float(similarities[i])) for i in top]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._positions
+
+    def __len__(self) -> int:
+        return len(self._keys)
@@ -0,0 +1,58 @@
+import re
+import zlib
+from typing import Dict, List
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+class HashingVectorizer:
+    """
+    Stateless text vectorizer hashing word unigrams, word bigrams and character
+    trigrams into a fixed number of buckets. Vectors are L2-normalized so a dot
+    product is the cosine similarity.
+    """
+
+    def __init__(self, n_features: int = 2 ** 14, char_ngram_weight: float = 0.5):
+        self.n_features = n_features
+        self.char_ngram_weight = char_ngram_weight
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        return TOKEN_PATTERN.findall(text.lower())
+
+    def _bucket(self, feature: str) -> int:
+        return zlib.crc32(feature.encode("utf-8")) % self.n_features
+
+    def features(self, text: str) -> Dict[int, float]:
+        """Sparse term-frequency features of a text (bucket -> weight)"""
+        tokens = self.tokenize(text)
+        counts: Dict[int, float] = {}
+        for token in tokens:
+            bucket = self._bucket(f"w:{token}")
+            counts[bucket] = counts.get(bucket, 0.0) + 1.0
+            padded = f" {token} "
+            for i in range(len(padded) - 2):
+                bucket = self._bucket(f"c:{padded[i:i + 3]}")
+                counts[bucket] = counts.get(bucket, 0.0) + self.char_ngram_weight
+        for first, second in zip(tokens, tokens[1:]):
+            bucket = self._bucket(f"b:{first} {second}")
+            counts[bucket] = counts.get(bucket, 0.0) + 1.0
+        return counts
+
+    def transform(self, text: str, idf: np.ndarray = None) -> np.ndarray:
+        """Dense, L2-normalized vector of a text, optionally weighted by idf"""
+        vector = np.zeros(self.n_features, dtype=np.float32)
+        for bucket, count in self.features(text).items():
+            vector[bucket] = 1.0 + np.log(count) if count >= 1.0 else count
+        if idf is not None:
+            vector *= idf
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    def transform_many(self, texts: List[str], idf: np.ndarray = None) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.n_features), dtype=np.float32)
+        return np.vstack([self.transform(text, idf) for text in texts])
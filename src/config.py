@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 from pydantic import BaseModel
 import dotenv 
 dotenv.load_dotenv()
@@ -6,7 +7,7 @@ import os
 from src.prompt import (LLM_SYSTEM_PROMPT)
 
 class LLMConfig(BaseModel):
-    api_key: str
+    api_key: Optional[str] = None
     model_name: str
     model_id: str
     temperature: float = 0.7
@@ -0,0 +1,125 @@
+import asyncio
+from api.services.admission import AdmissionController, AdmissionRejected, Priority
+
+def test_waiters_are_served_by_priority_then_arrival():
+    controller = AdmissionController(max_concurrent=1, max_per_session=4, max_queue=10)
+    order = []
+
+    async def run(name: str, priority: Priority):
+        async with controller.admit(name, priority):
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        first = await controller.acquire("first")
+        tasks = [
+            asyncio.create_task(run("batch", Priority.BATCH)),
+            asyncio.create_task(run("chat", Priority.STANDARD)),
+            asyncio.create_task(run("stream-1", Priority.INTERACTIVE)),
+            asyncio.create_task(run("stream-2", Priority.INTERACTIVE)),
+        ]
+        await asyncio.sleep(0.01)
+        assert controller.get_stats()["queue_depth_by_priority"] == {"interactive": 2, "standard": 1, "batch": 1}
+        controller.release(first)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert order == ["stream-1", "stream-2", "chat", "batch"]
+    stats = controller.get_stats()
+    assert stats["admitted"] == 5 and stats["queued"] == 4 and stats["in_flight"] == 0
+
+def test_session_limit_does_not_block_other_sessions():
+    controller = AdmissionController(max_concurrent=4, max_per_session=1)
+
+    async def main():
+        alice = await controller.acquire("alice")
+        second_turn = asyncio.create_task(controller.acquire("alice"))
+        await asyncio.sleep(0.01)
+        # A turn of another session is admitted while alice's second turn waits for her first
+        bob = await asyncio.wait_for(controller.acquire("bob"), 0.1)
+        assert not second_turn.done()
+        controller.release(alice)
+        ticket = await asyncio.wait_for(second_turn, 0.1)
+        controller.release(bob)
+        controller.release(ticket)
+
+    asyncio.run(main())
+
+def test_full_queue_rejects_with_retry_after():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, max_queue_wait=0.05)
+
+    async def main():
+        running = await controller.acquire("a")
+        waiting = asyncio.create_task(controller.acquire("b"))
+        await asyncio.sleep(0.01)
+        try:
+            await controller.acquire("c")
+            raise AssertionError("expected rejection")
+        except AdmissionRejected as e:
+            assert e.retry_after >= 1
+        # Waiting longer than max_queue_wait is rejected too and leaves the queue
+        try:
+            await waiting
+            raise AssertionError("expected timeout")
+        except AdmissionRejected:
+            pass
+        # A cancelled waiter leaves the queue as well
+        cancelled = asyncio.create_task(controller.acquire("d"))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        assert controller.get_stats()["queue_depth"] == 0
+        controller.release(running)
+
+    asyncio.run(main())
+    stats = controller.get_stats()
+    assert stats["rejected"] == 1 and stats["timed_out"] == 1 and stats["in_flight"] == 0
+
+class DisconnectingRequest:
+    """Stand-in for a Starlette request whose client goes away on the first check"""
+
+    def __init__(self, before_disconnect=None):
+        self.before_disconnect = before_disconnect
+
+    async def is_disconnected(self) -> bool:
+        if self.before_disconnect is not None:
+            self.before_disconnect()
+            # Let the pending acquire finish, as it can while the disconnect is being checked
+            await asyncio.sleep(0.01)
+        return True
+
+def test_disconnect_while_queued_frees_the_slot():
+    from api.routers import agent as router
+    controller = AdmissionController(max_concurrent=1)
+
+    async def main():
+        running = await controller.acquire("a")
+        # Disconnect while the request is still waiting in the queue
+        try:
+            await router._run_until_disconnected(DisconnectingRequest(), controller.acquire("b"), discard=controller.release)
+            raise AssertionError("expected a disconnect")
+        except router.ClientDisconnected:
+            pass
+        await asyncio.sleep(0.01)
+        assert controller.get_stats()["queue_depth"] == 0
+        # The slot is granted just as the disconnect is noticed: the unused ticket is released
+        try:
+            await router._run_until_disconnected(
+                DisconnectingRequest(lambda: controller.release(running)),
+                controller.acquire("c"),
+                discard=controller.release
+            )
+            raise AssertionError("expected a disconnect")
+        except router.ClientDisconnected:
+            pass
+
+    asyncio.run(main())
+    stats = controller.get_stats()
+    assert stats["in_flight"] == 0 and stats["queue_depth"] == 0
+
+if __name__ == "__main__":
+    test_waiters_are_served_by_priority_then_arrival()
+    test_session_limit_does_not_block_other_sessions()
+    test_full_queue_rejects_with_retry_after()
+    test_disconnect_while_queued_frees_the_slot()
+    print("Admission tests complete")
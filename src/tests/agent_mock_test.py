@@ -0,0 +1,423 @@
+import asyncio
+import json
+import time
+from src.agents import (ReflectionAgent,
+                        PlanningAgent,
+                        AgentOptions,
+                        ManagerAgent)
+from src.agents.llm import UnifiedLLM, MockLLMConfig, LatencyConfig
+from src.tools.tool_executor import NO_CACHE
+from src.tools.tool_manager import create_function_tool
+
+def get_weather(location: str, unit: str = "celsius") -> dict:
+    """Get current weather for a location"""
+    return {
+        "temperature": 25,
+        "weather_description": "Sunny",
+        "humidity": 60,
+        "wind_speed": 10
+    }
+
+def build_manager(mock_config: MockLLMConfig = None, **manager_kwargs) -> ManagerAgent:
+    llm = UnifiedLLM(model_name="mock", mock_config=mock_config)
+    weather_tool = create_function_tool(
+        get_weather,
+        name="get_weather",
+        description="Get current weather information for a location"
+    )
+    manager = ManagerAgent(llm, AgentOptions(
+        name="Manager",
+        description="Routes requests to specialized agents"
+    ), **manager_kwargs)
+    manager.register_agent(ReflectionAgent(llm, AgentOptions(
+        id="reflection",
+        name="Reflection Assistant",
+        description="Helps with information about football"
+    )))
+    manager.register_agent(PlanningAgent(llm, AgentOptions(
+        id="planning",
+        name="Planning Assistant",
+        description="Assists with project planning, task breakdown, and weather tool"
+    ), tools=[weather_tool]))
+    return manager
+
+def test_manager_streams_tokens_as_generated():
+    manager = build_manager(MockLLMConfig(
+        default_response="Hanoi is sunny today with a temperature of 25 degrees",
+        token_latency=LatencyConfig(mean=0.01),
+    ))
+
+    async def run():
+        start = time.perf_counter()
+        first_token_at, chunks = None, []
+        async for chunk in manager.astream_chat("What is the weather in Hanoi today?"):
+            if first_token_at is None:
+                first_token_at = time.perf_counter() - start
+            chunks.append(chunk)
+        return first_token_at, time.perf_counter() - start, chunks
+
+    first_token_at, total, chunks = asyncio.run(run())
+    assert "".join(chunks) == "Hanoi is sunny today with a temperature of 25 degrees"
+    assert len(chunks) > 1
+    assert first_token_at < total
+
+def test_planning_agent_streams_summary():
+    manager = build_manager()
+    planning_agent = manager.agent_registry["planning"]
+
+    async def run():
+        return [chunk async for chunk in planning_agent.astream_chat("What's the weather in Hanoi?")]
+
+    chunks = asyncio.run(run())
+    assert "".join(chunks).startswith("This is a mock response to:")
+
+def test_reflection_agent_streams_final_generation():
+    manager = build_manager(MockLLMConfig(default_response="Messi won the World Cup in 2022"))
+    reflection_agent = manager.agent_registry["reflection"]
+
+    async def run():
+        return [chunk async for chunk in reflection_agent.astream_chat("Messi achievements", n_steps=1)]
+
+    chunks = asyncio.run(run())
+    assert chunks == ["Messi ", "won ", "the ", "World ", "Cup ", "in ", "2022"]
+
+def test_reflection_stream_loop_matches_aloop():
+    manager = build_manager()
+    reflection_agent = manager.agent_registry["reflection"]
+
+    async def run():
+        return [chunk async for chunk in reflection_agent.astream_chat("Messi achievements", n_steps=0)]
+
+    assert asyncio.run(run()) == [""]
+    assert reflection_agent.llm.model.call_count == 0
+
+def test_streaming_follows_validation_mode():
+    always_manager = build_manager()
+    never_manager = build_manager(validation_mode="never")
+
+    async def run():
+        for manager in (always_manager, never_manager):
+            async for _ in manager.astream_chat("What is the weather in Hanoi today?"):
+                pass
+
+    asyncio.run(run())
+    assert always_manager.get_validation_stats()["validated"] == 1
+    assert any("ValidatorAgent" in prompt for prompt in always_manager.llm.model.prompts)
+    assert never_manager.get_validation_stats()["skipped"] == 1
+    assert not any("ValidatorAgent" in prompt for prompt in never_manager.llm.model.prompts)
+
+def test_fast_path_routing_skips_llm_classification():
+    manager = build_manager()
+    manager.register_agent(manager.agent_registry["planning"], examples=["What's the weather in Hanoi today?"])
+
+    async def run():
+        return await manager.classify_request("What is the weather in Hanoi?", [])
+
+    agent, confidence, reasoning = asyncio.run(run())
+    assert agent.id == "planning"
+    assert confidence >= manager.fast_path_threshold
+    assert manager.llm.model.call_count == 0
+    assert manager.get_routing_stats()["fast_path"] == 1
+
+def test_unsure_local_routing_falls_back_to_llm():
+    manager = build_manager()
+    manager.register_agent(manager.agent_registry["planning"], examples=["What's the weather in Hanoi today?"])
+
+    async def run():
+        # Off-topic: closer to one agent than the other, but not a real match
+        await manager.classify_request("What is the capital of France?", [])
+        # A single agent has no runner-up, so its lead proves nothing
+        single = build_manager()
+        single.unregister_agent("reflection")
+        await single.classify_request("What is the weather in Hanoi?", [])
+        return single
+
+    single = asyncio.run(run())
+    assert manager.get_routing_stats()["fast_path"] == 0
+    assert manager.llm.model.call_count == 1
+    assert single.get_routing_stats()["fast_path"] == 0
+
+def test_local_router_refits_once_per_batch_of_registrations():
+    from src.agents.utils import LocalRouter
+    router = LocalRouter()
+    fits = []
+    fit = router._fit
+    router._fit = lambda: (fits.append(1), fit())
+    for i in range(50):
+        router.add(f"agent-{i}", [f"topic {i} questions", f"help with subject {i}"])
+    router.add("weather", ["weather forecast for a city", "is it raining today"])
+    router.remove("agent-0")
+    assert fits == []
+    agent_id, _ = router.route("What is the weather forecast today?")
+    router.route("Is it raining?")
+    assert agent_id == "weather" and len(fits) == 1 and len(router) == 50
+
+def test_sticky_routing_for_follow_up_turns():
+    manager = build_manager(sticky_max_turns=2)
+
+    async def run():
+        first = await manager._route("Tell me about football legend Messi", [], session_id="s1")
+        follow_ups = [await manager._route(text, [], session_id="s1") for text in ["yes", "1", "ok"]]
+        return first, follow_ups
+
+    first, follow_ups = asyncio.run(run())
+    assert first.id == "reflection"
+    assert [agent.id for agent in follow_ups[:2]] == ["reflection", "reflection"]
+    # Stickiness expires after sticky_max_turns follow-ups
+    assert manager.routing_stats["sticky"] == 2
+
+def test_short_new_questions_are_not_follow_ups():
+    from src.agents.utils import FollowUpDetector
+    detector = FollowUpDetector()
+    assert all(detector.is_follow_up(text) for text in ["yes", "Ok, thanks!", "yes go on", "tell me more", "2", "tiếp tục"])
+    new_topics = [
+        "how about weather?", "please translate this", "next week?",
+        # Made only of words that appear in some affirmation, but not of whole phrases
+        "more please", "how", "next", "thank me", "more", "sure thanks more"
+    ]
+    assert not any(detector.is_follow_up(text) for text in new_topics)
+
+    manager = build_manager()
+
+    async def run():
+        await manager._route("Tell me about football legend Messi", [], session_id="s1")
+        return await manager._route("how about weather?", [], session_id="s1")
+
+    asyncio.run(run())
+    # The second turn was classified again instead of sticking to the previous agent
+    assert manager.routing_stats["sticky"] == 0 and manager.routing_stats["llm"] == 2
+
+def test_speculative_execution_hit_and_miss():
+    classification = '{"selected_agent": "reflection", "confidence": 0.9, "reasoning": "scripted"}'
+    manager = build_manager(
+        MockLLMConfig(responses={"AgentMatcher": classification}, latency=LatencyConfig(mean=0.02)),
+        speculative=True,
+        fast_path_threshold=1.1,
+        speculation_min_prior=0.0
+    )
+
+    async def run():
+        await manager.run("Tell me about football legend Messi")
+        await manager.run("What is the weather in Hanoi today?")
+
+    asyncio.run(run())
+    stats = manager.get_speculation_stats()
+    assert (stats["attempts"], stats["hits"], stats["misses"]) == (2, 1, 1)
+    assert stats["saved_seconds"] > 0
+
+def test_speculation_only_counts_llm_classified_routes():
+    classification = '{"selected_agent": "reflection", "confidence": 0.9, "reasoning": "scripted"}'
+    manager = build_manager(
+        MockLLMConfig(responses={"AgentMatcher": classification}, latency=LatencyConfig(mean=0.02)),
+        speculative=True,
+        speculation_min_prior=0.0
+    )
+    manager.register_agent(manager.agent_registry["planning"], examples=["What's the weather in Hanoi today?"])
+
+    async def run():
+        # Local fast path: nothing to overlap, so nothing is speculated
+        await manager.run("What is the weather in Hanoi?")
+        # Classified by the LLM: counted
+        await manager.run("Tell me about football legend Messi", session_id="s1")
+        # Sticky follow-up: no classification ran, so it is not counted
+        await manager.run("yes", session_id="s1")
+
+    asyncio.run(run())
+    stats = manager.get_speculation_stats()
+    assert manager.routing_stats["fast_path"] == 1 and manager.routing_stats["sticky"] == 1
+    assert (stats["attempts"], stats["hits"], stats["misses"]) == (1, 1, 0)
+
+def test_validation_policies():
+    shadow_manager = build_manager(validation_mode="async-shadow")
+    never_manager = build_manager(validation_mode="never")
+
+    async def run():
+        await shadow_manager.run("What is the weather in Hanoi today?")
+        await asyncio.gather(*shadow_manager._background_tasks)
+        await never_manager.run("What is the weather in Hanoi today?")
+
+    asyncio.run(run())
+    shadow_stats = shadow_manager.get_validation_stats()
+    assert shadow_stats["shadow"] == 1
+    assert shadow_stats["agents"]["planning"]["rolling_score"] == 0.9
+    assert never_manager.get_validation_stats()["skipped"] == 1
+    assert not any("ValidatorAgent" in prompt for prompt in never_manager.llm.model.prompts)
+
+def test_failed_validations_do_not_count_as_scores():
+    manager = build_manager(MockLLMConfig(responses={r"ValidatorAgent": "not json at all"}))
+
+    async def run():
+        return await manager.run("What is the weather in Hanoi today?")
+
+    assert asyncio.run(run())
+    stats = manager.get_validation_stats()
+    assert (stats["validated"], stats["validation_errors"]) == (0, 1)
+    assert "planning" not in stats["agents"]
+
+def test_planning_agent_runs_independent_steps_concurrently():
+    plan = {"steps": [
+        {"id": "1", "description": "Weather in Hanoi", "requires_tool": True, "tool_name": "slow_weather", "depends_on": []},
+        {"id": "2", "description": "Weather in Paris", "requires_tool": True, "tool_name": "slow_weather", "depends_on": []},
+        {"id": "3", "description": "Weather in Tokyo", "requires_tool": True, "tool_name": "slow_weather", "depends_on": []},
+        {"id": "4", "description": "Compare the cities", "requires_tool": False, "tool_name": None, "depends_on": ["1", "2", "3"]}
+    ]}
+    llm = UnifiedLLM(model_name="mock", mock_config=MockLLMConfig(responses={r"Format your response as JSON": json.dumps(plan)}))
+
+    async def slow_weather(location: str) -> dict:
+        """Get current weather for a location"""
+        await asyncio.sleep(0.2)
+        return {"location": location, "temperature": 25}
+
+    planning_agent = PlanningAgent(llm, AgentOptions(
+        id="planning",
+        name="Planning Assistant",
+        description="Assists with weather lookups"
+    ), tools=[create_function_tool(slow_weather, name="slow_weather")])
+
+    async def run():
+        start = time.perf_counter()
+        chunks = [chunk async for chunk in planning_agent.astream_chat(
+            "Compare the weather in Hanoi, Paris and Tokyo", detailed_stream=True, max_steps=4
+        )]
+        return time.perf_counter() - start, chunks
+
+    elapsed, chunks = asyncio.run(run())
+    assert elapsed < 0.5  # Three 0.2s lookups overlap
+    output = "".join(chunks)
+    assert output.index("Executing step 3") < output.index("Step 1 complete")
+    # The dependent step receives the upstream results
+    assert any("Results from previous steps" in prompt and "Weather in Tokyo" in prompt for prompt in llm.model.prompts)
+
+def test_plan_with_inline_tool_arguments_skips_argument_calls():
+    llm = UnifiedLLM(model_name="mock")
+    tools = [
+        create_function_tool(get_weather, name=name, description="Get current weather information for a location")
+        for name in ["weather_hanoi", "weather_paris", "weather_tokyo"]
+    ]
+    planning_agent = PlanningAgent(llm, AgentOptions(
+        id="planning",
+        name="Planning Assistant",
+        description="Assists with weather lookups"
+    ), tools=tools)
+    asyncio.run(planning_agent.achat("Weather in Hanoi, Paris and Tokyo"))
+    # One call for the plan and one for the summary
+    assert llm.model.call_count == 2
+    assert not any("Generate parameters to call this tool" in prompt for prompt in llm.model.prompts)
+
+def test_invalid_inline_tool_arguments_fall_back_to_generation():
+    llm = UnifiedLLM(model_name="mock")
+    planning_agent = PlanningAgent(llm, AgentOptions(
+        id="planning",
+        name="Planning Assistant",
+        description="Assists with weather lookups"
+    ), tools=[create_function_tool(get_weather, name="get_weather")])
+    result = asyncio.run(planning_agent._execute_tool("get_weather", "Weather in Hanoi", True, {"city": "Hanoi"}))
+    assert result.raw_output["weather_description"] == "Sunny"
+    assert llm.model.call_count == 1
+
+def test_reflection_agent_resolves_tool_calls_natively():
+    lookups = []
+
+    def lookup_stats(player: str) -> dict:
+        """Look up career statistics of a football player"""
+        lookups.append(player)
+        return {"player": player, "goals": 800}
+
+    llm = UnifiedLLM(model_name="mock", mock_config=MockLLMConfig(default_response="Use lookup_stats to verify the goals"))
+    reflection_agent = ReflectionAgent(llm, AgentOptions(
+        id="reflection",
+        name="Reflection Assistant",
+        description="Helps with information about football"
+    ), tools=[create_function_tool(lookup_stats, cache_policy=NO_CACHE)])
+
+    asyncio.run(reflection_agent.achat("How many goals has Messi scored?", n_steps=1))
+    assert len(lookups) == 1
+    # Arguments come back structured with the critique: no JSON argument prompt, no signature dump
+    assert not any("Generate parameters to call this tool" in prompt for prompt in llm.model.prompts)
+    assert not any("Available tools" in prompt for prompt in llm.model.prompts)
+
+def test_missing_tool_arguments_resolved_with_native_function_calling():
+    llm = UnifiedLLM(model_name="mock")
+    planning_agent = PlanningAgent(llm, AgentOptions(
+        id="planning",
+        name="Planning Assistant",
+        description="Assists with weather lookups"
+    ), tools=[create_function_tool(get_weather, name="get_weather")])
+    result = asyncio.run(planning_agent._execute_tool("get_weather", "Weather in Hanoi", True))
+    assert result.raw_output["weather_description"] == "Sunny"
+    assert llm.model.call_count == 1
+    assert not any("Generate parameters to call this tool" in prompt for prompt in llm.model.prompts)
+
+def test_plan_prompt_includes_only_relevant_tools():
+    topics = ["stock prices", "flight schedules", "restaurant reviews", "movie showtimes", "currency rates",
+              "train tickets", "hotel bookings", "news headlines", "sports scores", "recipe search"]
+    tools = [
+        create_function_tool(get_weather, name=f"get_{topic.replace(' ', '_')}", description=f"Look up {topic}")
+        for topic in topics
+    ] + [create_function_tool(get_weather, name="get_weather", description="Get current weather information for a location")]
+    llm = UnifiedLLM(model_name="mock")
+    planning_agent = PlanningAgent(llm, AgentOptions(
+        id="planning",
+        name="Planning Assistant",
+        description="Assists with lookups",
+        tool_top_k=3
+    ), tools=tools)
+
+    asyncio.run(planning_agent._get_initial_plan("What is the weather in Hanoi?", verbose=False))
+    plan_prompt = llm.model.prompts[0]
+    assert "Function: get_weather" in plan_prompt
+    assert plan_prompt.count("Function: ") == 3
+    stats = planning_agent.get_tool_prompt_stats()
+    assert stats["saved_ratio"] > 0.5
+
+def test_classification_prompt_uses_registry_shortlist():
+    manager = build_manager(fast_path_threshold=1.1, classification_top_k=3)
+    llm = manager.llm
+    topics = ["stock market", "cooking recipes", "travel booking", "car repair", "gardening tips", "tax filing",
+              "music theory", "pet care", "home insurance", "language learning", "yoga practice", "job interviews"]
+    for topic in topics:
+        manager.register_agent(ReflectionAgent(llm, AgentOptions(
+            id=topic.replace(" ", "-"),
+            name=f"{topic.title()} Assistant",
+            description=f"Answers questions about {topic}"
+        )))
+    manager.unregister_agent("pet-care")
+
+    agent, _, _ = asyncio.run(manager.classify_request("What is the weather in Hanoi?", []))
+    classification_prompt = next(prompt for prompt in llm.model.prompts if "AgentMatcher" in prompt)
+    assert agent.id == "planning"
+    assert classification_prompt.count("(ID: ") == 3
+    assert "pet-care" not in manager._shortlist_agents("Pet care for my dog")
+    assert len(manager.agent_index) == len(manager.agent_registry) == 13
+
+def test_adaptive_validation_for_healthy_agents():
+    manager = build_manager(validation_mode="always", healthy_validation_score=0.85)
+    planning_agent = manager.agent_registry["planning"]
+    for _ in range(5):
+        manager._record_validation(planning_agent, {"score": 0.95})
+    assert manager._get_validation_rate(planning_agent) == manager.healthy_sample_rate_factor
+
+if __name__ == "__main__":
+    test_manager_streams_tokens_as_generated()
+    test_planning_agent_streams_summary()
+    test_reflection_agent_streams_final_generation()
+    test_reflection_stream_loop_matches_aloop()
+    test_streaming_follows_validation_mode()
+    test_fast_path_routing_skips_llm_classification()
+    test_unsure_local_routing_falls_back_to_llm()
+    test_local_router_refits_once_per_batch_of_registrations()
+    test_sticky_routing_for_follow_up_turns()
+    test_short_new_questions_are_not_follow_ups()
+    test_speculative_execution_hit_and_miss()
+    test_speculation_only_counts_llm_classified_routes()
+    test_validation_policies()
+    test_failed_validations_do_not_count_as_scores()
+    test_adaptive_validation_for_healthy_agents()
+    test_planning_agent_runs_independent_steps_concurrently()
+    test_plan_with_inline_tool_arguments_skips_argument_calls()
+    test_invalid_inline_tool_arguments_fall_back_to_generation()
+    test_reflection_agent_resolves_tool_calls_natively()
+    test_missing_tool_arguments_resolved_with_native_function_calling()
+    test_plan_prompt_includes_only_relevant_tools()
+    test_classification_prompt_uses_registry_shortlist()
+    print("Mock agent tests complete")
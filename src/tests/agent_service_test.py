@@ -0,0 +1,298 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+from api.services.agent import AgentService, AgentServiceProvider
+from api.services.history_store import SQLiteHistoryStore
+from api.services.session_store import SessionStore
+from api.services.state_backend import InMemoryStateBackend, RedisStateBackend
+from llama_index.core.llms import ChatMessage
+from src.agents.llm import UnifiedLLM, MockLLMConfig, LatencyConfig
+from src.agents.utils import DeadlineExceeded, deadline_scope
+
+def test_sessions_keep_separate_histories():
+    service = AgentService(llm=UnifiedLLM(
+        model_name="mock",
+        mock_config=MockLLMConfig(latency=LatencyConfig(mean=0.01))
+    ), session_store=SessionStore())
+
+    async def run():
+        await asyncio.gather(
+            service.get_response("Tell me about Messi", verbose=False, session_id="alice"),
+            service.get_response("What is the weather in Hanoi?", verbose=False, session_id="bob"),
+        )
+        chunks = [chunk async for chunk in service.stream_response("And Ronaldo?", verbose=False, session_id="alice")]
+        await service.reset_chat("bob")
+        return chunks
+
+    chunks = asyncio.run(run())
+    assert chunks
+    alice = service.sessions.get("alice").history
+    assert [message.content for message in alice[::2]] == ["Tell me about Messi", "And Ronaldo?"]
+    assert service.sessions.get("bob").history == []
+
+def test_session_store_evicts_idle_and_over_capacity_sessions():
+    store = SessionStore(max_sessions=2, idle_ttl=None, max_history=4, max_total_chars=100)
+    for session_id in ["a", "b", "c"]:
+        store.get(session_id)
+    assert "a" not in store and len(store) == 2
+
+    session = store.get("b")
+
+    async def fill():
+        for i in range(3):
+            await store.append(session, ChatMessage(role="user", content=f"question {i}"), ChatMessage(role="assistant", content="x" * 10))
+
+    asyncio.run(fill())
+    assert len(session.history) == 4
+    assert store.get_stats()["total_chars"] == session.size == 40
+
+    asyncio.run(store.append(store.get("c"), ChatMessage(role="user", content="y" * 80)))
+    # The least recently used session is dropped to respect the memory cap
+    assert "b" not in store
+    assert store.get_stats()["evictions"] == {"idle": 0, "capacity": 1, "memory": 1}
+
+def test_session_store_keeps_sessions_with_running_turns():
+    store = SessionStore(max_sessions=1, idle_ttl=0.01, max_history=4, max_total_chars=10)
+
+    async def run():
+        alice = store.get("alice")
+        async with store.turn(alice):
+            await asyncio.sleep(0.02)
+            # Idle, capacity and memory pressure all leave the running turn's session alone
+            await store.append(store.get("bob"), ChatMessage(role="user", content="x" * 20))
+            store.get("carol")
+            # The next turn of the conversation gets the same session, and so waits on the same lock
+            assert store.get("alice") is alice
+        return alice
+
+    alice = asyncio.run(run())
+    assert alice.turns == 0
+    # Once the turn is over the session can be evicted again
+    store.get("dave")
+    assert "alice" not in store
+
+def test_history_survives_restart():
+    path = os.path.join(tempfile.mkdtemp(), "history.sqlite3")
+    store = SessionStore(max_history=4, history_backend=SQLiteHistoryStore(path, flush_interval=0.05))
+
+    async def write():
+        session = store.get("alice")
+        await store.ensure_loaded(session)
+        for i in range(3):
+            await store.append(session, ChatMessage(role="user", content=f"question {i}"), ChatMessage(role="assistant", content=f"answer {i}"))
+        await store.append(store.get("bob"), ChatMessage(role="user", content="hello"))
+        await store.reset("bob")
+
+    asyncio.run(write())
+    store.close()
+
+    restarted = SessionStore(max_history=4, history_backend=SQLiteHistoryStore(path))
+
+    async def read():
+        alice, bob = restarted.get("alice"), restarted.get("bob")
+        await restarted.ensure_loaded(alice)
+        await restarted.ensure_loaded(bob)
+        return alice, bob
+
+    alice, bob = asyncio.run(read())
+    assert [message.content for message in alice.history] == ["question 1", "answer 1", "question 2", "answer 2"]
+    assert alice.next_seq == 6
+    assert bob.history == []
+    assert restarted.get_stats()["total_chars"] == alice.size
+    restarted.close()
+
+def test_history_writer_survives_bad_batches():
+    path = os.path.join(tempfile.mkdtemp(), "history.sqlite3")
+    store = SQLiteHistoryStore(path, flush_interval=0.01)
+    # A malformed operation fails its batch, not the writer thread
+    store._queue.put(("append", "alice"))
+    store.flush(timeout=5)
+    store.append("alice", 0, [ChatMessage(role="user", content="hello")])
+    messages, next_seq = store.load_recent("alice", 4)
+    assert [message.content for message in messages] == ["hello"] and next_seq == 1
+    assert store.get_stats()["errors"] == 1
+    store.close()
+    # Nothing would commit a flush once the writer is gone
+    try:
+        store.flush()
+        assert False, "flush() should fail without a writer"
+    except RuntimeError:
+        pass
+
+def test_workers_share_history_and_routes_through_redis():
+    import pytest
+    fakeredis = pytest.importorskip("fakeredis")
+    backend = RedisStateBackend(client=fakeredis.FakeAsyncRedis(decode_responses=True))
+    mock_config = MockLLMConfig(latency=LatencyConfig(mean=0.01))
+    # Two API workers behind a load balancer, sharing one Redis
+    workers = [AgentService(llm=UnifiedLLM(model_name="mock", mock_config=mock_config), state_backend=backend) for _ in range(2)]
+
+    async def run():
+        await workers[0].get_response("Tell me about Messi", verbose=False, session_id="alice")
+        await workers[1].get_response("And Ronaldo?", verbose=False, session_id="alice")
+        session = workers[0].sessions.get("alice")
+        await workers[0].sessions.ensure_loaded(session)
+        route = await workers[1].manager.route_store.get("alice")
+        await workers[1].reset_chat("alice")
+        cleared = workers[0].sessions.get("alice")
+        await workers[0].sessions.ensure_loaded(cleared)
+        return session, route, cleared
+
+    session, route, cleared = asyncio.run(run())
+    assert [message.content for message in session.history[::2]] == ["Tell me about Messi", "And Ronaldo?"]
+    assert route is not None
+    assert cleared.history == []
+
+def test_state_backend_locks_are_released():
+    import pytest
+    fakeredis = pytest.importorskip("fakeredis")
+    memory = InMemoryStateBackend()
+    redis_backend = RedisStateBackend(client=fakeredis.FakeAsyncRedis(decode_responses=True))
+    attempts = []
+    set_ = redis_backend.client.set
+
+    async def tracked_set(*args, **kwargs):
+        if kwargs.get("nx"):
+            attempts.append(time.perf_counter())
+        return await set_(*args, **kwargs)
+
+    redis_backend.client.set = tracked_set
+
+    async def hold(backend, key, seconds, order, name):
+        async with backend.lock(key):
+            order.append(name)
+            await asyncio.sleep(seconds)
+
+    async def run():
+        order = []
+        # Per-session locks do not pile up once their turns are done
+        await asyncio.gather(*[hold(memory, f"session-{i}", 0.01, order, i) for i in range(20)])
+        await asyncio.gather(hold(memory, "alice", 0.02, order, "first"), hold(memory, "alice", 0, order, "second"))
+        # A waiter on a held Redis lock backs off instead of polling every 10ms
+        await asyncio.gather(hold(redis_backend, "bob", 0.5, order, "holder"), hold(redis_backend, "bob", 0, order, "waiter"))
+        return order
+
+    order = asyncio.run(run())
+    assert memory._locks == {}
+    assert order[-4:] == ["first", "second", "holder", "waiter"]
+    # Two uncontended acquisitions, then ~6 backed-off retries rather than ~50 polls
+    assert len(attempts) < 12
+
+def test_deadline_bounds_running_turn():
+    llm = UnifiedLLM(model_name="mock", mock_config=MockLLMConfig(latency=LatencyConfig(mean=0.2)))
+    service = AgentService(llm=llm, session_store=SessionStore())
+
+    async def run():
+        started = time.perf_counter()
+        # The reflection loop runs out of time during its first critique and answers with its first draft
+        response = await service.get_response("Tell me about Messi", verbose=False, session_id="alice", timeout=0.3)
+        elapsed = time.perf_counter() - started
+        # Streaming falls back to the first draft the same way
+        chunks = [chunk async for chunk in service.stream_response("Tell me about Messi", verbose=False, session_id="bob", timeout=0.3)]
+        # Without a draft to fall back to the turn times out
+        late = [chunk async for chunk in service.stream_response("Tell me about Messi", verbose=False, session_id="carol", timeout=0.1)]
+        calls = llm.model.call_count
+        # Timed out provider calls were cancelled and no later stage was started
+        await asyncio.sleep(0.5)
+        return response, elapsed, chunks, late, calls, llm.model.call_count
+
+    response, elapsed, chunks, late, calls, calls_later = asyncio.run(run())
+    assert response and elapsed < 0.5
+    assert "".join(chunks) == response
+    assert "took too long" in late[-1]
+    assert calls == calls_later
+
+    async def call_llm_directly():
+        with deadline_scope(0.05):
+            try:
+                await llm.achat("Tell me about Messi")
+            except DeadlineExceeded:
+                return True
+        return False
+
+    assert asyncio.run(call_llm_directly())
+
+def test_streamed_refinement_replaces_answer_like_run():
+    mock_config = MockLLMConfig(responses={
+        r"ValidatorAgent": json.dumps({"is_valid": False, "score": 0.2, "needs_refinement": True}),
+        r"response refinement expert": "Refined answer",
+    })
+    blocking = AgentService(llm=UnifiedLLM(model_name="mock", mock_config=mock_config), session_store=SessionStore())
+    streaming = AgentService(llm=UnifiedLLM(model_name="mock", mock_config=mock_config), session_store=SessionStore())
+
+    async def run():
+        response = await blocking.get_response("What is the weather in Hanoi today?", verbose=False, session_id="alice")
+        events = [event async for event in streaming.stream_events("What is the weather in Hanoi today?", verbose=False, session_id="alice")]
+        return response, events
+
+    response, events = asyncio.run(run())
+    assert response == "Refined answer"
+    assert [event.data["text"] for event in events if event.type == "refined"] == ["Refined answer"]
+    assert events[-1].type == "final" and events[-1].data["text"] == "Refined answer"
+    # Both paths keep only the refined answer in the conversation
+    history = lambda service: [(m.role, m.content) for m in service.sessions.get("alice").history]
+    assert history(streaming) == history(blocking)
+
+def test_stream_events_reports_progress_apart_from_answer():
+    service = AgentService(llm=UnifiedLLM(
+        model_name="mock",
+        mock_config=MockLLMConfig(latency=LatencyConfig(mean=0.01))
+    ), session_store=SessionStore())
+
+    async def run():
+        return [event async for event in service.stream_events("Plan a trip to Hanoi and check the weather", verbose=False)]
+
+    events = asyncio.run(run())
+    types = [event.type for event in events]
+    assert types[0] == "routing" and types[-1] == "final" and types.count("final") == 1
+    assert types.index("plan") < types.index("step_start") < types.index("step_end") < types.index("token")
+    answer = "".join(event.data["text"] for event in events if event.type == "token")
+    # Step progress travels as events, so the answer tokens are exactly what gets stored
+    assert answer == events[-1].data["text"]
+    assert service.sessions.get(None).history[-1].content == answer
+
+def test_provider_builds_once_and_retries_failed_warm_up():
+    builds = []
+
+    def factory():
+        builds.append(time.time())
+        if len(builds) == 1:
+            raise ValueError("missing API key")
+        return AgentService(llm=UnifiedLLM(model_name="mock"), session_store=SessionStore())
+
+    provider = AgentServiceProvider(factory)
+    assert not provider.built
+
+    async def run():
+        try:
+            await provider.aget()
+            raise AssertionError("expected the first build to fail")
+        except ValueError:
+            pass
+        assert provider.get_status()["error"] == "missing API key"
+        # Concurrent first requests share one warm-up
+        services = await asyncio.gather(*(provider.aget() for _ in range(5)))
+        await provider.close()
+        return services
+
+    services = asyncio.run(run())
+    assert len(builds) == 2 and all(service is services[0] for service in services)
+    status = provider.get_status()
+    assert status["ready"] and status["error"] is None
+    assert status["ready_seconds"] >= status["build_seconds"] + status["warm_up_seconds"] - 1e-6
+
+if __name__ == "__main__":
+    test_sessions_keep_separate_histories()
+    test_session_store_evicts_idle_and_over_capacity_sessions()
+    test_session_store_keeps_sessions_with_running_turns()
+    test_history_survives_restart()
+    test_history_writer_survives_bad_batches()
+    test_workers_share_history_and_routes_through_redis()
+    test_state_backend_locks_are_released()
+    test_deadline_bounds_running_turn()
+    test_streamed_refinement_replaces_answer_like_run()
+    test_stream_events_reports_progress_apart_from_answer()
+    test_provider_builds_once_and_retries_failed_warm_up()
+    print("Agent service tests complete")
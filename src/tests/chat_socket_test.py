@@ -0,0 +1,42 @@
+import asyncio
+from api.services.admission import AdmissionController
+from api.services.agent import AgentService
+from api.services.chat_socket import ChatSocket
+from api.services.session_store import SessionStore
+from src.agents.llm import UnifiedLLM, MockLLMConfig, LatencyConfig
+
+def test_socket_multiplexes_turns_and_cancels_in_band():
+    service = AgentService(llm=UnifiedLLM(
+        model_name="mock",
+        mock_config=MockLLMConfig(latency=LatencyConfig(mean=0.05))
+    ), session_store=SessionStore())
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        socket = ChatSocket(service, AdmissionController(max_concurrent=4), send, max_in_flight=2)
+        await socket.handle({"type": "chat", "request_id": "a", "query": "Tell me about Messi", "session_id": "alice"})
+        await socket.handle({"type": "chat", "request_id": "b", "query": "Plan a trip to Hanoi and check the weather", "session_id": "bob"})
+        await socket.handle({"type": "chat", "request_id": "c", "query": "One too many"})
+        await socket.handle({"type": "ping"})
+        await asyncio.sleep(0.01)
+        await socket.handle({"type": "cancel", "request_id": "b"})
+        while socket._turns:
+            await asyncio.sleep(0.01)
+        await socket.close()
+
+    asyncio.run(run())
+    done = {message["request_id"]: message["status"] for message in sent if message["type"] == "done"}
+    assert done == {"a": "completed", "b": "cancelled", "c": "rejected"}
+    assert {"type": "pong"} in sent
+    # Turn a streamed its answer; the cancelled turn left no history behind
+    assert any(message["type"] == "final" and message["request_id"] == "a" for message in sent)
+    assert not any(message["type"] == "final" and message["request_id"] == "b" for message in sent)
+    assert service.sessions.get("bob").history == []
+    assert len(service.sessions.get("alice").history) == 2
+
+if __name__ == "__main__":
+    test_socket_multiplexes_turns_and_cancels_in_band()
+    print("Chat socket tests complete")
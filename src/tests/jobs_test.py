@@ -0,0 +1,90 @@
+import asyncio
+from api.services.agent import AgentService, AgentServiceProvider
+from api.services.jobs import Job, JobManager, JobQueueFullError, JobStatus
+from api.services.session_store import SessionStore
+from src.agents.llm import UnifiedLLM, MockLLMConfig, LatencyConfig
+
+async def fake_runner(job: Job):
+    for word in job.query.split():
+        await asyncio.sleep(0.01)
+        yield {"type": "token", "text": word + " "}
+    if "fail" in job.query:
+        raise RuntimeError("agent failed")
+
+def test_jobs_run_in_background_and_stream_progress():
+    manager = JobManager(fake_runner, workers=2)
+
+    async def run():
+        job = manager.submit("plan my trip to Hanoi")
+        assert job.status == JobStatus.QUEUED
+        events = [event async for event in manager.subscribe(job)]
+        failed = manager.submit("this will fail")
+        late = [event async for event in manager.subscribe(failed, start=0)]
+        await manager.close()
+        return job, events, failed, late
+
+    job, events, failed, late = asyncio.run(run())
+    assert job.status == JobStatus.SUCCEEDED and job.result == "plan my trip to Hanoi "
+    assert [event["type"] for event in events] == ["status", "status"] + ["token"] * 5 + ["status"]
+    assert events[-1]["status"] == "succeeded"
+    assert failed.status == JobStatus.FAILED and failed.error == "agent failed"
+    assert late[-1]["status"] == "failed"
+
+def test_cancel_queue_limit_and_retention():
+    manager = JobManager(fake_runner, workers=1, max_queue=1, result_ttl=0.05)
+
+    async def run():
+        running = manager.submit(" ".join(["word"] * 100))
+        await asyncio.sleep(0.03)
+        queued = manager.submit("short job")
+        try:
+            manager.submit("one too many")
+            raise AssertionError("expected a full queue")
+        except JobQueueFullError:
+            pass
+        await manager.cancel(queued.job_id)
+        await manager.cancel(running.job_id)
+        assert running.status == JobStatus.CANCELLED and running.result.startswith("word")
+        assert queued.status == JobStatus.CANCELLED and queued.started_at is None
+        await asyncio.sleep(0.1)
+        # Results are forgotten after result_ttl
+        assert manager.get(running.job_id) is None
+        stats = manager.get_stats()
+        await manager.close()
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats["cancelled"] == 2 and stats["rejected"] == 1 and stats["expired"] == 2
+
+def test_jobs_without_session_run_in_parallel():
+    from api.routers import agent as router
+    service = AgentService(llm=UnifiedLLM(
+        model_name="mock",
+        mock_config=MockLLMConfig(latency=LatencyConfig(mean=0.05))
+    ), session_store=SessionStore())
+    provider, router.agent_service = router.agent_service, AgentServiceProvider(lambda: service)
+    manager = JobManager(router._run_job, workers=4)
+
+    async def run():
+        submitted = [manager.submit(f"Tell me about player {i}") for i in range(4)]
+        for job in submitted:
+            async for _ in manager.subscribe(job):
+                pass
+        await manager.close()
+        return submitted
+
+    try:
+        submitted = asyncio.run(run())
+    finally:
+        router.agent_service = provider
+    assert all(job.status == JobStatus.SUCCEEDED and job.result for job in submitted)
+    # Every agent run started before the first one finished, and none touched the default conversation
+    first_events = [next(event["timestamp"] for event in job.events if event["type"] != "status") for job in submitted]
+    assert max(first_events) < min(job.finished_at for job in submitted)
+    assert service.sessions.get(None).history == []
+
+if __name__ == "__main__":
+    test_jobs_run_in_background_and_stream_progress()
+    test_cancel_queue_limit_and_retention()
+    test_jobs_without_session_run_in_parallel()
+    print("Job tests complete")
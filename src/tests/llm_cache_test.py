@@ -0,0 +1,185 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from src.agents.llm import UnifiedLLM, MockLLMConfig, LatencyConfig, ResponseCache
+from src.agents.llm.cache import MemoryCache, SQLiteCache
+from src.agents.llm.singleflight import SingleFlight
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+    assert len(cache) == 2
+
+def test_memory_cache_expires_entries():
+    cache = MemoryCache(default_ttl=0.05)
+    cache.set("short", "1")
+    cache.set("long", "2", ttl=10)
+    time.sleep(0.06)
+    assert cache.get("short") is None
+    assert cache.get("long") == "2"
+
+def test_sqlite_cache_persists_across_instances():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "llm_cache.sqlite3")
+        first = SQLiteCache(path)
+        first.set("key", "value")
+        first.close()
+
+        second = SQLiteCache(path)
+        response_cache = ResponseCache(disk=second)
+
+        async def read():
+            return await response_cache.aget("key")
+
+        assert asyncio.run(read()) == "value"
+        assert response_cache.get_stats()["disk_hits"] == 1
+        # Promoted to the memory tier
+        assert response_cache.memory.get("key") == "value"
+        second.close()
+
+def test_non_zero_temperature_bypasses_cache():
+    sampled = UnifiedLLM(model_name="mock", temperature=0.7, cache=ResponseCache())
+    greedy = UnifiedLLM(model_name="mock", temperature=0.0, cache=ResponseCache())
+
+    async def run():
+        for llm in (sampled, greedy):
+            await llm.achat("same question")
+            await llm.achat("same question")
+
+    asyncio.run(run())
+    assert sampled.model.call_count == 2
+    assert sampled.get_cache_stats()["hits"] == 0
+    assert greedy.model.call_count == 1
+    assert greedy.get_cache_stats()["hits"] == 1
+    # Keys and the bypass use the settings actually sent to the provider
+    assert (greedy.resolved_model_id, greedy.resolved_temperature) == ("mock", 0.0)
+    assert UnifiedLLM(model_name="mock").resolved_temperature == 0.0
+
+def test_sqlite_cache_counts_entries_and_trims_in_batches():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "llm_cache.sqlite3")
+        cache = SQLiteCache(path, max_entries=10)
+        for i in range(15):
+            cache.set(f"key-{i}", "value")
+        cache.set("key-14", "updated")
+        cache.delete("key-14")
+        count = cache._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        assert len(cache) == count <= 10
+        assert cache.get("key-0") is None and cache.get("key-13") == "value"
+        cache.close()
+
+        reopened = SQLiteCache(path, max_entries=10)
+        stats = asyncio.run(ResponseCache(disk=reopened).aget_stats())
+        assert stats["disk_entries"] == count
+        reopened.close()
+
+def test_singleflight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    executions = []
+
+    async def work():
+        executions.append(1)
+        await asyncio.sleep(0.02)
+        return "answer"
+
+    async def run():
+        return await asyncio.gather(*[flight.do("key", work) for _ in range(5)])
+
+    assert asyncio.run(run()) == ["answer"] * 5
+    assert len(executions) == 1
+    assert flight.get_stats()["coalesced"] == 4
+    assert not flight.is_in_flight("key")
+
+def test_singleflight_failed_leader_does_not_poison_later_calls():
+    flight = SingleFlight()
+    attempts = []
+
+    async def work():
+        attempts.append(1)
+        await asyncio.sleep(0.02)
+        if len(attempts) == 1:
+            raise RuntimeError("upstream failed")
+        return "answer"
+
+    async def run():
+        first = await asyncio.gather(*[flight.do("key", work) for _ in range(3)], return_exceptions=True)
+        second = await flight.do("key", work)
+        return first, second
+
+    first, second = asyncio.run(run())
+    # Every waiter of the failed call sees its error; the next call runs fresh
+    assert all(isinstance(result, RuntimeError) for result in first)
+    assert second == "answer"
+    assert len(attempts) == 2
+
+def test_singleflight_call_after_last_waiter_left_starts_fresh():
+    flight = SingleFlight()
+    attempts = []
+
+    async def work():
+        attempts.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def run():
+        leaver = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        leaver.cancel()
+        # Arrives after the only waiter left, before the cancelled task has unwound
+        await asyncio.sleep(0)
+        return await flight.do("key", work)
+
+    assert asyncio.run(run()) == "answer"
+    assert len(attempts) == 2
+
+def test_cached_sqlite_reads_stay_off_the_event_loop():
+    with tempfile.TemporaryDirectory() as directory:
+        disk = SQLiteCache(os.path.join(directory, "llm_cache.sqlite3"))
+        llm = UnifiedLLM(
+            model_name="mock",
+            cache=ResponseCache(disk=disk),
+            mock_config=MockLLMConfig(latency=LatencyConfig(mean=0.01))
+        )
+        threads = set()
+        get, set_ = disk.get, disk.set
+
+        def tracked_get(key):
+            threads.add(threading.current_thread())
+            return get(key)
+
+        def tracked_set(key, value, ttl=None):
+            threads.add(threading.current_thread())
+            return set_(key, value, ttl)
+
+        disk.get, disk.set = tracked_get, tracked_set
+
+        async def run():
+            await llm.achat("question")
+            llm.cache.memory.clear()
+            return await llm.achat("question")
+
+        assert asyncio.run(run()).endswith("question")
+        assert llm.model.call_count == 1
+        assert llm.get_cache_stats()["disk_hits"] == 1
+        assert threads and threading.main_thread() not in threads
+        disk.close()
+
+if __name__ == "__main__":
+    test_memory_cache_evicts_least_recently_used()
+    test_memory_cache_expires_entries()
+    test_sqlite_cache_persists_across_instances()
+    test_non_zero_temperature_bypasses_cache()
+    test_sqlite_cache_counts_entries_and_trims_in_batches()
+    test_singleflight_coalesces_concurrent_calls()
+    test_singleflight_failed_leader_does_not_poison_later_calls()
+    test_singleflight_call_after_last_waiter_left_starts_fresh()
+    test_cached_sqlite_reads_stay_off_the_event_loop()
+    print("LLM cache tests complete")
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import time
+from src.agents.llm import UnifiedLLM, MockLLMConfig, LatencyConfig, ResponseCache
+
+def test_mock_scripted_and_default_replies():
+    llm = UnifiedLLM(
+        model_name="mock",
+        mock_config=MockLLMConfig(responses={r"xin chào": "Chào bạn!"})
+    )
+    assert llm.chat("Xin chào!") == "Chào bạn!"
+    assert llm.chat("What is 2+2?") == "This is a mock response to: What is 2+2?"
+
+def test_mock_classification_json():
+    llm = UnifiedLLM(model_name="mock")
+    prompt = (
+        "You are AgentMatcher\n"
+        "Available agents and their capabilities: - Reflection Assistant (ID: reflection): Helps with football\n"
+        "- Planning Assistant (ID: planning): Assists with weather tool\n"
+        "User input: what is the weather today\n"
+    )
+    result = json.loads(asyncio.run(llm.achat(prompt)))
+    assert result["selected_agent"] == "planning"
+    assert result["confidence"] > 0.6
+
+def test_mock_stream_and_latency():
+    llm = UnifiedLLM(
+        model_name="mock",
+        mock_config=MockLLMConfig(
+            default_response="one two three",
+            latency=LatencyConfig(distribution="fixed", mean=0.05),
+        )
+    )
+
+    async def collect():
+        return [chunk async for chunk in llm.astream_chat("hi")]
+
+    start = time.perf_counter()
+    chunks = asyncio.run(collect())
+    assert time.perf_counter() - start >= 0.05
+    assert chunks == ["one ", "two ", "three"]
+
+def test_latency_distributions_are_seeded():
+    import random
+    config = LatencyConfig(distribution="long_tail", mean=0.1, stddev=0.5, tail_probability=0.1)
+    first = [config.sample(random.Random(7)) for _ in range(5)]
+    second = [config.sample(random.Random(7)) for _ in range(5)]
+    assert first == second
+    assert all(value >= 0 for value in first)
+
+def test_cache_and_coalescing_with_mock():
+    llm = UnifiedLLM(
+        model_name="mock",
+        cache=ResponseCache(),
+        coalesce=True,
+        mock_config=MockLLMConfig(latency=LatencyConfig(mean=0.02))
+    )
+
+    async def run():
+        await asyncio.gather(*[llm.achat("same question") for _ in range(5)])
+        await llm.achat("same question")
+
+    asyncio.run(run())
+    assert llm.model.call_count == 1
+    assert llm.get_coalescing_stats()["coalesced"] == 4
+    assert llm.get_cache_stats()["hits"] >= 1
+
+def test_batch_chat_keeps_order_and_bounds_concurrency():
+    llm = UnifiedLLM(
+        model_name="mock",
+        mock_config=MockLLMConfig(latency=LatencyConfig(distribution="normal", mean=0.02, stddev=0.01))
+    )
+    in_flight = {"now": 0, "max": 0}
+    achat = llm.achat
+
+    async def tracked_achat(*args, **kwargs):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        try:
+            return await achat(*args, **kwargs)
+        finally:
+            in_flight["now"] -= 1
+
+    llm.achat = tracked_achat
+    queries = [f"question {i}" for i in range(20)]
+    started = time.perf_counter()
+    answers = asyncio.run(llm.abatch_chat(queries, max_concurrency=5))
+    elapsed = time.perf_counter() - started
+    assert [answer.endswith(query) for answer, query in zip(answers, queries)] == [True] * 20
+    assert in_flight["max"] == 5
+    # 4 waves of ~20ms rather than 20 sequential calls
+    assert elapsed < 20 * 0.02
+
+def test_cancelled_batch_item_does_not_fail_the_batch():
+    from src.agents.utils import map_bounded
+
+    async def answer(item: int) -> int:
+        await asyncio.sleep(0.01)
+        if item == 1:
+            # e.g. cancelled by its deadline
+            asyncio.current_task().cancel()
+            await asyncio.sleep(0)
+        return item * 10
+
+    async def run():
+        return [result async for result in map_bounded(range(3), answer, 3)]
+
+    results = sorted(asyncio.run(run()), key=lambda result: result[0])
+    assert [(index, value) for index, value, _ in results] == [(0, 0), (1, None), (2, 20)]
+    assert isinstance(results[1][2], asyncio.CancelledError)
+    assert results[0][2] is None and results[2][2] is None
+
+if __name__ == "__main__":
+    test_mock_scripted_and_default_replies()
+    test_mock_classification_json()
+    test_mock_stream_and_latency()
+    test_latency_distributions_are_seeded()
+    test_cache_and_coalescing_with_mock()
+    test_batch_chat_keeps_order_and_bounds_concurrency()
+    test_cancelled_batch_item_does_not_fail_the_batch()
+    print("Mock LLM tests complete")
@@ -0,0 +1,238 @@
+import asyncio
+import gc
+import time
+from src.tools.tool_executor import (NO_CACHE,
+                                     ToolCachePolicy,
+                                     ToolExecutionMode,
+                                     ToolExecutionPolicy,
+                                     ToolExecutor,
+                                     ToolTimeoutError)
+from src.tools.tool_manager import create_function_tool
+
+def test_repeated_calls_are_cached_per_normalized_arguments():
+    executor = ToolExecutor()
+    calls = []
+
+    def get_weather(location: str, unit: str = "celsius") -> dict:
+        """Get current weather for a location"""
+        calls.append(location)
+        return {"location": location, "temperature": 25}
+
+    tool = create_function_tool(get_weather, cache_policy=ToolCachePolicy(ttl=60), executor=executor)
+
+    async def run():
+        first = await executor.acall(tool, location="Hanoi")
+        second = await executor.acall(tool, location="  hanoi ", unit="celsius")
+        third = await executor.acall(tool, location="Paris")
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert calls == ["Hanoi", "Paris"]
+    assert second.raw_output == first.raw_output
+    stats = executor.get_stats()["get_weather"]
+    assert (stats["calls"], stats["hits"], stats["executions"]) == (3, 1, 2)
+
+def test_concurrent_calls_share_one_execution():
+    executor = ToolExecutor()
+    calls = []
+
+    async def slow_lookup(city: str) -> str:
+        """Slow lookup"""
+        calls.append(city)
+        await asyncio.sleep(0.05)
+        return city.upper()
+
+    tool = create_function_tool(slow_lookup, cache_policy=ToolCachePolicy(), executor=executor)
+
+    async def run():
+        return await asyncio.gather(*[executor.acall(tool, city="hanoi") for _ in range(5)])
+
+    outputs = asyncio.run(run())
+    assert calls == ["hanoi"]
+    assert {output.content for output in outputs} == {"HANOI"}
+    stats = executor.get_stats()["slow_lookup"]
+    assert stats["coalesced"] == 4
+    assert stats["hit_ratio"] == 0.8
+    assert stats["saved_seconds"] > 0
+
+def test_side_effecting_tools_always_execute():
+    executor = ToolExecutor()
+    sent = []
+
+    def send_message(text: str) -> bool:
+        """Send a message"""
+        sent.append(text)
+        return True
+
+    tool = create_function_tool(send_message, cache_policy=NO_CACHE, executor=executor)
+
+    async def run():
+        await executor.acall(tool, text="hello")
+        await executor.acall(tool, text="hello")
+
+    asyncio.run(run())
+    assert sent == ["hello", "hello"]
+    assert executor.get_stats()["send_message"]["hits"] == 0
+
+def count_primes(limit: int) -> int:
+    """Count primes below a limit"""
+    return sum(1 for n in range(2, limit) if all(n % d for d in range(2, int(n ** 0.5) + 1)))
+
+def test_blocking_tools_run_off_the_event_loop():
+    executor = ToolExecutor()
+
+    def slow_io(key: str) -> str:
+        """Blocking lookup"""
+        time.sleep(0.2)
+        return key
+
+    tool = create_function_tool(slow_io, cache_policy=NO_CACHE, executor=executor)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.ensure_future(ticker())
+        await asyncio.gather(*[executor.acall(tool, key=str(i)) for i in range(4)])
+        ticking.cancel()
+        return ticks
+
+    assert asyncio.run(run()) >= 10
+    pool_stats = executor.get_pool_stats()["thread:slow_io"]
+    assert (pool_stats["completed"], pool_stats["queue_depth"]) == (4, 0)
+    executor.shutdown()
+
+def test_tool_timeout():
+    executor = ToolExecutor()
+
+    def hang(seconds: float) -> str:
+        """Hang for a while"""
+        time.sleep(seconds)
+        return "done"
+
+    tool = create_function_tool(
+        hang,
+        cache_policy=NO_CACHE,
+        execution_policy=ToolExecutionPolicy(timeout=0.05),
+        executor=executor
+    )
+
+    async def run():
+        try:
+            await executor.acall(tool, seconds=0.3)
+        except ToolTimeoutError:
+            return True
+        return False
+
+    assert asyncio.run(run())
+    assert executor.get_stats()["hang"]["timeouts"] == 1
+    executor.shutdown(wait=True)
+
+def test_inline_tool_timeout():
+    executor = ToolExecutor()
+
+    async def stall(seconds: float) -> str:
+        """Stall for a while"""
+        await asyncio.sleep(seconds)
+        return "done"
+
+    tool = create_function_tool(
+        stall,
+        cache_policy=NO_CACHE,
+        execution_policy=ToolExecutionPolicy(mode=ToolExecutionMode.INLINE, timeout=0.05),
+        executor=executor
+    )
+
+    async def run():
+        try:
+            await executor.acall(tool, seconds=1)
+        except ToolTimeoutError:
+            return True
+        return False
+
+    assert asyncio.run(run())
+    assert executor.get_stats()["stall"]["timeouts"] == 1
+
+def test_cpu_bound_tools_in_process_pool():
+    executor = ToolExecutor()
+    tool = create_function_tool(
+        count_primes,
+        execution_policy=ToolExecutionPolicy(mode=ToolExecutionMode.PROCESS, max_workers=2),
+        executor=executor
+    )
+    output = asyncio.run(executor.acall(tool, limit=1000))
+    assert output.raw_output == 168
+    assert "process:count_primes" in executor.get_pool_stats()
+    executor.shutdown(wait=True)
+
+def test_same_named_tools_do_not_share_results():
+    from src.agents.base import AgentOptions
+    from src.agents.reflection_agent import ReflectionAgent
+    from src.agents.llm import UnifiedLLM
+    executor = ToolExecutor()
+
+    def weather_a(location: str) -> dict:
+        """Weather from provider A"""
+        return {"provider": "a"}
+
+    def weather_b(location: str) -> dict:
+        """Weather from provider B"""
+        return {"provider": "b"}
+
+    tool_a = create_function_tool(weather_a, name="get_weather", cache_policy=ToolCachePolicy(), executor=executor)
+    tool_b = create_function_tool(weather_b, name="get_weather", cache_policy=ToolCachePolicy(), executor=executor)
+
+    async def run():
+        first = await executor.acall(tool_a, location="Hanoi")
+        # Callers own their copy: mutating it does not change what the next caller gets
+        first.raw_output["provider"] = "changed"
+        return await executor.acall(tool_a, location="Hanoi"), await executor.acall(tool_b, location="Hanoi")
+
+    cached, other = asyncio.run(run())
+    assert cached.raw_output == {"provider": "a"}
+    assert other.raw_output == {"provider": "b"}
+    # Agents run their tools in the executor they are given
+    agent = ReflectionAgent(UnifiedLLM(model_name="mock"), AgentOptions(name="Test", description="Test", tool_executor=executor), tools=[tool_a])
+    assert agent.tool_executor is executor
+
+def test_tool_state_goes_away_with_the_tool():
+    executor = ToolExecutor()
+    calls = []
+
+    def lookup(city: str) -> str:
+        """Lookup without a registered policy"""
+        calls.append(city)
+        return city.upper()
+
+    async def run():
+        # Tools built per request: not cached by default, and forgotten once dropped
+        for _ in range(3):
+            tool = create_function_tool(lookup, executor=executor)
+            await executor.acall(tool, city="hanoi")
+            await executor.acall(tool, city="hanoi")
+        return executor.get_stats()["lookup"]
+
+    stats = asyncio.run(run())
+    assert len(calls) == 6 and stats["hits"] == 0
+    gc.collect()
+    assert len(executor._states) == 0
+    kept = create_function_tool(lookup, cache_policy=ToolCachePolicy(), executor=executor)
+    executor.unregister(kept)
+    assert executor.get_policy(kept) is executor.default_policy
+
+if __name__ == "__main__":
+    test_repeated_calls_are_cached_per_normalized_arguments()
+    test_concurrent_calls_share_one_execution()
+    test_side_effecting_tools_always_execute()
+    test_blocking_tools_run_off_the_event_loop()
+    test_tool_timeout()
+    test_inline_tool_timeout()
+    test_cpu_bound_tools_in_process_pool()
+    test_same_named_tools_do_not_share_results()
+    test_tool_state_goes_away_with_the_tool()
+    print("Tool executor tests complete")
@@ -0,0 +1,374 @@
+import asyncio
+import inspect
+import json
+import threading
+import time
+import weakref
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
+from enum import Enum
+from typing import Any, Callable, Dict, Optional
+from llama_index.core.tools import FunctionTool, ToolOutput
+from src.agents.llm.cache import MemoryCache
+from src.agents.llm.singleflight import SingleFlight
+from src.agents.utils.deadline import with_deadline
+
+
+@dataclass
+class ToolCachePolicy:
+    """
+    How results of a tool are reused.
+
+    Tools without a registered policy are not cached (see `ToolExecutor`);
+    read-only tools opt in by registering one. Side-effecting tools (sending
+    mail, writing records, ...) must keep `cacheable=False`: every call then
+    executes, without caching or coalescing.
+    """
+    cacheable: bool = True
+    ttl: Optional[float] = 300  # Seconds a result stays valid, None keeps it until evicted
+    max_entries: int = 1024
+    normalize_strings: bool = True  # Strip and collapse whitespace, lowercase string arguments
+    normalizer: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None  # Custom argument normalization
+
+
+NO_CACHE = ToolCachePolicy(cacheable=False)
+
+
+class ToolExecutionMode(Enum):
+    AUTO = "auto"        # INLINE for async functions, THREAD for sync functions
+    INLINE = "inline"    # Await on the event loop; only for non-blocking async tools
+    THREAD = "thread"    # Bounded thread pool, for blocking I/O
+    PROCESS = "process"  # Process pool, for CPU-heavy work; the function must be picklable
+
+
+@dataclass
+class ToolExecutionPolicy:
+    """
+    Where and how long a tool may run.
+
+    Each tool gets its own pool of `max_workers` unless `pool` names a pool
+    shared with other tools. A timed out call is cancelled if it has not
+    started yet; a thread or process already running it cannot be interrupted,
+    but the caller is released and the slot is freed when it finishes.
+    """
+    mode: ToolExecutionMode = ToolExecutionMode.AUTO
+    timeout: Optional[float] = 30.0  # Seconds per call, None disables the timeout
+    max_workers: int = 4
+    max_queue: Optional[int] = None  # Calls waiting for a worker before new calls are rejected
+    pool: Optional[str] = None
+
+
+class ToolTimeoutError(asyncio.TimeoutError):
+    pass
+
+
+class ToolQueueFullError(RuntimeError):
+    pass
+
+
+class _Pool:
+    """Worker pool with queue-depth accounting"""
+
+    def __init__(self, name: str, mode: ToolExecutionMode, max_workers: int):
+        self.name = name
+        self.mode = mode
+        self.max_workers = max_workers
+        if mode == ToolExecutionMode.PROCESS:
+            self.executor: Executor = ProcessPoolExecutor(max_workers=max_workers)
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"tool-{name}")
+        self.pending = 0  # Submitted calls that have not finished
+        self.completed = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.pending - self.max_workers)
+
+    def submit(self, fn: Callable[..., Any], max_queue: Optional[int], **kwargs: Any) -> Future:
+        with self._lock:
+            if max_queue is not None and self.queue_depth >= max_queue:
+                self.rejected += 1
+                raise ToolQueueFullError(f"Tool pool '{self.name}' has {self.queue_depth} queued calls")
+            self.pending += 1
+        future = self.executor.submit(fn, **kwargs)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, _: Future) -> None:
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode.value,
+            "max_workers": self.max_workers,
+            "running": min(self.pending, self.max_workers),
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+        }
+
+
+@dataclass
+class ToolStats:
+    calls: int = 0
+    hits: int = 0
+    coalesced: int = 0
+    executions: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    execution_seconds: float = 0.0
+    saved_seconds: float = 0.0
+
+    @property
+    def average_latency(self) -> float:
+        return self.execution_seconds / self.executions if self.executions else 0.0
+
+    def add(self, other: "ToolStats") -> None:
+        for item in fields(self):
+            setattr(self, item.name, getattr(self, item.name) + getattr(other, item.name))
+
+    def to_dict(self) -> Dict[str, Any]:
+        reused = self.hits + self.coalesced
+        return {
+            "calls": self.calls,
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "executions": self.executions,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "hit_ratio": reused / self.calls if self.calls else 0.0,
+            "average_latency": self.average_latency,
+            "saved_seconds": self.saved_seconds,
+        }
+
+
+@dataclass
+class _ToolState:
+    """Policies, result cache and counters of one tool object"""
+    policy: Optional[ToolCachePolicy] = None
+    execution_policy: Optional[ToolExecutionPolicy] = None
+    cache: Optional[MemoryCache] = None
+    stats: ToolStats = field(default_factory=ToolStats)
+
+
+class ToolExecutor:
+    """
+    Executes FunctionTool calls with per-tool result caching, singleflight and
+    execution policies.
+
+    Policies, results and counters belong to a tool object, not just its name,
+    so two tools registered under the same name never share entries. They are
+    held weakly and go away with the tool, so tools built per request or per
+    agent do not accumulate. Tools without a registered policy use
+    `default_policy`, which does not cache. Results are
+    keyed by normalized arguments (defaults from the function signature are
+    bound first, so `f("Hanoi")` and `f("Hanoi", "celsius")` share an entry)
+    and callers always get their own copy of a reused output. Concurrent identical calls share
+    one execution; failed calls are never cached. Blocking tools run in worker
+    pools so they never stall the event loop.
+    """
+
+    def __init__(
+        self,
+        default_policy: Optional[ToolCachePolicy] = None,
+        default_execution_policy: Optional[ToolExecutionPolicy] = None
+    ):
+        self.default_policy = default_policy or NO_CACHE
+        self.default_execution_policy = default_execution_policy or ToolExecutionPolicy()
+        self._states: "weakref.WeakKeyDictionary[FunctionTool, _ToolState]" = weakref.WeakKeyDictionary()
+        self._pools: Dict[str, _Pool] = {}
+        self._singleflight = SingleFlight()
+
+    def _get_state(self, tool: FunctionTool) -> _ToolState:
+        state = self._states.get(tool)
+        if state is None:
+            state = _ToolState()
+            self._states[tool] = state
+        return state
+
+    def register(
+        self,
+        tool: FunctionTool,
+        policy: Optional[ToolCachePolicy] = None,
+        execution_policy: Optional[ToolExecutionPolicy] = None
+    ) -> None:
+        state = self._get_state(tool)
+        if policy is not None:
+            state.policy = policy
+            state.cache = None
+        if execution_policy is not None:
+            state.execution_policy = execution_policy
+
+    def unregister(self, tool: FunctionTool) -> None:
+        """Drop the policies, cached results and counters of a tool"""
+        self._states.pop(tool, None)
+
+    def get_policy(self, tool: FunctionTool) -> ToolCachePolicy:
+        state = self._states.get(tool)
+        return state.policy if state is not None and state.policy is not None else self.default_policy
+
+    def get_execution_policy(self, tool: FunctionTool) -> ToolExecutionPolicy:
+        state = self._states.get(tool)
+        if state is not None and state.execution_policy is not None:
+            return state.execution_policy
+        return self.default_execution_policy
+
+    def _get_pool(self, tool_name: str, mode: ToolExecutionMode, policy: ToolExecutionPolicy) -> _Pool:
+        name = f"{mode.value}:{policy.pool or tool_name}"
+        pool = self._pools.get(name)
+        if pool is None:
+            pool = _Pool(policy.pool or tool_name, mode, policy.max_workers)
+            self._pools[name] = pool
+        return pool
+
+    def _get_cache(self, tool: FunctionTool, policy: ToolCachePolicy) -> MemoryCache:
+        state = self._get_state(tool)
+        if state.cache is None:
+            state.cache = MemoryCache(max_entries=policy.max_entries, default_ttl=policy.ttl)
+        return state.cache
+
+    @staticmethod
+    def _normalize_value(value: Any) -> Any:
+        if isinstance(value, str):
+            return " ".join(value.split()).lower()
+        if isinstance(value, dict):
+            return {key: ToolExecutor._normalize_value(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [ToolExecutor._normalize_value(item) for item in value]
+        return value
+
+    def _make_key(self, tool: FunctionTool, policy: ToolCachePolicy, kwargs: Dict[str, Any]) -> str:
+        arguments = dict(kwargs)
+        fn = getattr(tool, "fn", None)
+        if fn is not None:
+            try:
+                bound = inspect.signature(fn).bind(**kwargs)
+                bound.apply_defaults()
+                arguments = dict(bound.arguments)
+            except (TypeError, ValueError):
+                pass
+        if policy.normalizer is not None:
+            arguments = policy.normalizer(arguments)
+        elif policy.normalize_strings:
+            arguments = self._normalize_value(arguments)
+        raw = json.dumps(arguments, sort_keys=True, ensure_ascii=False, default=str)
+        # Also the singleflight key: same-named tools must not coalesce either. An id is
+        # only reused once the tool is gone, and an in-flight call keeps its tool alive
+        return f"{tool.metadata.name}#{id(tool)}:{raw}"
+
+    @staticmethod
+    def _resolve_mode(tool: FunctionTool, policy: ToolExecutionPolicy) -> ToolExecutionMode:
+        if policy.mode != ToolExecutionMode.AUTO:
+            return policy.mode
+        # FunctionTool wraps sync functions in a coroutine that uses the loop's default executor
+        wrapped_sync = getattr(tool.async_fn, "__qualname__", "").startswith("sync_to_async.")
+        return ToolExecutionMode.THREAD if wrapped_sync else ToolExecutionMode.INLINE
+
+    async def _run(self, tool: FunctionTool, kwargs: Dict[str, Any]) -> ToolOutput:
+        tool_name = tool.metadata.name
+        policy = self.get_execution_policy(tool)
+        mode = self._resolve_mode(tool, policy)
+
+        if mode == ToolExecutionMode.INLINE:
+            try:
+                return await asyncio.wait_for(tool.acall(**kwargs), policy.timeout)
+            except asyncio.TimeoutError:
+                raise ToolTimeoutError(f"Tool {tool_name} timed out after {policy.timeout}s")
+
+        pool = self._get_pool(tool_name, mode, policy)
+        if mode == ToolExecutionMode.PROCESS:
+            future = pool.submit(tool.fn, policy.max_queue, **kwargs)
+        else:
+            future = pool.submit(tool.call, policy.max_queue, **kwargs)
+        try:
+            # Cancelling the wrapper cancels the pool future if it has not started yet
+            result = await asyncio.wait_for(asyncio.wrap_future(future), policy.timeout)
+        except asyncio.TimeoutError:
+            pool.timeouts += 1
+            raise ToolTimeoutError(f"Tool {tool_name} timed out after {policy.timeout}s")
+        if mode == ToolExecutionMode.PROCESS:
+            return ToolOutput(
+                content=str(result),
+                tool_name=tool_name,
+                raw_input={"args": (), "kwargs": kwargs},
+                raw_output=result,
+            )
+        return result
+
+    async def _execute(self, tool: FunctionTool, stats: ToolStats, kwargs: Dict[str, Any]) -> ToolOutput:
+        start = time.perf_counter()
+        try:
+            output = await self._run(tool, kwargs)
+        except ToolTimeoutError:
+            stats.errors += 1
+            stats.timeouts += 1
+            raise
+        except Exception:
+            stats.errors += 1
+            raise
+        stats.executions += 1
+        stats.execution_seconds += time.perf_counter() - start
+        return output
+
+    async def acall(self, tool: FunctionTool, **kwargs: Any) -> ToolOutput:
+        """Call a tool, reusing cached or in-flight results when its policy allows"""
+        tool_name = tool.metadata.name
+        policy = self.get_policy(tool)
+        stats = self._get_state(tool).stats
+        stats.calls += 1
+
+        if not policy.cacheable:
+            return await with_deadline(self._execute(tool, stats, kwargs), f"tool {tool_name}")
+
+        key = self._make_key(tool, policy, kwargs)
+        cache = self._get_cache(tool, policy)
+        cached = cache.get(key)
+        if cached is not None:
+            stats.hits += 1
+            stats.saved_seconds += stats.average_latency
+            return cached.model_copy(deep=True)
+
+        # Another caller may already be executing the same call
+        coalesced = self._singleflight.is_in_flight(key)
+        output = await with_deadline(
+            self._singleflight.do(key, lambda: self._execute(tool, stats, kwargs)),
+            f"tool {tool_name}"
+        )
+        if coalesced:
+            stats.coalesced += 1
+            stats.saved_seconds += stats.average_latency
+            # The leader got the shared output object
+            output = output.model_copy(deep=True)
+        elif not output.is_error:
+            cache.set(key, output.model_copy(deep=True))
+        return output
+
+    def invalidate(self, tool: FunctionTool) -> None:
+        state = self._states.get(tool)
+        if state is not None and state.cache is not None:
+            state.cache.clear()
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-tool hit ratio and saved latency, summed over live tools of the same name"""
+        totals: Dict[str, ToolStats] = {}
+        for tool, state in list(self._states.items()):
+            totals.setdefault(tool.metadata.name, ToolStats()).add(state.stats)
+        return {tool_name: stats.to_dict() for tool_name, stats in totals.items()}
+
+    def get_pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Queue depth, running calls and timeouts of every worker pool"""
+        return {name: pool.get_stats() for name, pool in self._pools.items()}
+
+    def shutdown(self, wait: bool = False) -> None:
+        for pool in self._pools.values():
+            pool.executor.shutdown(wait=wait, cancel_futures=True)
+        self._pools.clear()
+
+
+default_tool_executor = ToolExecutor()
@@ -1,17 +1,34 @@
 from typing import Callable, Optional
 from llama_index.core.tools import FunctionTool
+from src.tools.tool_executor import (ToolCachePolicy,
+                                     ToolExecutionPolicy,
+                                     ToolExecutor,
+                                     default_tool_executor)
 
 def create_function_tool(
     func: Callable,
     name: Optional[str] = None,
-    description: Optional[str] = None
+    description: Optional[str] = None,
+    cache_policy: Optional[ToolCachePolicy] = None,
+    execution_policy: Optional[ToolExecutionPolicy] = None,
+    executor: Optional[ToolExecutor] = None
 ) -> FunctionTool:
-    """Helper function to create a FunctionTool with proper metadata"""
-    return FunctionTool.from_defaults(
+    """
+    Helper function to create a FunctionTool with proper metadata.
+
+    `cache_policy` controls result reuse and `execution_policy` where the tool
+    runs (inline, thread pool or process pool) and its timeout, in `executor`
+    (the shared default executor if omitted; agents using the tool must be
+    given the same executor through `AgentOptions.tool_executor`). Pass
+    `NO_CACHE` for side-effecting tools.
+    """
+    tool = FunctionTool.from_defaults(
         fn=func,
         name=name or func.__name__,
         description=description or func.__doc__ or "No description provided"
     )
+    (executor or default_tool_executor).register(tool, cache_policy, execution_policy)
+    return tool
 def get_weather(location: str, unit: str = "celsius") -> dict:
     """Get current weather for a location"""
     return {
@@ -23,5 +40,7 @@ def get_weather(location: str, unit: str = "celsius") -> dict:
 weather_tool = create_function_tool(
             get_weather,
             name="get_weather",
-            description="Get current weather information for a location"
+            description="Get current weather information for a location",
+            cache_policy=ToolCachePolicy(ttl=600),
+            execution_policy=ToolExecutionPolicy(timeout=10.0)
         )
\ No newline at end of file